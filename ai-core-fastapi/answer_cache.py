@@ -0,0 +1,358 @@
+import asyncio
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+
+import numpy as np
+
+
+class SemanticCache:
+    """Cache de raspunsuri indexat dupa embedding-ul intrebarii.
+
+    O intrebare noua primeste raspunsul memorat daca similaritatea cosinus cu
+    o intrebare din cache depaseste `threshold`. Intrarile expira dupa `ttl`
+    secunde; cand cache-ul e plin se elimina intrarea folosita cel mai demult.
+    """
+
+    def __init__(self, threshold=0.95, ttl=6 * 3600, max_entries=1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._vectors = None  # matrice (max_entries, dim), alocata la primul add
+        self._answers = []
+        self._sources = []
+        self._created = np.zeros(max_entries)
+        self._last_used = np.zeros(max_entries)
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, idx):
+        # Mutam ultima intrare in locul celei sterse ca matricea sa ramana compacta
+        last = len(self._answers) - 1
+        if idx != last:
+            self._vectors[idx] = self._vectors[last]
+            self._answers[idx] = self._answers[last]
+            self._sources[idx] = self._sources[last]
+            self._created[idx] = self._created[last]
+            self._last_used[idx] = self._last_used[last]
+        self._answers.pop()
+        self._sources.pop()
+
+    def _expire(self, now):
+        n = len(self._answers)
+        expired = np.nonzero(now - self._created[:n] > self.ttl)[0]
+        for idx in expired[::-1]:
+            self._remove(int(idx))
+
+    def lookup(self, vector):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            n = len(self._answers)
+            if n:
+                sims = self._vectors[:n] @ self._normalize(vector)
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    self._last_used[best] = now
+                    self.hits += 1
+                    return self._answers[best], self._sources[best]
+            self.misses += 1
+            return None
+
+    def add(self, vector, answer, sources=()):
+        vector = self._normalize(vector)
+        now = time.monotonic()
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            self._expire(now)
+            if len(self._answers) >= self.max_entries:
+                self._remove(int(np.argmin(self._last_used[:len(self._answers)])))
+            idx = len(self._answers)
+            self._vectors[idx] = vector
+            self._answers.append(answer)
+            self._sources.append(frozenset(sources))
+            self._created[idx] = now
+            self._last_used[idx] = now
+
+    def invalidate_sources(self, sources):
+        sources = set(sources)
+        with self._lock:
+            stale = [i for i, used in enumerate(self._sources) if used & sources]
+            for idx in reversed(stale):
+                self._remove(idx)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._answers = []
+            self._sources = []
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._answers),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+def normalize_query(text):
+    # "Când e  ADMITEREA?" si "cand e admiterea?" devin aceeasi cheie;
+    # NFKD separa diacriticele (inclusiv ş/ţ cu sedila) de litera de baza
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split())
+
+
+class ExactAnswerCache:
+    """Cache de raspunsuri pe textul normalizat al intrebarii.
+
+    Fiecare intrare retine sursele (`source` din metadata parintilor) folosite
+    la generare, ca reindexarea unui fisier sa elimine doar raspunsurile care
+    depind de el.
+    """
+
+    def __init__(self, ttl=6 * 3600, max_entries=5000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._entries = OrderedDict()  # key -> (answer, sources, created)
+        self._by_source = {}
+
+    def _drop(self, key):
+        _, sources, _ = self._entries.pop(key)
+        for source in sources:
+            keys = self._by_source.get(source)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_source[source]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] > self.ttl:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key, answer, sources=()):
+        sources = frozenset(sources)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (answer, sources, time.monotonic())
+            for source in sources:
+                self._by_source.setdefault(source, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_sources(self, sources):
+        with self._lock:
+            stale = set()
+            for source in sources:
+                stale |= self._by_source.get(source, set())
+            for key in stale:
+                self._drop(key)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_source.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+class SingleFlight:
+    """Cererile identice concurente asteapta rezultatul unei singure executii."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._calls = {}
+        self._waiting = {}  # cheie -> cate cereri asteapta executia altei cereri
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.shared += 1
+                self._waiting[key] = self._waiting.get(key, 0) + 1
+        if not leader:
+            try:
+                return future.result()
+            finally:
+                self._leave(key)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def do_async(self, key, coro_fn):
+        """Varianta pentru endpoint-uri async: `coro_fn()` intoarce o corutina."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.shared += 1
+                self._waiting[key] = self._waiting.get(key, 0) + 1
+        if not leader:
+            try:
+                return await asyncio.wrap_future(future)
+            finally:
+                self._leave(key)
+
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def _leave(self, key):
+        with self._lock:
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+
+    def waiting(self, key):
+        """Cate cereri asteapta acum rezultatul executiei pentru `key`."""
+        with self._lock:
+            return self._waiting.get(key, 0)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class _SharedStream:
+    def __init__(self):
+        self.items = []  # ("event", item) sau ("error", exceptie), in ordinea emiterii
+        self.finished = False
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+        self.abandon = None
+        self.task = None
+
+
+class StreamFanout:
+    """Varianta SingleFlight pentru stream-uri: cererile identice concurente
+    primesc evenimentele unei singure executii. Cine vine mai tarziu primeste
+    intai evenimentele deja emise, apoi pe cele noi.
+
+    Executia ruleaza intr-un task separat, deci nu depinde de clientul care a
+    pornit-o; `abandon()` e apelat doar cand pleaca toti abonatii inainte de
+    final. Toate apelurile trebuie facute din acelasi event loop.
+    """
+
+    def __init__(self):
+        self._streams = {}
+        self.shared = 0
+
+    async def subscribe(self, key, start, remaining=None):
+        """Generator async cu evenimentele executiei pentru `key`. Primul abonat
+        o porneste: `start()` intoarce (generator async, abandon). Cand
+        `remaining()` (secundele ramase abonatului) ajunge la 0, arunca
+        TimeoutError doar acestui abonat."""
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = self._streams[key] = _SharedStream()
+            events, stream.abandon = start()
+            stream.task = asyncio.create_task(self._pump(key, stream, events))
+        else:
+            self.shared += 1
+        stream.subscribers += 1
+        position = 0
+        try:
+            while True:
+                timeout = remaining() if remaining else None
+                if timeout is not None and timeout <= 0:
+                    raise TimeoutError()
+                if position < len(stream.items):
+                    kind, item = stream.items[position]
+                    position += 1
+                    if kind == "error":
+                        raise item
+                    yield item
+                    continue
+                if stream.finished:
+                    return
+                await asyncio.wait_for(stream.changed.wait(), timeout)
+        finally:
+            stream.subscribers -= 1
+            if not stream.subscribers and not stream.finished:
+                stream.abandon()
+
+    def in_flight(self):
+        return len(self._streams)
+
+    async def _pump(self, key, stream, events):
+        try:
+            async for item in events:
+                stream.items.append(("event", item))
+                self._notify(stream)
+        except Exception as e:
+            stream.items.append(("error", e))
+        finally:
+            stream.finished = True
+            if self._streams.get(key) is stream:
+                del self._streams[key]
+            self._notify(stream)
+            await events.aclose()
+
+    @staticmethod
+    def _notify(stream):
+        # Abonatii asteapta pe evenimentul vechi; cei care vin dupa primesc unul nou
+        changed, stream.changed = stream.changed, asyncio.Event()
+        changed.set()
@@ -0,0 +1,240 @@
+import queue
+import time
+from concurrent.futures import Future
+from threading import Lock, Thread
+
+
+class BatchScheduler:
+    """Aduna cererile concurente in batch-uri si le proceseaza pe un singur thread.
+
+    Un batch se inchide cand are `max_batch_size` cereri sau cand au trecut
+    `max_wait_ms` de la sosirea primei cereri. `process_batch` primeste lista de
+    item-uri si intoarce lista de rezultate, in aceeasi ordine.
+    """
+
+    def __init__(self, process_batch, max_batch_size=8, max_wait_ms=20, max_queue=0, name="batch-scheduler",
+                 observe_wait=None):
+        self.process_batch = process_batch
+        self.observe_wait = observe_wait  # primeste timpul petrecut de fiecare cerere in coada
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = Lock()
+        self._batches = 0
+        self._requests = 0
+        self._last_batch_size = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def submit(self, item, block=True):
+        """Cu block=False arunca queue.Full daca coada (marginita) e plina."""
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()), block=block)
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if self.observe_wait is not None:
+                now = time.perf_counter()
+                for _, _, enqueued in batch:
+                    self.observe_wait(now - enqueued)
+            # Cererile anulate intre timp nu mai ocupa loc in batch
+            batch = [(item, future) for item, future, _ in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._last_batch_size = len(batch)
+            try:
+                results = self.process_batch([item for item, _ in batch])
+            except Exception as e:
+                print(f"[{self.name}] Eroare la procesarea batch-ului: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": self._batches,
+                "requests": self._requests,
+                "last_batch_size": self._last_batch_size,
+                "avg_batch_size": self._requests / self._batches if self._batches else 0.0,
+            }
+
+
+class StagePool:
+    """Etapa de pipeline: coada marginita + `workers` thread-uri care aplica
+    `process(item)` fiecarui element, independent unul de altul."""
+
+    def __init__(self, process, workers=2, max_queue=64, name="stage", observe_wait=None):
+        self.process = process
+        self.observe_wait = observe_wait
+        self.workers = workers
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._lock = Lock()
+        self._busy = 0
+        self._processed = 0
+
+    def start(self):
+        while len(self._threads) < self.workers:
+            thread = Thread(target=self._run, name=f"{self.name}-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, item, block=True):
+        """Cu block=False arunca queue.Full daca coada e plina."""
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()), block=block)
+        return future
+
+    def _run(self):
+        while True:
+            item, future, enqueued = self._queue.get()
+            if self.observe_wait is not None:
+                self.observe_wait(time.perf_counter() - enqueued)
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                self._busy += 1
+            try:
+                result = self.process(item)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self._processed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "workers": self.workers,
+                "busy": self._busy,
+                "processed": self._processed,
+            }
+
+
+class RequestCancelled(RuntimeError):
+    """Cererea a fost anulata (termen depasit sau client deconectat)."""
+
+
+class Cancellation:
+    """Anularea unei cereri, vazuta de toate etapele prin care trece.
+
+    Cererea se anuleaza explicit (`cancel`, ex. clientul s-a deconectat) sau
+    singura, cand trece `timeout` secunde de la creare. Callback-urile
+    inregistrate cu `on_cancel` (ex. `future.cancel` pentru cererile inca in
+    coada) ruleaza o singura data, la anulare.
+    """
+
+    def __init__(self, timeout=None):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.reason = None
+        self._callbacks = []
+        self._lock = Lock()
+
+    def remaining(self):
+        """Secunde pana la termen, sau None daca cererea nu are termen."""
+        return max(self.deadline - time.monotonic(), 0.0) if self.deadline is not None else None
+
+    def is_cancelled(self):
+        if self.reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline")
+        return self.reason is not None
+
+    def cancel(self, reason="cancelled"):
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback):
+        with self._lock:
+            if self.reason is None:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+
+class AdmissionControl:
+    """Limita de cereri in lucru (de la retrieval pana la finalul generarii).
+
+    Peste limita, cererile noi se resping imediat in loc sa astepte in cozi,
+    unde ar depasi oricum timeout-ul clientului.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._lock = Lock()
+        self._active = 0
+        self._admitted = 0
+        self._rejected = 0
+
+    def try_acquire(self):
+        with self._lock:
+            if self.limit and self._active >= self.limit:
+                self._rejected += 1
+                return False
+            self._active += 1
+            self._admitted += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+
+    def stats(self):
+        with self._lock:
+            return {"limit": self.limit, "active": self._active, "admitted": self._admitted, "rejected": self._rejected}
+
+
+def chain_future(source, target, transform=None):
+    """Copiaza rezultatul (sau exceptia) lui `source` in `target` cand e gata,
+    optional trecut prin `transform`."""
+    def copy(done):
+        if done.cancelled():
+            target.cancel()
+        elif done.exception() is not None:
+            target.set_exception(done.exception())
+        elif transform is None:
+            target.set_result(done.result())
+        else:
+            try:
+                target.set_result(transform(done.result()))
+            except Exception as e:
+                target.set_exception(e)
+    source.add_done_callback(copy)
@@ -0,0 +1,106 @@
+"""Compara embedding-urile pe CPU: fp32 vs cuantizare dinamica int8.
+
+Chunk-urile copil se obtin din DATA_FOLDER cu aceleasi splitter-e ca la
+indexare. Se masoara throughput-ul (chunk-uri/s) pentru fiecare varianta si
+cat de mult se potrivesc: similaritatea cosinus intre vectorii aceluiasi
+chunk si suprapunerea top-k la un set de intrebari.
+
+    python bench_cpu_embeddings.py --limit 2000 --k 5
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_community.document_loaders import TextLoader
+from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from cpu_embeddings import available_cores, optimize_for_cpu
+from rag_pipeline import (
+    CHILD_CHUNK_OVERLAP, CHILD_CHUNK_SIZE, DATA_FOLDER, EMBEDDING_BATCH_SIZE, EMBEDDING_MODEL,
+    PARENT_CHUNK_OVERLAP, PARENT_CHUNK_SIZE,
+)
+
+QUESTIONS = [
+    "Care este taxa de școlarizare la licență?",
+    "Când are loc admiterea la master?",
+    "Ce acte sunt necesare pentru înscriere?",
+    "Cum se obține o bursă de merit?",
+    "Unde se află secretariatul facultății?",
+    "Care sunt condițiile pentru cazare în cămin?",
+    "Ce este concursul MateInfoUB?",
+    "Cum se face transferul la altă specializare?",
+    "Câte credite sunt necesare pentru promovarea anului?",
+    "Care este programul bibliotecii?",
+    "Cum se susține examenul de licență?",
+    "Ce specializări de master oferă facultatea?",
+]
+
+
+def load_chunks(limit):
+    parent_splitter = RecursiveCharacterTextSplitter(chunk_size=PARENT_CHUNK_SIZE, chunk_overlap=PARENT_CHUNK_OVERLAP)
+    child_splitter = RecursiveCharacterTextSplitter(chunk_size=CHILD_CHUNK_SIZE, chunk_overlap=CHILD_CHUNK_OVERLAP)
+    chunks = []
+    for path in sorted(Path(DATA_FOLDER).glob("**/*.txt")):
+        parents = parent_splitter.split_documents(TextLoader(str(path)).load())
+        chunks.extend(doc.page_content for doc in child_splitter.split_documents(parents))
+        if limit and len(chunks) >= limit:
+            break
+    return chunks[:limit] if limit else chunks
+
+
+def embed_timed(embeddings, texts):
+    embeddings.embed_documents(texts[:EMBEDDING_BATCH_SIZE])  # incalzire
+    start = time.perf_counter()
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    return vectors, time.perf_counter() - start
+
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--limit", type=int, default=2000, help="numar maxim de chunk-uri (0 = tot corpusul)")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.limit)
+    if not chunks:
+        print(f"Nu am gasit fisiere .txt in {DATA_FOLDER}.")
+        return
+    print(f"[STATUS] {len(chunks)} chunk-uri copil, {args.threads or available_cores()} thread-uri")
+
+    results = {}
+    for quantization in ("", "int8"):
+        embeddings = HuggingFaceEmbeddings(
+            model_name=args.model, model_kwargs={"device": "cpu"},
+            encode_kwargs={"batch_size": EMBEDDING_BATCH_SIZE},
+        )
+        optimize_for_cpu(embeddings, quantization=quantization, threads=args.threads)
+        vectors, seconds = embed_timed(embeddings, chunks)
+        queries = np.asarray([embeddings.embed_query(q) for q in QUESTIONS], dtype=np.float32)
+        results[quantization or "fp32"] = (normalize(vectors), normalize(queries), seconds)
+
+    fp32_docs, fp32_queries, fp32_seconds = results["fp32"]
+    int8_docs, int8_queries, int8_seconds = results["int8"]
+    cosine = np.sum(fp32_docs * int8_docs, axis=1)
+    top_fp32 = np.argsort(-(fp32_queries @ fp32_docs.T), axis=1)[:, :args.k]
+    top_int8 = np.argsort(-(int8_queries @ int8_docs.T), axis=1)[:, :args.k]
+    overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(top_fp32, top_int8)])
+    top1 = np.mean(top_fp32[:, 0] == top_int8[:, 0])
+
+    print(f"\n{'varianta':<8} {'timp s':>8} {'chunk/s':>9}")
+    print(f"{'fp32':<8} {fp32_seconds:>8.1f} {len(chunks) / fp32_seconds:>9.1f}")
+    print(f"{'int8':<8} {int8_seconds:>8.1f} {len(chunks) / int8_seconds:>9.1f}")
+    print(f"\nSpeedup int8: {fp32_seconds / int8_seconds:.2f}x")
+    print(f"Cosinus fp32/int8 per chunk: medie {cosine.mean():.4f}, minim {cosine.min():.4f}")
+    print(f"Acord retrieval ({len(QUESTIONS)} intrebari): top-{args.k} suprapunere {overlap:.2%}, top-1 identic {top1:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Compara colectia Chroma `split_parents` cu FlatVectorStore (float16 / int8).
+
+Masoara latenta top-k, RSS-ul procesului si recall@k fata de cautarea
+exacta in float32. Fiecare backend ruleaza intr-un proces separat, ca RSS-ul
+sa nu se amestece. Fara index construit se poate folosi --synthetic N.
+
+    python bench_flat_index.py --queries 200 --k 20
+    python bench_flat_index.py --synthetic 5000
+"""
+import argparse
+import multiprocessing as mp
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from flat_index import FlatVectorStore, _normalize
+from metrics import RollingStats
+from rag_pipeline import DB_PATH
+
+
+def rss_mb():
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def load_chroma_collection():
+    import chromadb
+
+    collection = chromadb.PersistentClient(path=DB_PATH).get_collection("split_parents")
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+    return data["ids"], np.asarray(data["embeddings"], dtype=np.float32), data["documents"], data["metadatas"]
+
+
+def synthetic_collection(n, dim, path):
+    import chromadb
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    ids = [f"c{i}" for i in range(n)]
+    documents = [f"chunk {i}" for i in range(n)]
+    metadatas = [{"doc_id": f"p{i // 5}"} for i in range(n)]
+    collection = chromadb.PersistentClient(path=path).create_collection(
+        "split_parents", metadata={"hnsw:space": "cosine"}
+    )
+    for start in range(0, n, 2000):
+        end = start + 2000
+        collection.add(ids=ids[start:end], embeddings=vectors[start:end].tolist(),
+                       documents=documents[start:end], metadatas=metadatas[start:end])
+    return ids, vectors, documents, metadatas
+
+
+def make_queries(vectors, n, seed=1):
+    # Vectori existenti + zgomot: seamana cu intrebari apropiate de un chunk
+    rng = np.random.default_rng(seed)
+    base = vectors[rng.integers(0, len(vectors), n)]
+    noise = rng.standard_normal(base.shape).astype(np.float32) * base.std()
+    return _normalize(base + 0.5 * noise)
+
+
+def run_chroma(chroma_path, queries, k, out):
+    import chromadb
+
+    before = rss_mb()
+    collection = chromadb.PersistentClient(path=chroma_path).get_collection("split_parents")
+    latency = RollingStats(window=len(queries))
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        hits = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latency.observe(time.perf_counter() - start)
+        results.append(hits["ids"][0])
+    out.put({"latency": latency.summary(), "rss_mb": rss_mb() - before, "results": results})
+
+
+def run_flat(index_path, quantization, queries, k, out):
+    before = rss_mb()
+    store = FlatVectorStore(index_path, None, quantization=quantization, read_only=True)
+    latency = RollingStats(window=len(queries))
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        hits = store.similarity_search_with_score_by_vector(query, k=k)
+        latency.observe(time.perf_counter() - start)
+        results.append([doc.id for doc, _ in hits])
+    out.put({"latency": latency.summary(), "rss_mb": rss_mb() - before, "results": results})
+
+
+def in_subprocess(target, *args):
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=target, args=(*args, out))
+    proc.start()
+    result = out.get()
+    proc.join()
+    return result
+
+
+def recall(results, truth):
+    return float(np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--synthetic", type=int, default=0, help="numar de vectori aleatori in loc de indexul real")
+    parser.add_argument("--dim", type=int, default=1024)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_flat_")
+    try:
+        if args.synthetic:
+            chroma_path = f"{workdir}/chroma"
+            ids, vectors, documents, metadatas = synthetic_collection(args.synthetic, args.dim, chroma_path)
+        else:
+            chroma_path = DB_PATH
+            ids, vectors, documents, metadatas = load_chroma_collection()
+        print(f"[STATUS] {len(ids)} vectori de dimensiune {vectors.shape[1]}")
+
+        queries = make_queries(vectors, args.queries)
+        exact = _normalize(vectors) @ queries.T
+        top = np.argsort(-exact, axis=0)[:args.k].T
+        truth = [[ids[i] for i in row] for row in top]
+
+        reports = {"chroma": in_subprocess(run_chroma, chroma_path, queries, args.k)}
+        for quantization in (None, "int8"):
+            index_path = f"{workdir}/flat-{quantization or 'f16'}"
+            start = time.perf_counter()
+            store = FlatVectorStore(index_path, None, quantization=quantization)
+            store.add_embeddings(documents, vectors, metadatas, ids)
+            store.save()
+            build = time.perf_counter() - start
+            del store
+            report = in_subprocess(run_flat, index_path, quantization, queries, args.k)
+            report["build_s"] = build
+            reports[f"flat-{quantization or 'f16'}"] = report
+
+        print(f"\n{'backend':<12} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8} {'recall@' + str(args.k):>10}")
+        for name, report in reports.items():
+            lat = report["latency"]
+            print(f"{name:<12} {lat['p50'] * 1000:>8.2f} {lat['p95'] * 1000:>8.2f} "
+                  f"{report['rss_mb']:>8.1f} {recall(report['results'], truth):>10.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""Load test HTTP pentru /query: latenta (p50/p95/p99), throughput si timpul
+petrecut in cozi, la diferite niveluri de concurenta sau rate de sosire.
+
+Porneste serverul (uvicorn main:app) intr-un director de lucru separat, cu
+unul din backend-urile:
+  stub  - replici de generare fara model (GENERATION_BACKEND=stub) si
+          embedding-uri deterministe (EMBEDDING_BACKEND=stub); masoara doar
+          serverul: cozi, batching, retrieval, streaming
+  tiny  - un model cauzal mic si un sentence-transformer mic, pe CPU
+sau testeaza un server deja pornit (--url).
+
+Fiecare rulare e fie closed-loop (--concurrency: N clienti care trimit
+cerere dupa cerere), fie open-loop (--rate: sosiri Poisson cu R cereri/s,
+indiferent cat de repede raspunde serverul). Timpul din cozi si din fiecare
+etapa vine din trace-ul cererii (debug=true). Rezultatele se scriu in JSON.
+
+    python bench_load.py --backend stub --concurrency 1,4,16 --requests 200 --out load-stub.json
+    python bench_load.py --backend tiny --model-dir /models/tiny --embedding-model /models/st --rate 1,2 --duration 60
+    python bench_load.py --url http://localhost:8000 --concurrency 8 --stream
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+import aiohttp
+import numpy as np
+
+DATA_FOLDER = os.environ.get("DATA_FOLDER", "./data_facultate")  # aceeasi variabila ca rag_pipeline, fara sa importam torch/langchain
+
+QUESTIONS = [
+    "Care este taxa de școlarizare la licență?",
+    "Când are loc admiterea la master?",
+    "Ce acte sunt necesare pentru înscriere?",
+    "Cum se obține o bursă de merit?",
+    "Unde se află secretariatul facultății?",
+    "Care sunt condițiile pentru cazare în cămin?",
+    "Ce este concursul MateInfoUB?",
+    "Cum se face transferul la altă specializare?",
+    "Câte credite sunt necesare pentru promovarea anului?",
+    "Care este programul bibliotecii?",
+    "Cum se susține examenul de licență?",
+    "Ce specializări de master oferă facultatea?",
+    "Cât costă reînmatricularea?",
+    "Când începe sesiunea de examene din iarnă?",
+    "Cum pot contesta nota de la un examen?",
+    "Ce burse sociale există și cine poate aplica?",
+    "Care este structura anului universitar?",
+    "Cum se alege îndrumătorul pentru lucrarea de licență?",
+    "Ce cursuri opționale sunt în anul al treilea la Informatică?",
+    "Unde găsesc orarul pentru anul I?",
+    "Se poate face practica de specialitate la o firmă?",
+    "Care sunt criteriile de admitere la Matematică?",
+    "Cum se calculează media de admitere?",
+    "Ce documente trebuie depuse pentru mobilitatea Erasmus?",
+    "Cine este decanul facultății?",
+    "Cum se obține adeverința de student?",
+    "Există locuri cu taxă la Calculatoare și Tehnologia Informației?",
+    "Ce se întâmplă dacă nu promovez un examen în restanțe?",
+    "Cum se face înscrierea la doctorat?",
+    "Care sunt regulile pentru frecvența la laboratoare?",
+]
+
+DEFAULT_MODEL_DIR = "/app/model"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepare_workdir(workdir, data):
+    # Serverul foloseste cai relative (./data_facultate, ./chroma_db_parent):
+    # in directorul de lucru, indexul nu se amesteca cu cel din repo
+    target = os.path.join(workdir, "data_facultate")
+    if os.path.lexists(target):
+        return
+    data = os.path.abspath(data)
+    if os.path.isdir(data):
+        os.symlink(data, target)
+    else:
+        os.makedirs(target)
+        os.symlink(data, os.path.join(target, os.path.basename(data)))
+
+
+def server_env(args):
+    env = dict(os.environ, DEVICE_EMBEDDINGS="cpu", PYTHONUNBUFFERED="1")
+    if args.backend == "stub":
+        env.update(
+            GENERATION_BACKEND="stub", GENERATION_REPLICAS=str(max(1, args.replicas)),
+            EMBEDDING_BACKEND="stub", STUB_TOKEN_DELAY=str(args.stub_token_delay),
+        )
+    else:
+        env.update(
+            MODEL_DIR=args.model_dir, QUANTIZATION="none", EMBEDDING_MODEL=args.embedding_model,
+            GENERATION_REPLICAS=str(args.replicas), MAX_NEW_TOKENS=str(args.max_new_tokens),
+        )
+    if not args.cache:
+        # Intrebarile unice pot fi totusi foarte apropiate semantic; cache-ul nu trebuie sa raspunda
+        env["SEMANTIC_CACHE_THRESHOLD"] = "1.01"
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+
+def start_server(args, workdir):
+    port = free_port()
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--app-dir", os.path.dirname(os.path.abspath(__file__)),
+         "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=server_env(args), stdout=log, stderr=subprocess.STDOUT,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(url, process, timeout):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"Serverul s-a oprit (exit code {process.returncode}).")
+            try:
+                async with session.get(f"{url}/ready") as response:
+                    body = await response.json()
+                    if response.status == 200:
+                        return body
+                    if body.get("status") == "failed":
+                        raise RuntimeError("Initializarea serverului a esuat.")
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"Serverul nu a devenit gata in {timeout}s.")
+
+
+async def read_sse(response):
+    # Evenimentele SSE sunt separate de o linie goala
+    event = None
+    async for raw in response.content:
+        line = raw.decode("utf-8").rstrip("\n")
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            yield event, json.loads(line[len("data: "):])
+
+
+async def one_request(session, url, question, stream):
+    start = time.perf_counter()
+    result = {"status": None, "latency_s": None, "ttft_s": None, "trace": None, "error": None}
+    try:
+        if stream:
+            async with session.post(f"{url}/query/stream", json={"query": question, "debug": True}) as response:
+                result["status"] = response.status
+                async for event, data in read_sse(response):
+                    if event == "token" and result["ttft_s"] is None:
+                        result["ttft_s"] = time.perf_counter() - start
+                    elif event == "error":
+                        # Stream-ul a pornit cu 200; statusul real (429, 503, 504) e in eveniment
+                        result["status"] = data.get("status", result["status"])
+                        result["error"] = data.get("detail")
+                    elif event == "done":
+                        result["latency_s"] = time.perf_counter() - start
+                    elif event == "trace":
+                        result["trace"] = data
+        else:
+            async with session.post(f"{url}/query", json={"query": question, "debug": True}) as response:
+                result["status"] = response.status
+                body = await response.json()
+                result["latency_s"] = time.perf_counter() - start
+                result["trace"] = body.get("trace")
+                if response.status != 200:
+                    result["error"] = body.get("detail")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        result["error"] = type(e).__name__
+    return result
+
+
+def questions(cache, seed):
+    # Implicit fiecare intrebare e unica, ca sa nu masuram doar cache-ul de raspunsuri
+    rng = random.Random(seed)
+    for i in range(10 ** 9):
+        question = rng.choice(QUESTIONS)
+        yield question if cache else f"{question} (#{seed}.{i})"
+
+
+async def closed_loop(session, url, concurrency, total, duration, stream, source):
+    results = []
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def client():
+        while (total is None or len(results) < total) and (deadline is None or time.perf_counter() < deadline):
+            index = len(results)
+            results.append(None)  # rezerva locul inainte de await, ca totalul sa fie exact
+            results[index] = await one_request(session, url, next(source), stream)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return [r for r in results if r is not None]
+
+
+async def open_loop(session, url, rate, total, duration, stream, source, seed):
+    rng = random.Random(seed)
+    tasks = []
+    start = time.perf_counter()
+    while (total is None or len(tasks) < total) and (not duration or time.perf_counter() - start < duration):
+        tasks.append(asyncio.create_task(one_request(session, url, next(source), stream)))
+        await asyncio.sleep(rng.expovariate(rate))
+    return await asyncio.gather(*tasks)
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = np.asarray(values)
+    return {
+        "p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)), "mean": float(values.mean()), "max": float(values.max()),
+    }
+
+
+def summarize(results, wall_s):
+    ok = [r for r in results if r["status"] == 200 and r["error"] is None and r["latency_s"] is not None]
+    errors = Counter(str(r["status"] or r["error"]) for r in results if r not in ok)
+    stages = defaultdict(list)
+    for r in ok:
+        for span in (r["trace"] or {}).get("spans", []):
+            stages[span["name"]].append(span["duration_ms"] / 1000)
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": dict(errors),
+        "wall_s": wall_s,
+        "throughput_rps": len(ok) / wall_s if wall_s else 0.0,
+        "latency_s": percentiles([r["latency_s"] for r in ok]),
+        "ttft_s": percentiles([r["ttft_s"] for r in ok if r["ttft_s"] is not None]),
+        "queue_wait_s": {name: percentiles(stages[name]) for name in ("retrieval_queue", "generation_queue") if name in stages},
+        "stages_s": {name: percentiles(values) for name, values in sorted(stages.items())},
+    }
+
+
+def print_run(run):
+    latency = run["latency_s"] or {}
+    queue = run["queue_wait_s"].get("generation_queue") or run["queue_wait_s"].get("retrieval_queue") or {}
+    load = f"c={run['concurrency']}" if run["mode"] == "closed" else f"rate={run['rate']}/s"
+    print(
+        f"[BENCH] {load:>10} ok={run['ok']}/{run['requests']} {run['throughput_rps']:.2f} req/s "
+        f"p50={latency.get('p50', 0):.3f}s p95={latency.get('p95', 0):.3f}s p99={latency.get('p99', 0):.3f}s "
+        f"coada p95={queue.get('p95', 0):.3f}s erori={run['errors'] or '-'}"
+    )
+
+
+async def run_all(args, url):
+    runs = []
+    timeout = aiohttp.ClientTimeout(total=args.request_timeout)
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        if args.warmup:
+            await closed_loop(session, url, 1, args.warmup, None, args.stream, questions(args.cache, -1))
+        loads = [("closed", c) for c in args.concurrency] + [("open", r) for r in args.rate]
+        for i, (mode, level) in enumerate(loads):
+            source = questions(args.cache, args.seed + i)
+            start = time.perf_counter()
+            if mode == "closed":
+                results = await closed_loop(session, url, level, args.requests, args.duration, args.stream, source)
+            else:
+                results = await open_loop(session, url, level, args.requests, args.duration, args.stream, source,
+                                          args.seed + i)
+            run = {"mode": mode, "concurrency": level if mode == "closed" else None,
+                   "rate": level if mode == "open" else None}
+            run.update(summarize(results, time.perf_counter() - start))
+            print_run(run)
+            runs.append(run)
+    return runs
+
+
+def numbers(cast):
+    return lambda text: [cast(x) for x in text.split(",") if x]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="server deja pornit; altfel se porneste unul cu --backend")
+    parser.add_argument("--backend", choices=("stub", "tiny"), default="stub")
+    parser.add_argument("--replicas", type=int, default=1, help="GENERATION_REPLICAS (stub: minim 1)")
+    parser.add_argument("--stub-token-delay", type=float, default=0.02, help="secunde per pas de decode (stub)")
+    parser.add_argument("--model-dir", default=os.environ.get("MODEL_DIR", DEFAULT_MODEL_DIR), help="model cauzal mic (tiny)")
+    parser.add_argument("--embedding-model", default="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+                        help="sentence-transformer mic (tiny)")
+    parser.add_argument("--max-new-tokens", type=int, default=64, help="MAX_NEW_TOKENS (tiny)")
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE suplimentar pentru server")
+    parser.add_argument("--data", default=DATA_FOLDER if os.path.isdir(DATA_FOLDER) else
+                        os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "context_fmi.txt"),
+                        help="director cu .txt sau un singur fisier")
+    parser.add_argument("--workdir", help="director de lucru pastrat intre rulari (indexul nu se reconstruieste)")
+    parser.add_argument("--startup-timeout", type=float, default=900)
+    parser.add_argument("--concurrency", type=numbers(int), default=[], help="ex. 1,4,16 (closed-loop)")
+    parser.add_argument("--rate", type=numbers(float), default=[], help="cereri/s, ex. 1,2,5 (open-loop)")
+    parser.add_argument("--requests", type=int, help="cereri per rulare")
+    parser.add_argument("--duration", type=float, help="secunde per rulare")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--stream", action="store_true", help="foloseste /query/stream si masoara time-to-first-token")
+    parser.add_argument("--cache", action="store_true", help="permite intrebari repetate (include efectul cache-urilor)")
+    parser.add_argument("--request-timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_load.json")
+    args = parser.parse_args()
+    if not args.concurrency and not args.rate:
+        args.concurrency = [1, 4, 16]
+    if args.requests is None and args.duration is None:
+        args.requests = 100
+
+    process, workdir = None, None
+    url = args.url
+    try:
+        if url is None:
+            workdir = args.workdir or tempfile.mkdtemp(prefix="askfmi-load-")
+            os.makedirs(workdir, exist_ok=True)
+            prepare_workdir(workdir, args.data)
+            process, url = start_server(args, workdir)
+            print(f"[STATUS] Server {args.backend} pornit in {workdir} (log: server.log)")
+        start = time.perf_counter()
+        ready = asyncio.run(wait_ready(url, process, args.startup_timeout))
+        print(f"[STATUS] Server gata in {time.perf_counter() - start:.1f}s")
+        runs = asyncio.run(run_all(args, url))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if workdir and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: value for key, value in vars(args).items() if key != "env"},
+        "server": {"url": args.url, "backend": None if args.url else args.backend, "env": args.env,
+                   "startup": ready.get("timeline")},
+        "runs": runs,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[STATUS] Rezultate scrise in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
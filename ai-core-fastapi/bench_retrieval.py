@@ -0,0 +1,208 @@
+"""Benchmark de retrieval: calitate (recall@k, MRR) si cost (timp de
+constructie, dimensiune pe disc, latenta per intrebare) pentru mai multe
+configuratii ale indexului.
+
+Corpusul (context_fmi.txt sau fisierele din data_facultate) se imparte in
+pagini dupa antetul "Sursa URL:" scris de crawler, cate un fisier per URL,
+deci sursa unui document parinte este pagina din care provine. Setul de
+intrebari (JSONL, {"question", "sources": [fragmente de URL]}) spune ce
+pagini sunt relevante; o intrebare e gasita la k daca cel putin unul din
+primii k parinti provine dintr-o pagina relevanta.
+
+Pentru fiecare combinatie chunk copil x chunk parinte x backend vectorial se
+construieste un index separat, de la zero (cu --share-embedding-cache,
+chunk-urile deja embedate se refolosesc intre configuratii: mai rapid, dar
+timpul de constructie nu mai e comparabil). Modurile de cautare
+(dense/hybrid/lexical) se compara pe acelasi index. Rerank-ul nu e inclus.
+
+    python bench_retrieval.py --child 400:50,800:100 --backend chroma,flat --mode dense,hybrid --k 1,3,5
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+
+import rag_pipeline
+from rag_pipeline import (
+    CHILD_CHUNK_OVERLAP, CHILD_CHUNK_SIZE, DATA_FOLDER, PARENT_CHUNK_OVERLAP, PARENT_CHUNK_SIZE,
+    get_retriever, index_documents, retrieve_parents,
+)
+
+PAGE_SEPARATOR = "\n" + "=" * 50 + "\n"
+URL_LINE = re.compile(r"^Sursa URL: (\S+)", re.MULTILINE)
+
+
+def split_pages(data, out_dir):
+    """Scrie cate un fisier per URL in `out_dir`; intoarce {nume fisier: URL}."""
+    paths = [data] if os.path.isfile(data) else sorted(
+        os.path.join(root, name) for root, _, names in os.walk(data) for name in names if name.endswith(".txt")
+    )
+    pages = defaultdict(list)
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for block in f.read().split(PAGE_SEPARATOR):
+                match = URL_LINE.search(block)
+                url = match.group(1) if match else os.path.relpath(path, data if os.path.isdir(data) else os.path.dirname(data))
+                if block.strip():
+                    pages[url].append(block.strip())
+
+    os.makedirs(out_dir, exist_ok=True)
+    names = {}
+    for url, blocks in pages.items():
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", re.sub(r"^https?://[^/]+", "", url)).strip("_") or "index"
+        name = f"{slug[:150]}.txt"
+        with open(os.path.join(out_dir, name), "w", encoding="utf-8") as f:
+            f.write(PAGE_SEPARATOR.join(blocks))
+        names[name] = url
+    return names
+
+
+def load_questions(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def percentiles(values):
+    values = np.asarray(values)
+    return {
+        "p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95)),
+        "mean": float(values.mean()), "max": float(values.max()),
+    }
+
+
+def pairs(text):
+    return [tuple(int(x) for x in item.split(":")) for item in text.split(",") if item]
+
+
+def names(text):
+    return [item for item in text.split(",") if item]
+
+
+def configure(child, parent, backend, embedding_cache):
+    # Constantele se citesc din rag_pipeline la apel, deci ajunge sa le schimbam aici
+    rag_pipeline.CHILD_CHUNK_SIZE, rag_pipeline.CHILD_CHUNK_OVERLAP = child
+    rag_pipeline.PARENT_CHUNK_SIZE, rag_pipeline.PARENT_CHUNK_OVERLAP = parent
+    rag_pipeline.VECTOR_BACKEND, _, quantization = backend.partition("-")
+    rag_pipeline.FLAT_INDEX_QUANTIZATION = quantization or None
+    rag_pipeline.EMBEDDING_CACHE_PATH = embedding_cache
+
+
+def evaluate(retriever, questions, sources, mode, vectors, ks):
+    rag_pipeline.RETRIEVAL_MODE = mode
+    max_k = max(ks)
+    ranks, latencies = [], []
+    for question, vector in zip(questions, vectors):
+        start = time.perf_counter()
+        docs = retrieve_parents(vector if mode != "lexical" else None, retriever, question["question"], k=max_k)
+        latencies.append(time.perf_counter() - start)
+        urls = [sources.get(os.path.basename(doc.metadata.get("source", "")), "") for doc in docs]
+        rank = next((i for i, url in enumerate(urls, 1) if any(s in url for s in question["sources"])), None)
+        ranks.append(rank)
+    return {
+        "recall": {str(k): sum(1 for r in ranks if r is not None and r <= k) / len(ranks) for k in ks},
+        "mrr": sum(1 / r for r in ranks if r is not None) / len(ranks),
+        "search_latency_s": percentiles(latencies),
+        "misses": [q["question"] for q, r in zip(questions, ranks) if r is None],
+    }
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA_FOLDER if os.path.isdir(DATA_FOLDER) else os.path.join(here, "..", "context_fmi.txt"))
+    parser.add_argument("--questions", default=os.path.join(here, "bench_retrieval_questions.jsonl"))
+    parser.add_argument("--child", type=pairs, default=[(CHILD_CHUNK_SIZE, CHILD_CHUNK_OVERLAP)], help="size:overlap,...")
+    parser.add_argument("--parent", type=pairs, default=[(PARENT_CHUNK_SIZE, PARENT_CHUNK_OVERLAP)], help="size:overlap,...")
+    parser.add_argument("--backend", type=names, default=["chroma", "flat"], help="chroma, flat, flat-int8")
+    parser.add_argument("--mode", type=names, default=["dense", "hybrid", "lexical"])
+    parser.add_argument("--k", type=lambda text: [int(x) for x in text.split(",")], default=[1, 3, 5],
+                        help="valori pentru recall@k; TOP_K_DOCUMENTS = cati parinti ajung in prompt")
+    parser.add_argument("--workdir", help="pastreaza indexurile si cache-ul de embedding-uri aici")
+    parser.add_argument("--share-embedding-cache", action="store_true")
+    parser.add_argument("--out", default="bench_retrieval.json")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="askfmi-retrieval-")
+    questions = load_questions(args.questions)
+    pages_dir = os.path.join(workdir, "pages")
+    sources = split_pages(args.data, pages_dir)
+    print(f"[STATUS] {len(sources)} pagini, {len(questions)} intrebari, director de lucru {workdir}")
+
+    # Modelul de embedding se incarca o singura data pentru toate configuratiile
+    rag_pipeline.load_embeddings = lru_cache(maxsize=None)(rag_pipeline.load_embeddings)
+
+    results = []
+    try:
+        for child in args.child:
+            for parent in args.parent:
+                for backend in args.backend:
+                    name = f"child{child[0]}-{child[1]}_parent{parent[0]}-{parent[1]}_{backend}"
+                    index_dir = os.path.join(workdir, name)
+                    embedding_cache = os.path.join(workdir, "embedding_cache" if args.share_embedding_cache
+                                                   else f"{name}-embedding_cache")
+                    configure(child, parent, backend, embedding_cache)
+                    shutil.rmtree(index_dir, ignore_errors=True)
+                    if not args.share_embedding_cache:
+                        shutil.rmtree(embedding_cache, ignore_errors=True)
+
+                    start = time.perf_counter()
+                    retriever = get_retriever(index_dir)
+                    index_documents(retriever, pages_dir)
+                    build_s = time.perf_counter() - start
+
+                    embeddings = retriever.vectorstore.embeddings
+                    vectors, embed_latencies = [], []
+                    for question in questions:
+                        start = time.perf_counter()
+                        vectors.append(embeddings.embed_query(question["question"]))
+                        embed_latencies.append(time.perf_counter() - start)
+
+                    config = {
+                        "name": name, "child_chunk": list(child), "parent_chunk": list(parent), "backend": backend,
+                        "build_s": build_s, "size_bytes": dir_size(index_dir),
+                        "children": retriever.vectorstore._collection.count() if backend == "chroma" else len(retriever.vectorstore),
+                        "embed_latency_s": percentiles(embed_latencies),
+                        "modes": {},
+                    }
+                    for mode in args.mode:
+                        evaluation = evaluate(retriever, questions, sources, mode, vectors, args.k)
+                        config["modes"][mode] = evaluation
+                        recall = " ".join(f"R@{k}={evaluation['recall'][str(k)]:.2f}" for k in args.k)
+                        print(
+                            f"[BENCH] {name} {mode:>7}: {recall} MRR={evaluation['mrr']:.3f} "
+                            f"cautare p50={evaluation['search_latency_s']['p50'] * 1000:.1f}ms "
+                            f"(+ embedding {config['embed_latency_s']['p50'] * 1000:.1f}ms) "
+                            f"build={build_s:.1f}s disc={config['size_bytes'] / 2 ** 20:.1f}MB"
+                        )
+                    results.append(config)
+                    retriever.docstore.store.close()
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "data": os.path.abspath(args.data),
+        "questions": len(questions),
+        "embedding_model": rag_pipeline.embedding_variant(),
+        "k": args.k,
+        "configs": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[STATUS] Rezultate scrise in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Compara decodarea normala cu decodarea speculativa (model draft si
+prompt lookup) pe prompturi RAG reale, cu batch size 1.
+
+Prompturile se construiesc ca pe server (retrieval + context packer) pentru
+intrebarile din bench_retrieval_questions.jsonl, din indexul existent
+(artefactul curent din INDEX_ARTIFACT_DIR sau DB_PATH), sau se citesc dintr-un
+JSONL cu {"prompt"}. Pentru fiecare mod se raporteaza tokeni/s, forward-uri
+ale modelului mare per token, rata de acceptare a propunerilor, accelerarea
+fata de decodarea normala si cate raspunsuri sunt identice cu ea (la
+decodare greedy ar trebui sa fie toate).
+
+    python bench_speculative.py --draft /models/mistral-draft --tokens 3,5,8 --limit 20
+"""
+import argparse
+import json
+import os
+import time
+
+from index_artifact import current_artifact
+from rag_pipeline import (
+    DB_PATH, DRAFT_MODEL_DIR, INDEX_ARTIFACT_DIR, PROMPT_LOOKUP_MAX_NGRAM, generate_batch, get_retriever,
+    load_draft_model, load_generation_pipeline, prepare_query,
+)
+from speculative import ForwardCounter, acceptance, speculative_kwargs
+
+
+def load_prompts(args, pipe):
+    if args.prompts:
+        with open(args.prompts, "r", encoding="utf-8") as f:
+            return [json.loads(line)["prompt"] for line in f if line.strip()][:args.limit]
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+    index_dir = current_artifact(INDEX_ARTIFACT_DIR) if INDEX_ARTIFACT_DIR else DB_PATH
+    retriever = get_retriever(index_dir, read_only=True)
+    prompts = []
+    for question in questions[:args.limit]:
+        prepared = prepare_query(question, retriever, pipe.context_packer)
+        if "prompt" in prepared:
+            prompts.append(prepared["prompt"])
+    return prompts
+
+
+def run(pipe, prompts, name):
+    texts, totals = [], {"generated_tokens": 0, "forwards": 0, "draft_forwards": 0}
+    start = time.perf_counter()
+    for prompt in prompts:
+        stats = {}
+        texts += generate_batch([prompt], pipe, None, stats)
+        for key in totals:
+            totals[key] += stats.get(key, 0)
+    seconds = time.perf_counter() - start
+    result = {"mode": name, "seconds": seconds, "tokens_per_s": totals["generated_tokens"] / seconds, **totals}
+    result.update(acceptance(totals["generated_tokens"], totals["forwards"], totals["draft_forwards"] or None))
+    return result, texts
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", help="JSONL cu {\"prompt\"}; altfel se construiesc din index")
+    parser.add_argument("--questions", default=os.path.join(here, "bench_retrieval_questions.jsonl"))
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--draft", default=DRAFT_MODEL_DIR, help="model draft; fara el se testeaza doar prompt lookup")
+    parser.add_argument("--tokens", type=lambda text: [int(x) for x in text.split(",")], default=[5],
+                        help="tokeni propusi per pas (lookahead)")
+    parser.add_argument("--max-ngram", type=int, default=PROMPT_LOOKUP_MAX_NGRAM)
+    parser.add_argument("--out", default="bench_speculative.json")
+    args = parser.parse_args()
+
+    pipe = load_generation_pipeline()
+    pipe.speculative_kwargs, pipe.draft_counter = {}, None
+    prompts = load_prompts(args, pipe)
+    if not prompts:
+        print("Nu am gasit niciun prompt (index gol?).")
+        return
+    print(f"[STATUS] {len(prompts)} prompturi")
+
+    generate_batch(prompts[:1], pipe)  # incalzire
+    baseline, reference = run(pipe, prompts, "baseline")
+    results = [baseline]
+    modes = [("prompt_lookup", tokens) for tokens in args.tokens]
+    draft = None
+    if args.draft:
+        draft = load_draft_model(args.draft)
+        modes += [("draft", tokens) for tokens in args.tokens]
+
+    for mode, tokens in modes:
+        pipe.speculative_kwargs = speculative_kwargs(mode, tokens, args.max_ngram, draft)
+        pipe.draft_counter = ForwardCounter(draft) if mode == "draft" else None
+        result, texts = run(pipe, prompts, f"{mode}-{tokens}")
+        if pipe.draft_counter is not None:
+            pipe.draft_counter.remove()
+        result["speedup"] = baseline["seconds"] / result["seconds"]
+        result["same_as_baseline"] = sum(a == b for a, b in zip(texts, reference)) / len(prompts)
+        results.append(result)
+
+    for result in results:
+        rate = result["acceptance_rate"]
+        print(
+            f"[BENCH] {result['mode']:>16}: {result['tokens_per_s']:.1f} tok/s, "
+            f"{result['tokens_per_forward']:.2f} tokeni/forward, "
+            f"acceptare {'-' if rate is None else f'{rate:.0%}'}, "
+            f"x{result.get('speedup', 1.0):.2f}, identice {result.get('same_as_baseline', 1.0):.0%}"
+        )
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "prompts": len(prompts), "results": results},
+                  f, ensure_ascii=False, indent=2)
+    print(f"[STATUS] Rezultate scrise in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
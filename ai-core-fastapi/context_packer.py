@@ -0,0 +1,125 @@
+from langchain_core.documents import Document
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+
+def format_context_part(index, source, text):
+    return f"[Sursa {index}: {source}]\n{text}"
+
+
+def _text_overlap(a, b, max_overlap, min_overlap=20):
+    # Cel mai lung sufix al lui `a` care e si prefix al lui `b`
+    for k in range(min(len(a), len(b), max_overlap), min_overlap - 1, -1):
+        if a.endswith(b[:k]):
+            return k
+    return 0
+
+
+def _merge_spans(docs, max_overlap):
+    """Uneste parintii aceleiasi surse care se suprapun (chunk_overlap) sau
+    se contin unul pe altul. Foloseste `start_index` cand exista, altfel
+    cauta suprapunerea direct in text."""
+    if all("start_index" in doc.metadata for doc in docs):
+        spans = []
+        for doc in sorted(docs, key=lambda d: d.metadata["start_index"]):
+            start = doc.metadata["start_index"]
+            end = start + len(doc.page_content)
+            if spans and start <= spans[-1][1]:
+                prev_start, prev_end, prev_text = spans[-1]
+                if end > prev_end:
+                    prev_text += doc.page_content[prev_end - start:]
+                spans[-1] = (prev_start, max(prev_end, end), prev_text)
+            else:
+                spans.append((start, end, doc.page_content))
+        return [text for _, _, text in spans]
+
+    texts = []
+    for doc in docs:
+        text = doc.page_content
+        if any(text in other for other in texts):
+            continue
+        texts = [other for other in texts if other not in text]
+        for i, other in enumerate(texts):
+            k = _text_overlap(other, text, max_overlap)
+            if k:
+                texts[i] = other + text[k:]
+                break
+            k = _text_overlap(text, other, max_overlap)
+            if k:
+                texts[i] = text + other[k:]
+                break
+        else:
+            texts.append(text)
+    return texts
+
+
+class ContextPacker:
+    """Construieste blocul CONTEXT intr-un buget exact de tokeni.
+
+    Parintii din aceeasi sursa sunt uniti (fara portiunile duplicate din
+    chunk_overlap), sursele sunt pastrate in ordinea celui mai bun rezultat,
+    iar continutul se adauga pana la `token_budget` tokeni, masurati cu
+    tokenizer-ul modelului de generare.
+    """
+
+    def __init__(self, tokenizer, token_budget=3000, max_overlap=200, min_tail_tokens=64):
+        self.tokenizer = tokenizer
+        self.token_budget = token_budget
+        self.max_overlap = max_overlap
+        self.min_tail_tokens = min_tail_tokens
+
+    def count_tokens(self, text):
+        return len(self.tokenizer(text, add_special_tokens=False).input_ids)
+
+    def _truncate(self, text, max_tokens):
+        ids = self.tokenizer(text, add_special_tokens=False).input_ids[:max_tokens]
+        return self.tokenizer.decode(ids, skip_special_tokens=True)
+
+    def render(self, docs):
+        return CONTEXT_SEPARATOR.join(
+            format_context_part(i, d.metadata.get("source", "Unknown"), d.page_content)
+            for i, d in enumerate(docs, 1)
+        )
+
+    def pack(self, docs):
+        """Intoarce (documente impachetate, raport). In raport, `dedup_saved_tokens`
+        sunt tokenii scapati prin unirea suprapunerilor, iar `truncated_tokens`
+        cei taiati ca sa se incadreze in buget (context pierdut, nu economisit)."""
+        naive_tokens = self.count_tokens(self.render(docs))
+
+        groups = {}
+        for doc in docs:
+            groups.setdefault(doc.metadata.get("source", "Unknown"), []).append(doc)
+        candidates = [(source, text) for source, group in groups.items()
+                      for text in _merge_spans(group, self.max_overlap)]
+        merged_tokens = self.count_tokens(self.render(
+            [Document(page_content=text, metadata={"source": source}) for source, text in candidates]
+        )) if candidates else 0
+
+        packed = []
+        for source, text in candidates:
+            packed.append(Document(page_content=text, metadata={"source": source}))
+            over = self.count_tokens(self.render(packed)) - self.token_budget
+            if over <= 0:
+                continue
+            # Ultima bucata nu mai incape intreaga: o pastram trunchiata daca
+            # ramane suficient din ea, apoi ne oprim
+            keep = self.count_tokens(text) - over
+            packed.pop()
+            if keep >= self.min_tail_tokens:
+                while keep > 0:
+                    packed.append(Document(page_content=self._truncate(text, keep), metadata={"source": source}))
+                    if self.count_tokens(self.render(packed)) <= self.token_budget:
+                        break
+                    packed.pop()
+                    keep -= 8
+            break
+
+        packed_tokens = self.count_tokens(self.render(packed)) if packed else 0
+        report = {
+            "naive_tokens": naive_tokens,
+            "packed_tokens": packed_tokens,
+            "dedup_saved_tokens": max(0, naive_tokens - merged_tokens),
+            "truncated_tokens": max(0, merged_tokens - packed_tokens),
+        }
+        return packed, report
@@ -0,0 +1,33 @@
+import os
+
+import torch
+
+
+def available_cores():
+    # Respecta limitele de container/taskset, nu doar numarul de core-uri fizice
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def optimize_for_cpu(embeddings, quantization="int8", threads=0):
+    """Pregateste un HuggingFaceEmbeddings pentru rulare pe CPU.
+
+    - thread-urile torch = core-urile disponibile procesului (sau `threads`);
+    - cu quantization="int8", straturile Linear ale encoder-ului trec prin
+      cuantizare dinamica (greutati int8, activari cuantizate la rulare).
+
+    Batch-urile sunt deja sortate dupa lungime de SentenceTransformer.encode,
+    deci padding-ul dintr-un batch ramane minim.
+    """
+    threads = threads or available_cores()
+    torch.set_num_threads(threads)
+    if quantization == "int8":
+        for module in embeddings._client:
+            if hasattr(module, "auto_model"):
+                module.auto_model = torch.ao.quantization.quantize_dynamic(
+                    module.auto_model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+    print(f"[STATUS] Embeddings pe CPU: {threads} thread-uri, cuantizare {quantization or 'fp32'}")
+    return embeddings
@@ -0,0 +1,204 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_KEY_BYTES = 16
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def embedding_key(model_name, text):
+    # Spatiile albe nu schimba sensul chunk-ului, deci nu trebuie sa schimbe nici cheia
+    normalized = _WHITESPACE_RE.sub(" ", text).strip()
+    return hashlib.sha256(f"{model_name}\0{normalized}".encode("utf-8")).digest()[:_KEY_BYTES]
+
+
+class EmbeddingCache:
+    """Cache pe disc cu embedding-urile chunk-urilor, adresat dupa continut.
+
+    Doua fisiere append-only: `vectors.f32` (randuri float32 de dimensiune
+    fixa) si `keys.bin` (cheile de 16 bytes, in aceeasi ordine). La pornire
+    se citesc doar cheile; vectorii se citesc prin memmap, la cerere. Daca o
+    scriere a fost intrerupta, randurile incomplete sunt ignorate.
+
+    Acelasi director poate fi folosit de mai multe procese (serverul care
+    reindexeaza si index_build.py): append-urile se fac sub un flock, iar
+    numarul randului se ia din dimensiunea fisierelor, nu din memorie.
+    """
+
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._keys_path = os.path.join(path, "keys.bin")
+        self._meta_path = os.path.join(path, "meta.json")
+        self._lock_path = os.path.join(path, "lock")
+        self._lock = Lock()
+        self._rows = {}
+        self._n_rows = 0  # randuri complete din fisiere (o cheie poate aparea de doua ori)
+        self._vectors = None
+        self.dim = None
+        # Costul embedding-urilor, cumulat intre rulari pentru estimarea timpului economisit
+        self.embedded_texts = 0
+        self.embed_seconds = 0.0
+        with self._file_lock():
+            self._read_meta()
+            if self.dim is not None:
+                self._sync()
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self._lock_path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_meta(self):
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        self.embedded_texts = meta.get("embedded_texts", 0)
+        self.embed_seconds = meta.get("embed_seconds", 0.0)
+
+    def _sync(self):
+        # Doar sub flock: citeste randurile adaugate de alte procese si
+        # intoarce numarul de randuri complete din fisiere
+        for path in (self._keys_path, self._vectors_path):
+            open(path, "ab").close()
+        n = min(os.path.getsize(self._keys_path) // _KEY_BYTES, os.path.getsize(self._vectors_path) // (4 * self.dim))
+        if os.path.getsize(self._keys_path) != n * _KEY_BYTES or os.path.getsize(self._vectors_path) != n * 4 * self.dim:
+            # Scriere intrerupta: trunchiem la ultimul rand complet, ca append-urile sa ramana aliniate
+            with open(self._keys_path, "r+b") as f:
+                f.truncate(n * _KEY_BYTES)
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(n * 4 * self.dim)
+        known = self._n_rows
+        if n > known:
+            with open(self._keys_path, "rb") as f:
+                f.seek(known * _KEY_BYTES)
+                raw = f.read((n - known) * _KEY_BYTES)
+            for i in range(n - known):
+                self._rows.setdefault(raw[i * _KEY_BYTES:(i + 1) * _KEY_BYTES], known + i)
+        self._n_rows = n
+        return n
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def seconds_per_text(self):
+        return self.embed_seconds / self.embedded_texts if self.embedded_texts else 0.0
+
+    def _save_meta(self):
+        tmp_path = f"{self._meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "embedded_texts": self.embedded_texts, "embed_seconds": self.embed_seconds}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def record_cost(self, seconds, n_texts):
+        # Doar in memorie; se scrie pe disc cu save_stats(), o data per indexare
+        with self._lock:
+            self.embedded_texts += n_texts
+            self.embed_seconds += seconds
+
+    def save_stats(self):
+        with self._lock:
+            if self.dim is not None:
+                with self._file_lock():
+                    self._save_meta()
+
+    def get_many(self, keys):
+        """Intoarce o lista cu vectorul (np.ndarray) sau None pentru fiecare cheie."""
+        with self._lock:
+            rows = [self._rows.get(key) for key in keys]
+            if all(row is None for row in rows):
+                return [None] * len(keys)
+            if self._vectors is None or len(self._vectors) < self._n_rows:
+                self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r",
+                                          shape=(self._n_rows, self.dim))
+            return [np.array(self._vectors[row]) if row is not None else None for row in rows]
+
+    def put_many(self, keys, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock():
+            if self.dim is None:
+                self._read_meta()  # alt proces poate fi scris deja primul vector
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._save_meta()
+            n = self._sync()
+            new = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._rows and key not in new:
+                    new[key] = vector
+            if not new:
+                return
+            # Vectorii se scriu primii: o cheie nu exista niciodata fara vectorul ei
+            with open(self._vectors_path, "ab") as f:
+                np.stack(list(new.values())).tofile(f)
+            with open(self._keys_path, "ab") as f:
+                f.write(b"".join(new))
+            for row, key in enumerate(new, n):
+                self._rows[key] = row
+            self._n_rows = n + len(new)
+
+
+class CachedEmbeddings(Embeddings):
+    """Invelis peste modelul de embedding folosit la indexare: textele deja
+    vazute (sau repetate in acelasi batch) nu mai ajung la model."""
+
+    def __init__(self, embeddings, cache, model_name):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+        self.embed_seconds = 0.0
+
+    def embed_documents(self, texts):
+        keys = [embedding_key(self.model_name, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+        missing = {}
+        for i, (key, vector) in enumerate(zip(keys, vectors)):
+            if vector is None:
+                missing.setdefault(key, i)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            start = time.perf_counter()
+            computed = self.embeddings.embed_documents([texts[i] for i in missing.values()])
+            elapsed = time.perf_counter() - start
+            self.embed_seconds += elapsed
+            self.cache.put_many(list(missing), computed)
+            self.cache.record_cost(elapsed, len(missing))
+            by_key = dict(zip(missing, computed))
+            vectors = [by_key[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+        return [list(map(float, vector)) for vector in vectors]
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    def stats(self):
+        total = self.hits + self.misses
+        per_text = self.embed_seconds / self.misses if self.misses else self.cache.seconds_per_text
+        return {
+            "entries": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "embed_seconds": self.embed_seconds,
+            "seconds_per_text": per_text,
+            # Estimare: fiecare hit ar fi costat cat media unui text embedat acum
+            "seconds_saved": self.hits * per_text,
+        }
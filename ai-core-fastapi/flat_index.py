@@ -0,0 +1,221 @@
+import json
+import os
+import uuid
+from threading import Lock
+
+import numpy as np
+import torch
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+_SCAN_BLOCK = 256  # randuri convertite o data la float32 in modul int8 (blocul ramane in cache-ul CPU)
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def _quantize_int8(matrix):
+    # Cuantizare scalara simetrica per rand: v ~= q * scale / 127
+    scales = np.abs(matrix.astype(np.float32)).max(axis=1)
+    scales[scales == 0] = 1
+    quantized = np.round(matrix.astype(np.float32) / scales[:, None] * 127).astype(np.int8)
+    return quantized, (scales / 127).astype(np.float32)
+
+
+class FlatVectorStore(VectorStore):
+    """Cautare exacta peste embedding-urile chunk-urilor copil, fara baza de date.
+
+    Vectorii (normalizati) stau intr-o matrice float16 pe disc, deschisa cu
+    np.memmap: mai multe procese care deschid acelasi index impart paginile
+    prin page cache. Top-k = un singur produs matrice-vector + argpartition.
+    Optional (`quantization="int8"`), scanarea se face pe o copie int8 a
+    matricei, iar cei mai buni `rescore_factor * k` candidati se rescoreaza
+    cu vectorii float16.
+
+    Fiecare `save()` scrie o generatie noua de fisiere si muta pointerul
+    CURRENT atomic; cititorii deja deschisi raman pe generatia lor.
+    """
+
+    def __init__(self, path, embedding_function, quantization=None, read_only=False, rescore_factor=4):
+        self.path = path
+        self._embedding = embedding_function
+        self.quantization = quantization
+        self.read_only = read_only
+        self.rescore_factor = rescore_factor
+        self._lock = Lock()
+        self._ids, self._texts, self._metadatas = [], [], []
+        self._row = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._matrix = None
+        self._pending = []
+        self._int8 = None
+        self._scales = None
+        self.generation = None
+        if not read_only:
+            os.makedirs(path, exist_ok=True)
+        self._open()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}-{self.generation}")
+
+    def _open(self):
+        current = os.path.join(self.path, "CURRENT")
+        if not os.path.exists(current):
+            return
+        with open(current, "r", encoding="utf-8") as f:
+            self.generation = f.read().strip()
+        with open(self._file("meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self._ids, self._texts, self._metadatas = meta["ids"], meta["texts"], meta["metadatas"]
+        self._row = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        self._alive = np.ones(len(self._ids), dtype=bool)
+        shape = (len(self._ids), meta["dim"])
+        if not self._ids:
+            return
+        # "c" = copy-on-write: paginile raman partajate cu celelalte procese
+        self._matrix = np.memmap(self._file("vectors.f16"), dtype=np.float16, mode="c", shape=shape)
+        if not self.read_only:
+            self._matrix = np.array(self._matrix)
+        if self.quantization == "int8" and os.path.exists(self._file("vectors.i8")):
+            self._int8 = np.memmap(self._file("vectors.i8"), dtype=np.int8, mode="c", shape=shape)
+            self._scales = np.fromfile(self._file("scales.f32"), dtype=np.float32)
+
+    def _consolidate(self):
+        if not self._pending:
+            return
+        blocks = ([self._matrix] if self._matrix is not None else []) + self._pending
+        self._matrix = np.concatenate(blocks).astype(np.float16)
+        self._pending = []
+        if self.quantization == "int8":
+            self._int8, self._scales = _quantize_int8(self._matrix)
+
+    def __len__(self):
+        return int(self._alive.sum())
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        return self.add_embeddings(texts, self._embedding.embed_documents(texts), metadatas, ids)
+
+    def add_embeddings(self, texts, embeddings, metadatas=None, ids=None):
+        """Adauga vectori deja calculati (ex. copiati din colectia Chroma)."""
+        if self.read_only:
+            raise RuntimeError("Indexul este deschis doar pentru citire.")
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = _normalize(embeddings).astype(np.float16)
+        with self._lock:
+            self.delete(ids)  # add cu un id existent = inlocuire
+            for doc_id, text, metadata in zip(ids, texts, metadatas):
+                self._row[doc_id] = len(self._ids)
+                self._ids.append(doc_id)
+                self._texts.append(text)
+                self._metadatas.append(metadata)
+            self._alive = np.concatenate([self._alive, np.ones(len(texts), dtype=bool)])
+            self._pending.append(vectors)
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        if self.read_only:
+            raise RuntimeError("Indexul este deschis doar pentru citire.")
+        for doc_id in ids or []:
+            row = self._row.pop(doc_id, None)
+            if row is not None:
+                self._alive[row] = False
+        return True
+
+    def _scores(self, query, rows=None):
+        matrix = self._matrix if rows is None else self._matrix[rows]
+        return (torch.from_numpy(np.ascontiguousarray(matrix)) @ torch.from_numpy(query.astype(np.float16))).float().numpy()
+
+    def _scan_int8(self, query):
+        scores = np.empty(self._int8.shape[0], dtype=np.float32)
+        for start in range(0, self._int8.shape[0], _SCAN_BLOCK):
+            block = self._int8[start:start + _SCAN_BLOCK].astype(np.float32)
+            scores[start:start + _SCAN_BLOCK] = block @ query
+        return scores * self._scales
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        query = _normalize(embedding)
+        with self._lock:
+            self._consolidate()
+            if self._matrix is None or not self._alive.any():
+                return []
+            k = min(k, int(self._alive.sum()))
+            if self._int8 is not None:
+                approx = self._scan_int8(query)
+                approx[~self._alive] = -np.inf
+                n_candidates = min(len(approx), k * self.rescore_factor)
+                candidates = np.argpartition(-approx, n_candidates - 1)[:n_candidates]
+                candidates = candidates[np.isfinite(approx[candidates])]
+                exact = self._scores(query, np.sort(candidates))
+                order = np.argsort(-exact)[:k]
+                rows, scores = np.sort(candidates)[order], exact[order]
+            else:
+                scores = self._scores(query)
+                scores[~self._alive] = -np.inf
+                rows = np.argpartition(-scores, k - 1)[:k]
+                rows = rows[np.argsort(-scores[rows])]
+                scores = scores[rows]
+            return [
+                (Document(page_content=self._texts[row], metadata=dict(self._metadatas[row]), id=self._ids[row]), float(score))
+                for row, score in zip(rows, scores)
+            ]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k=k, **kwargs)]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k=k, **kwargs)
+
+    def save(self):
+        """Compacteaza (elimina randurile sterse) si scrie o generatie noua."""
+        if self.read_only:
+            return
+        with self._lock:
+            self._consolidate()
+            keep = np.nonzero(self._alive)[0]
+            matrix = self._matrix[keep] if self._matrix is not None else np.zeros((0, 0), dtype=np.float16)
+            self._ids = [self._ids[i] for i in keep]
+            self._texts = [self._texts[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._row = {doc_id: i for i, doc_id in enumerate(self._ids)}
+            self._alive = np.ones(len(keep), dtype=bool)
+            self._matrix = matrix if len(keep) else None
+
+            old_generation = self.generation
+            self.generation = uuid.uuid4().hex[:12]
+            matrix.astype(np.float16).tofile(self._file("vectors.f16"))
+            if self.quantization == "int8" and len(keep):
+                self._int8, self._scales = _quantize_int8(matrix)
+                self._int8.tofile(self._file("vectors.i8"))
+                self._scales.tofile(self._file("scales.f32"))
+            with open(self._file("meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"ids": self._ids, "texts": self._texts, "metadatas": self._metadatas,
+                           "dim": int(matrix.shape[1]) if matrix.size else 0}, f, ensure_ascii=False)
+            tmp = os.path.join(self.path, "CURRENT.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.generation)
+            os.replace(tmp, os.path.join(self.path, "CURRENT"))
+
+            # Pe Linux, procesele care au deja fisierele mapate le pastreaza pana le inchid
+            if old_generation:
+                for name in ("vectors.f16", "vectors.i8", "scales.f32", "meta.json"):
+                    old = os.path.join(self.path, f"{name}-{old_generation}")
+                    if os.path.exists(old):
+                        os.remove(old)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, path="./flat_index", **kwargs):
+        store = cls(path, embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        store.save()
+        return store
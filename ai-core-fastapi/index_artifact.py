@@ -0,0 +1,57 @@
+import json
+import os
+import shutil
+
+ARTIFACT_POINTER = "CURRENT"
+ARTIFACT_INFO = "artifact.json"
+
+
+def current_artifact(root):
+    """Calea versiunii publicate in `root`, sau None daca nu exista inca una."""
+    pointer = os.path.join(root, ARTIFACT_POINTER)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, "r", encoding="utf-8") as f:
+        version = f.read().strip()
+    path = os.path.join(root, version)
+    return path if os.path.isdir(path) else None
+
+
+def read_info(path):
+    with open(os.path.join(path, ARTIFACT_INFO), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_info(path, info):
+    with open(os.path.join(path, ARTIFACT_INFO), "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+
+
+def publish(root, version):
+    # Pointerul se inlocuieste atomic: un server care porneste vede fie
+    # versiunea veche, fie pe cea noua, niciodata un director pe jumatate scris
+    tmp_path = os.path.join(root, ARTIFACT_POINTER + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root, ARTIFACT_POINTER))
+
+
+def list_versions(root):
+    """Versiunile din `root`, de la cea mai veche la cea mai noua."""
+    infos = [os.path.join(root, name, ARTIFACT_INFO) for name in os.listdir(root) if not name.startswith(".")]
+    return [os.path.basename(os.path.dirname(info))
+            for info in sorted((i for i in infos if os.path.exists(i)), key=os.path.getmtime)]
+
+
+def prune(root, keep):
+    """Sterge versiunile vechi, pastrand ultimele `keep` si pe cea curenta."""
+    current = current_artifact(root)
+    versions = list_versions(root)
+    removed = []
+    for name in versions[:max(0, len(versions) - keep)]:
+        path = os.path.join(root, name)
+        if current and os.path.samefile(path, current):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(name)
+    return removed
@@ -0,0 +1,98 @@
+"""Construieste offline un artefact de index versionat din DATA_FOLDER.
+
+Artefactul (vectorii copil, parent store, BM25, manifest) se scrie intr-un
+director temporar, apoi se redenumeste in `<out>/<versiune>` si devine
+curent prin inlocuirea atomica a fisierului `<out>/CURRENT`. Serverul
+(cu INDEX_ARTIFACT_DIR=<out>) deschide doar versiunea curenta, read-only.
+
+Implicit se porneste de la copia ultimei versiuni, deci se embedeaza doar
+fisierele modificate.
+
+    python index_build.py --out ./index_artifacts --data ./data_facultate --keep 3
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import time
+import uuid
+
+from index_artifact import current_artifact, list_versions, prune, publish, write_info
+from index_manifest import hash_text
+from rag_pipeline import DATA_FOLDER, close_vectorstore, get_retriever, index_config, index_documents, load_manifest
+
+
+def build_artifact(out_dir, data_folder=DATA_FOLDER, keep=3, full=False):
+    """Intoarce calea versiunii publicate (sau a celei curente, daca nu s-a schimbat nimic).
+
+    Daca vreun fisier nu s-a putut indexa, nu se publica nimic (RuntimeError):
+    artefactul ar servi in tacere un corpus incomplet."""
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    previous = current_artifact(out_dir)
+    staging = os.path.join(out_dir, f".building-{uuid.uuid4().hex[:8]}")
+    try:
+        if previous and not full:
+            print(f"[BUILD] Pornesc de la {os.path.basename(previous)}")
+            shutil.copytree(previous, staging)
+        retriever = get_retriever(staging)
+        report = index_documents(retriever, data_folder)
+        if report["failed"]:
+            raise RuntimeError(
+                f"Indexarea a esuat pentru {len(report['failed'])} fisiere "
+                f"({', '.join(report['failed'][:5])}); artefactul nu se publica."
+            )
+        manifest = load_manifest(staging)
+        if manifest is None or not manifest.sources():
+            raise RuntimeError(f"Nu s-a indexat niciun fisier din {data_folder}.")
+
+        if previous and not full and not (report["added"] or report["changed"] or report["removed"]):
+            print(f"[BUILD] Corpus neschimbat, ramane {os.path.basename(previous)}.")
+            shutil.rmtree(staging, ignore_errors=True)
+            return previous
+
+        retriever.docstore.store.finalize()
+        retriever.docstore.store.close()
+        # Chroma tine deschise fisierele din staging pana dispare clientul
+        close_vectorstore(retriever.vectorstore)
+        del retriever
+        gc.collect()
+        content = hash_text(json.dumps(
+            {source: entry["sha256"] for source, entry in manifest.files.items()}, sort_keys=True
+        ))
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{content[:8]}"
+        write_info(staging, {
+            "version": version,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": index_config(),
+            "files": len(manifest.sources()),
+            "report": report,
+        })
+        path = os.path.join(out_dir, version)
+        os.rename(staging, path)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    publish(out_dir, version)
+    removed = prune(out_dir, keep)
+    print(
+        f"[BUILD] Artefact {version} publicat in {time.perf_counter() - start:.1f}s "
+        f"({len(list_versions(out_dir))} versiuni pastrate, {len(removed)} sterse)."
+    )
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=os.environ.get("INDEX_ARTIFACT_DIR") or "./index_artifacts")
+    parser.add_argument("--data", default=DATA_FOLDER)
+    parser.add_argument("--keep", type=int, default=3, help="cate versiuni vechi se pastreaza")
+    parser.add_argument("--full", action="store_true", help="reconstruieste de la zero, fara versiunea anterioara")
+    args = parser.parse_args()
+    build_artifact(args.out, args.data, keep=args.keep, full=args.full)
+
+
+if __name__ == "__main__":
+    main()
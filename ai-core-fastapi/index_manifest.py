@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_file(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def parent_id(source, content_hash, occurrence=0):
+    # Id determinist: acelasi fisier + acelasi continut => acelasi id, deci
+    # un chunk nemodificat nu mai trebuie re-embedat.
+    return hash_text(f"{source}\0{content_hash}\0{occurrence}")[:32]
+
+
+def child_id(parent, index):
+    return f"{parent}-{index}"
+
+
+class IndexManifest:
+    """Starea persistata a indexului: hash-ul fiecarui fisier sursa si
+    chunk-urile parinte/copil generate din el.
+
+    files = {source: {"sha256": ..., "parents": [{"id", "hash", "children"}]}}
+    """
+
+    def __init__(self, path, config, files=None):
+        self.path = path
+        self.config = config
+        self.files = files or {}
+
+    @classmethod
+    def load(cls, path, config):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Manifest corupt ({path}): {e}")
+            return None
+        if data.get("version") != MANIFEST_VERSION or data.get("config") != config:
+            print("[STATUS] Configuratia indexului s-a schimbat, e nevoie de reindexare completa.")
+            return None
+        return cls(path, config, data.get("files", {}))
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": MANIFEST_VERSION, "config": self.config, "files": self.files},
+                f, ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
+
+    def file_hash(self, source):
+        entry = self.files.get(source)
+        return entry["sha256"] if entry else None
+
+    def parents(self, source):
+        entry = self.files.get(source)
+        return {p["id"]: p for p in entry["parents"]} if entry else {}
+
+    def set_file(self, source, sha256, parents):
+        self.files[source] = {"sha256": sha256, "parents": parents}
+
+    def remove_file(self, source):
+        self.files.pop(source, None)
+
+    def sources(self):
+        return set(self.files)
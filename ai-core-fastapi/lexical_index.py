@@ -0,0 +1,127 @@
+import heapq
+import json
+import math
+import os
+import re
+import unicodedata
+from threading import Lock
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Cuvinte foarte frecvente care nu ajuta la potrivirea exacta (deja fara diacritice)
+STOPWORDS = frozenset("""
+a ai al ale am ca care ce cu cum de din e este fi in la le lui mai ne nu o pe pentru
+sa se si sunt un una unei unui sau iar despre cand unde cine cat
+""".split())
+
+
+def fold_text(text):
+    # ș/ş, ț/ţ, ă/â/î -> s, t, a, a, i; plus lowercase
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall(fold_text(text)) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Index invers BM25 in memorie peste chunk-urile copil.
+
+    Fiecare document are un id (id-ul chunk-ului copil) si id-ul parintelui,
+    ca rezultatele sa poata fi fuzionate cu cele din Chroma. Se poate
+    actualiza incremental (add/remove) si se salveaza ca JSON langa baza de date.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = Lock()
+        self._docs = {}  # doc_id -> (parent_id, length, {term: tf})
+        self._postings = {}  # term -> {doc_id: tf}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _add(self, doc_id, parent, terms):
+        self._docs[doc_id] = (parent, sum(terms.values()), terms)
+        self._total_length += sum(terms.values())
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def _remove(self, doc_id):
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        _, length, terms = entry
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def add(self, items):
+        """items: iterabil de (doc_id, parent_id, text)."""
+        with self._lock:
+            for doc_id, parent, text in items:
+                self._remove(doc_id)
+                terms = {}
+                for token in tokenize(text):
+                    terms[token] = terms.get(token, 0) + 1
+                self._add(doc_id, parent, terms)
+
+    def remove(self, doc_ids):
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+
+    def search(self, query, k=10):
+        """Intoarce [(doc_id, parent_id, scor)] ordonate descrescator."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._docs)
+            if not n or not terms:
+                return []
+            avg_length = self._total_length / n
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    length = self._docs[doc_id][1]
+                    norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(doc_id, self._docs[doc_id][0], score) for doc_id, score in best]
+
+    def save(self, path):
+        with self._lock:
+            data = {doc_id: [parent, terms] for doc_id, (parent, _, terms) in self._docs.items()}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for doc_id, (parent, terms) in data.items():
+            index._add(doc_id, parent, terms)
+        return index
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuzioneaza mai multe liste ordonate de id-uri (RRF). Intoarce id-urile
+    ordonate dupa scorul combinat."""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
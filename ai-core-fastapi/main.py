@@ -1,35 +1,639 @@
-from fastapi import FastAPI, Body
-from pydantic import BaseModel
-from rag_pipeline import init_rag, query_rag
+from fastapi import FastAPI, Body, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from pydantic import BaseModel, StringConstraints, ValidationError
+from rag_pipeline import (
+    init_rag, retrieve_stage, generate_stage, finish_query, load_context_packer, load_generation_worker,
+    retrieval_only_answer, retrieve_batch, parse_questions, batch_line, reindex, BATCH_QUERY_SIZE,
+    semantic_cache, exact_cache, context_tokens_saved, context_tokens_truncated, context_tokens,
+)
+from answer_cache import SingleFlight, StreamFanout, normalize_query
+from batching import AdmissionControl, BatchScheduler, Cancellation, RequestCancelled, StagePool, chain_future
+from replicas import GenerationReplicas, ReplicaUnavailable, StubGenerator
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from functools import partial
+from threading import Lock, Thread
+from typing import Annotated
+from metrics import (
+    RollingStats, StartupTimeline, CacheCollector, STAGE, degraded_responses, dropped_requests, errors, record_generation,
+)
+from streaming import sse_event
+from tracing import Trace, use_trace
+from profiler import ProfilerBusy, sample_profile
+import asyncio
+import json
+import os
+import queue
+import time
 import uvicorn
 import torch
 app = FastAPI()
 
-from threading import Lock
-rag_lock = Lock()
+RETRIEVAL_WORKERS = int(os.environ.get("RETRIEVAL_WORKERS", "2"))
+RETRIEVAL_QUEUE_SIZE = int(os.environ.get("RETRIEVAL_QUEUE_SIZE", "64"))
+GENERATION_QUEUE_SIZE = int(os.environ.get("GENERATION_QUEUE_SIZE", "16"))
+GENERATION_MAX_BATCH_SIZE = int(os.environ.get("GENERATION_MAX_BATCH_SIZE", "4"))
+GENERATION_MAX_WAIT_MS = int(os.environ.get("GENERATION_MAX_WAIT_MS", "30"))
+GENERATION_REPLICAS = int(os.environ.get("GENERATION_REPLICAS", "0"))  # 0 = modelul ruleaza in procesul serverului
+GENERATION_BACKEND = os.environ.get("GENERATION_BACKEND", "model")  # model | stub (replici fara model, pentru teste)
+GENERATION_REPLICA_GPUS = [gpu for gpu in os.environ.get("GENERATION_REPLICA_GPUS", "").split(",") if gpu]
+GENERATION_STALL_TIMEOUT_S = float(os.environ.get("GENERATION_STALL_TIMEOUT_S", "300"))  # replica fara niciun token atata timp: repornita
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")  # fara el, endpoint-urile /admin sunt dezactivate
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "./profiles")
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "60"))
+MAX_ACTIVE_REQUESTS = int(os.environ.get("MAX_ACTIVE_REQUESTS", "32"))  # peste atatea cereri in lucru: 429; 0 = fara limita
+DEGRADED_MODE = os.environ.get("DEGRADED_MODE", "0") == "1"  # peste limita: raspuns doar din retrieval in loc de 429
+REQUEST_TIMEOUT_S = float(os.environ.get("REQUEST_TIMEOUT_S", "120"))  # termen implicit per cerere; 0 = fara termen
+BATCH_MAX_QUERIES = int(os.environ.get("BATCH_MAX_QUERIES", "256"))  # intrebari acceptate intr-o cerere /query/batch
+BATCH_INFLIGHT = int(os.environ.get("BATCH_INFLIGHT", "2"))  # intrebari ale unei cereri /query/batch trimise deodata la generare
+BATCH_POLL_S = 0.05  # cat de des reincearca /query/batch sa trimita la generare cand asteapta cererile interactive
+DISCONNECT_POLL_S = 0.5  # cat de des verifica /query daca clientul mai asteapta raspunsul
+
+inflight = SingleFlight()
+streams = StreamFanout()
+admission = AdmissionControl(MAX_ACTIVE_REQUESTS)
+time_to_first_token = RollingStats()
+reindex_lock = Lock()
 
 retriever = None
 pipe = None
+context_packer = None
+startup_timeline = StartupTimeline()
+init_state = {"status": "starting"}  # starting | ready | failed
 
 class QueryRequest(BaseModel):
     query: str
+    debug: bool = False  # include trace-ul cererii (span-urile) in raspuns
+    timeout_s: float | None = None  # termenul cererii (ex. timeout-ul backend-ului Java); implicit REQUEST_TIMEOUT_S
 
-@app.on_event("startup")
-def startup():
-    global retriever, pipe
-    retriever, pipe = init_rag()
+class BatchQueryRequest(BaseModel):
+    queries: list[Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]]
+
+def _retrieve(job):
+    # Etapa 1 (thread-urile de retrieval): embedding, cautare, prompt.
+    # Cererile care au nevoie de LLM trec in coada de generare; daca e plina,
+    # worker-ul asteapta (backpressure) in loc sa accepte mai multa munca.
+    query, listener, trace, cancel, retrieval_only = job
+    trace.wait("retrieval_queue")
+    if cancel.is_cancelled():
+        raise RequestCancelled(cancel.reason)
+    with use_trace(trace):
+        prepared = retrieve_stage(query, retriever, listener, context_packer)
+    if "prompt" not in prepared:
+        return prepared
+    if retrieval_only:
+        degraded_responses.inc()
+        result = retrieval_only_answer(prepared)
+        if listener:
+            listener("token", result["answer"])
+        return result
+    prepared["trace"] = trace
+    prepared["cancel"] = cancel
+    return _start_generation(prepared, listener)
+
+def _start_generation(prepared, listener):
+    """Trimite un prompt pregatit (cu "trace" si "cancel") la generare, in
+    proces sau la replici; intoarce un Future cu rezultatul final."""
+    trace, cancel = prepared["trace"], prepared["cancel"]
+    if replicas is not None:
+        on_token = (lambda text: listener("token", text)) if listener else None
+        try:
+            generated = replicas.submit(prepared["prompt"], on_token)
+        except ReplicaUnavailable as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        cancel.on_cancel(generated.cancel)
+        submitted = time.perf_counter()
+
+        def finish(text):
+            # Coada si generarea din replica nu se pot separa de aici
+            trace.add("generation", submitted, time.perf_counter())
+            # finish_query (cache-ul semantic) ruleaza aici, nu in procesul replicii
+            return finish_query(prepared, text)
+
+        done = Future()
+        chain_future(generated, done, finish)
+        return done
+    generated = generation.submit((prepared, listener))
+    # Cat timp e in coada, cererea anulata nu mai ajunge in batch; dupa, o opreste generate_stage
+    cancel.on_cancel(generated.cancel)
+    return generated
+
+def _generate(jobs):
+    # Etapa 2 (thread-ul de generare): un singur generate pentru tot batch-ul
+    return generate_stage(jobs, pipe)
+
+# Cat timp cererea N se genereaza, cererile N+1..N+k au deja contextul pregatit
+retrieval = StagePool(_retrieve, workers=RETRIEVAL_WORKERS, max_queue=RETRIEVAL_QUEUE_SIZE, name="retrieval",
+                      observe_wait=STAGE["retrieval_queue"].observe)
+generation = BatchScheduler(
+    _generate, max_batch_size=GENERATION_MAX_BATCH_SIZE, max_wait_ms=GENERATION_MAX_WAIT_MS,
+    max_queue=GENERATION_QUEUE_SIZE, name="generation", observe_wait=STAGE["generation_queue"].observe,
+)
+
+def _generator_factory():
+    if GENERATION_BACKEND == "stub":
+        return partial(StubGenerator, token_delay=float(os.environ.get("STUB_TOKEN_DELAY", "0.02")))
+    return load_generation_worker
+
+# Cu GENERATION_REPLICAS > 0, fiecare replica e un proces separat cu propriul model
+replicas = GenerationReplicas(
+    _generator_factory(), replicas=GENERATION_REPLICAS, max_batch_size=GENERATION_MAX_BATCH_SIZE,
+    max_wait_ms=GENERATION_MAX_WAIT_MS, devices=GENERATION_REPLICA_GPUS, stall_timeout=GENERATION_STALL_TIMEOUT_S,
+    name="generation", on_stats=record_generation,
+) if GENERATION_REPLICAS else None
+
+def _cache_counts(get_cache, hits="hits", misses="misses"):
+    def counts():
+        cache = get_cache()
+        return (getattr(cache, hits), getattr(cache, misses)) if cache is not None else None
+    return counts
+
+# Contoarele cache-urilor se citesc doar cand Prometheus face scrape
+REGISTRY.register(CacheCollector({
+    "exact": _cache_counts(lambda: exact_cache),
+    "semantic": _cache_counts(lambda: semantic_cache),
+    "docstore": _cache_counts(lambda: retriever.docstore if retriever else None),
+    "query_embedding": _cache_counts(lambda: retriever.query_embedder if retriever else None,
+                                     "cache_hits", "cache_misses"),
+    "reranker": _cache_counts(lambda: retriever.reranker if retriever else None, "cache_hits", "cache_misses"),
+}))
+
+def _ready():
+    if replicas is not None:
+        return retriever is not None and replicas.ready()
+    return retriever is not None and pipe is not None
+
+def _initialize():
+    global retriever, pipe, context_packer
+    # Cu replici, modelul se incarca in procesele lor; aici ramane doar tokenizer-ul
+    loaded_retriever, loaded_pipe = init_rag(startup_timeline, load_model=replicas is None)
+    if not loaded_retriever or (replicas is None and not loaded_pipe):
+        init_state["status"] = "failed"
+        return
+    if loaded_pipe is not None:
+        context_packer = loaded_pipe.context_packer
+    elif GENERATION_BACKEND != "stub":
+        with startup_timeline.phase("tokenizer"):
+            context_packer = load_context_packer()
+    retriever, pipe = loaded_retriever, loaded_pipe
+    init_state["status"] = "ready"
     import gc
     gc.collect()
     torch.cuda.empty_cache()
 
+@app.on_event("startup")
+def startup():
+    retrieval.start()
+    if replicas is not None:
+        # Replicile isi incarca modelul in paralel cu indexul
+        replicas.start()
+    else:
+        generation.start()
+    # Serverul accepta conexiuni imediat; indexul si modelul se incarca in fundal,
+    # iar /ready spune cand pot fi trimise intrebari
+    Thread(target=_initialize, name="init", daemon=True).start()
+
+@app.on_event("shutdown")
+def shutdown():
+    if replicas is not None:
+        replicas.stop()
+
+@app.get("/health")
+def health_endpoint():
+    # Liveness: procesul raspunde, indiferent daca initializarea s-a terminat
+    return {"status": "ok", "uptime_s": time.monotonic() - startup_timeline.started}
+
+@app.get("/ready")
+def ready_endpoint():
+    body = {"status": init_state["status"], "timeline": startup_timeline.summary()}
+    if replicas is not None:
+        body["replicas"] = replicas.stats()["replicas"]
+    return JSONResponse(body, status_code=200 if _ready() else 503)
+
+NOT_READY_ANSWER = "Serverul nu este inițializat corect."
+
+def _submit(query, listener, trace, cancel, retrieval_only=False):
+    """Trimite cererea prin cele doua etape; intoarce un Future cu rezultatul final.
+    Cu `retrieval_only`, raspunsul e construit din documente, fara generare."""
+    trace.mark()
+    try:
+        retrieved = retrieval.submit((query, listener, trace, cancel, retrieval_only), block=False)
+    except queue.Full:
+        dropped_requests.labels("queue_full").inc()
+        raise HTTPException(status_code=503, detail="Serverul este ocupat. Încercați din nou.")
+    cancel.on_cancel(retrieved.cancel)
+
+    done = Future()
+
+    def on_retrieved(future):
+        if not future.cancelled() and future.exception() is None and isinstance(future.result(), Future):
+            chain_future(future.result(), done)
+        else:
+            chain_future(future, done)
+
+    retrieved.add_done_callback(on_retrieved)
+    return done
+
+async def _stream_query(query, trace, cancel):
+    """Genereaza evenimentele unei cereri: ("sources", [...]), apoi ("token", text)
+    pe masura ce raspunsul e generat si la final ("done", {"answer", "sources"}).
+    Span-urile cererii se aduna in `trace`.
+
+    Peste MAX_ACTIVE_REQUESTS cereri in lucru, cererea e respinsa cu 429 (sau, cu
+    DEGRADED_MODE, primeste doar rezultatele retrieval-ului). La termenul din
+    `cancel` se opreste cu 504; daca stream-ul e inchis inainte de final
+    (clientul a plecat), cererea e anulata si generarea ei se opreste."""
+    start = time.perf_counter()
+    key = normalize_query(query)
+    cached = exact_cache.get(key)
+    if cached is not None:
+        answer, sources = cached
+        trace.annotate(cache="exact")
+        yield "sources", sorted(sources)
+        time_to_first_token.observe(time.perf_counter() - start)
+        yield "token", answer
+        yield "done", {"answer": answer, "sources": sorted(sources)}
+        STAGE["total"].observe(time.perf_counter() - start)
+        trace.finish()
+        return
+
+    admitted = admission.try_acquire()
+    if not admitted and not DEGRADED_MODE:
+        dropped_requests.labels("overloaded").inc()
+        raise HTTPException(status_code=429, detail="Prea multe cereri în lucru. Încercați din nou.",
+                            headers={"Retry-After": "1"})
+
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def listener(event, data):
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    finished = False
+    try:
+        future = _submit(query, listener, trace, cancel, retrieval_only=not admitted)
+        # Toate evenimentele unei cereri sunt puse inaintea rezultatului final
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(events.put_nowait, ("done", None)))
+
+        first_token = True
+        while True:
+            try:
+                event, data = await asyncio.wait_for(events.get(), cancel.remaining())
+            except asyncio.TimeoutError:
+                cancel.cancel("deadline")
+                event, data = "done", None
+            if event == "done":
+                if cancel.reason is not None:
+                    # Raspunsul nu mai e asteptat sau a fost taiat la jumatate
+                    if cancel.reason == "deadline":
+                        dropped_requests.labels("deadline").inc()
+                    raise HTTPException(status_code=504, detail="Cererea a depășit timpul limită.")
+                try:
+                    result = future.result()
+                except Exception:
+                    errors.labels("request").inc()
+                    raise
+                # Raspunsurile fara surse (intrebare goala, fara context) si cele degradate nu se memoreaza
+                if result["sources"] and not result.get("degraded"):
+                    exact_cache.put(key, result["answer"], result["sources"])
+                STAGE["total"].observe(time.perf_counter() - start)
+                trace.finish()
+                finished = True
+                yield "done", result
+                return
+            if event == "token" and first_token:
+                first_token = False
+                time_to_first_token.observe(time.perf_counter() - start)
+                trace.annotate(time_to_first_token_ms=(time.perf_counter() - start) * 1000)
+            yield event, data
+    except (GeneratorExit, asyncio.CancelledError):
+        if not finished and cancel.reason is None:
+            cancel.cancel("disconnect")
+            dropped_requests.labels("disconnect").inc()
+        raise
+    finally:
+        if admitted:
+            admission.release()
+
+async def _shared_stream(query, trace, cancel):
+    """_stream_query pentru /query/stream: cererile identice aflate in lucru
+    primesc evenimentele aceleiasi executii (StreamFanout). Fiecare client are
+    propriul termen (`cancel`); executia comuna se opreste doar cand au plecat
+    toti clientii."""
+    leader = []
+
+    def start():
+        leader.append(True)
+        shared = Cancellation()
+        return _stream_query(query, trace, shared), lambda: shared.cancel("disconnect")
+
+    stream = streams.subscribe(normalize_query(query), start, cancel.remaining)
+    try:
+        async for event in stream:
+            yield event
+    except TimeoutError:
+        cancel.cancel("deadline")
+        dropped_requests.labels("deadline").inc()
+        raise HTTPException(status_code=504, detail="Cererea a depășit timpul limită.")
+    except (GeneratorExit, asyncio.CancelledError):
+        if cancel.reason is None:
+            cancel.cancel("disconnect")
+            dropped_requests.labels("disconnect").inc()
+        raise
+    finally:
+        await stream.aclose()
+        if not leader:
+            # Span-urile sunt in trace-ul cererii care a pornit executia
+            trace.annotate(shared=True)
+            trace.finish()
+
+async def _collect(query, trace, cancel):
+    stream = _stream_query(query, trace, cancel)
+    try:
+        async for event, data in stream:
+            if event == "done":
+                return data
+    finally:
+        # Elibereaza imediat locul din AdmissionControl, nu la garbage collection
+        await stream.aclose()
+
+async def _cancel_on_disconnect(request, cancel, key):
+    # Un endpoint care nu face streaming nu e oprit cand clientul se deconecteaza
+    while not cancel.is_cancelled():
+        if await request.is_disconnected():
+            # Alte cereri identice (SingleFlight) pot astepta aceeasi generare
+            if not inflight.waiting(key):
+                cancel.cancel("disconnect")
+                dropped_requests.labels("disconnect").inc()
+            return
+        await asyncio.sleep(DISCONNECT_POLL_S)
+
+def _cancellation(timeout_s):
+    return Cancellation(timeout_s if timeout_s is not None else REQUEST_TIMEOUT_S)
+
 @app.post("/query")
-def query_endpoint(payload: QueryRequest):
-    with rag_lock:
-        if not retriever or not pipe:
-            return {"answer": "Serverul nu este inițializat corect."}
-        
-        raspuns = query_rag(payload.query, retriever, pipe)
-        return {"answer": raspuns}
+async def query_endpoint(payload: QueryRequest, request: Request, x_trace_id: str | None = Header(default=None)):
+    # Backend-ul Java poate trimite propriul ID, ca sa corelam logurile
+    trace = Trace(x_trace_id)
+    headers = {"X-Trace-Id": trace.trace_id}
+    if not _ready():
+        return JSONResponse({"answer": NOT_READY_ANSWER}, headers=headers)
+
+    cancel = _cancellation(payload.timeout_s)
+    key = normalize_query(payload.query)
+    watcher = asyncio.create_task(_cancel_on_disconnect(request, cancel, key))
+    try:
+        # Intrebarile identice venite simultan impart o singura generare
+        result = await inflight.do_async(key, lambda: _collect(payload.query, trace, cancel))
+    finally:
+        watcher.cancel()
+    body = {"answer": result["answer"]}
+    if result.get("degraded"):
+        body["degraded"] = True
+    if payload.debug:
+        if trace.end is None:
+            # A asteptat generarea altei cereri identice (SingleFlight)
+            trace.annotate(shared=True)
+            trace.finish()
+        body["trace"] = trace.to_dict()
+    return JSONResponse(body, headers=headers)
+
+def _sse_response(query, debug=False, trace_id=None, timeout_s=None):
+    trace = Trace(trace_id)
+
+    async def events():
+        if not _ready():
+            yield sse_event("done", {"answer": NOT_READY_ANSWER, "sources": []})
+            return
+        stream = _shared_stream(query, trace, _cancellation(timeout_s))
+        try:
+            async for event, data in stream:
+                yield sse_event(event, data)
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            status = e.status_code if isinstance(e, HTTPException) else 500
+            yield sse_event("error", {"detail": detail, "status": status})
+        finally:
+            # La deconectare, anuleaza cererea acum, nu la garbage collection
+            await stream.aclose()
+        if debug:
+            yield sse_event("trace", trace.to_dict())
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Trace-Id": trace.trace_id},
+    )
+
+@app.post("/query/stream")
+async def query_stream_endpoint(payload: QueryRequest, x_trace_id: str | None = Header(default=None)):
+    return _sse_response(payload.query, payload.debug, x_trace_id, payload.timeout_s)
+
+@app.get("/query/stream")
+async def query_stream_get_endpoint(query: str, debug: bool = False, timeout_s: float | None = None):
+    # Varianta GET pentru EventSource din browser
+    return _sse_response(query, debug, timeout_s=timeout_s)
+
+def _batch_generation(prepared, cancel):
+    # Future-ul unei intrebari din /query/batch; timings.generation_s include si coada
+    future = Future()
+    if isinstance(prepared, Exception):
+        future.set_exception(prepared)
+        return future
+    if "prompt" not in prepared:
+        future.set_result(prepared)
+        return future
+    prepared["trace"], prepared["cancel"] = Trace(), cancel
+    prepared["trace"].mark()
+    submitted = time.perf_counter()
+    try:
+        future = _start_generation(prepared, None)
+    except Exception as e:
+        future.set_exception(e)
+        return future
+    timings = prepared["timings"]
+    future.add_done_callback(lambda _: timings.update(generation_s=time.perf_counter() - submitted))
+    return future
+
+def _generation_has_room():
+    # Cererile interactive au prioritate: /query/batch trimite doar cand nu asteapta nimeni
+    if replicas is not None:
+        return any(r["ready"] and r["inflight"] < GENERATION_MAX_BATCH_SIZE for r in replicas.stats()["replicas"])
+    return generation.stats()["queue_depth"] == 0
+
+def _wait_for_generation_slot(window, cancel):
+    """Asteapta pana cand cererea batch are mai putin de BATCH_INFLIGHT
+    intrebari la generare si generarea are loc liber; False daca e anulata."""
+    while not cancel.is_cancelled():
+        window[:] = [future for future in window if not future.done()]
+        if len(window) < BATCH_INFLIGHT and _generation_has_room():
+            return True
+        if len(window) >= BATCH_INFLIGHT:
+            wait(window, timeout=BATCH_POLL_S, return_when=FIRST_COMPLETED)
+        else:
+            time.sleep(BATCH_POLL_S)
+    return False
+
+def _run_batch(queries, cancel, emit):
+    """Thread-ul unei cereri /query/batch: embedding si retrieval cate
+    BATCH_QUERY_SIZE intrebari deodata, apoi generarea prin aceeasi coada ca
+    /query, cu cel mult BATCH_INFLIGHT intrebari deodata si doar cand nu
+    asteapta cereri interactive. `emit` primeste, in ordine,
+    (index, timings, Future) pentru fiecare intrebare si None la final."""
+    window = []
+    try:
+        for offset in range(0, len(queries), BATCH_QUERY_SIZE):
+            if cancel.is_cancelled():
+                return
+            chunk = queries[offset:offset + BATCH_QUERY_SIZE]
+            try:
+                prepared = retrieve_batch(chunk, retriever, context_packer)
+            except Exception as e:
+                prepared = [e] * len(chunk)
+            for index, p in enumerate(prepared, offset):
+                if isinstance(p, dict) and "prompt" in p and not _wait_for_generation_slot(window, cancel):
+                    return
+                future = _batch_generation(p, cancel)
+                window.append(future)
+                emit((index, p["timings"] if isinstance(p, dict) else {}, future))
+    finally:
+        emit(None)
+
+async def _batch_lines(queries, cancel):
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    Thread(target=_run_batch, args=(queries, cancel, lambda item: loop.call_soon_threadsafe(items.put_nowait, item)),
+           name="query-batch", daemon=True).start()
+    finished = False
+    try:
+        while True:
+            item = await items.get()
+            if item is None:
+                finished = True
+                return
+            index, timings, future = item
+            query = queries[index]
+            try:
+                result = await asyncio.wrap_future(future)
+            except Exception as e:
+                errors.labels("request").inc()
+                line = batch_line(index, query, timings=timings, error=e.detail if isinstance(e, HTTPException) else str(e))
+            else:
+                # Precalcul pentru intrebari frecvente: raspunsurile ajung si in cache-ul exact
+                if result["sources"]:
+                    exact_cache.put(normalize_query(query), result["answer"], result["sources"])
+                line = batch_line(index, query, result, timings)
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+    finally:
+        if not finished:
+            # Clientul a renuntat: intrebarile ramase nu se mai genereaza
+            cancel.cancel("disconnect")
+
+class _AdmittedResponse(StreamingResponse):
+    """Elibereaza locul din AdmissionControl cand se termina raspunsul, oricum
+    s-ar termina: si daca clientul pleaca inainte de primul rand, cand
+    generatorul nu porneste deloc (iar BackgroundTask nu mai ruleaza)."""
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            admission.release()
+
+@app.post("/query/batch")
+async def query_batch_endpoint(request: Request):
+    """Raspunsuri pentru o lista de intrebari (evaluare, precalcul). Corpul e o
+    lista JSON, {"queries": [...]} sau JSONL; raspunsul e NDJSON, cate o linie
+    {"index", "query", "answer", "sources", "timings"} (sau "error") per
+    intrebare, in ordinea intrebarilor, pe masura ce sunt gata."""
+    if not _ready():
+        raise HTTPException(status_code=503, detail=NOT_READY_ANSWER)
+    try:
+        body = (await request.body()).decode("utf-8")
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None  # JSONL
+        if not isinstance(payload, dict):
+            payload = {"queries": parse_questions(body)}
+        queries = BatchQueryRequest.model_validate(payload).queries
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=[
+            {"loc": list(error["loc"]), "msg": error["msg"]} for error in e.errors()
+        ])
+    except (ValueError, AttributeError):
+        raise HTTPException(status_code=400, detail="Corpul trebuie să fie o listă JSON, {\"queries\": [...]} sau JSONL.")
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"Maximum {BATCH_MAX_QUERIES} întrebări per cerere.")
+    # Toata cererea ocupa un singur loc; la generare ajung cel mult BATCH_INFLIGHT intrebari deodata
+    if not admission.try_acquire():
+        dropped_requests.labels("overloaded").inc()
+        raise HTTPException(status_code=429, detail="Prea multe cereri în lucru. Încercați din nou.",
+                            headers={"Retry-After": "1"})
+    return _AdmittedResponse(_batch_lines(queries, Cancellation()), media_type="application/x-ndjson")
+
+@app.get("/stats")
+def stats_endpoint():
+    stats = {
+        "semantic_cache": semantic_cache.stats(),
+        "exact_cache": exact_cache.stats(),
+        "inflight": {"pending": inflight.in_flight(), "shared": inflight.shared},
+        "inflight_streams": {"pending": streams.in_flight(), "shared": streams.shared},
+        "admission": admission.stats(),
+        "retrieval": retrieval.stats(),
+        "generation": replicas.stats() if replicas is not None else generation.stats(),
+        "time_to_first_token": time_to_first_token.summary(),
+        "context_tokens": context_tokens.summary(),
+        "context_tokens_saved": context_tokens_saved.summary(),
+        "context_tokens_truncated": context_tokens_truncated.summary(),
+    }
+    if retriever:
+        stats["docstore"] = retriever.docstore.stats()
+        if retriever.reranker is not None:
+            stats["reranker"] = retriever.reranker.stats()
+        if retriever.query_embedder is not None:
+            stats["query_embedding"] = retriever.query_embedder.stats()
+    return stats
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.post("/admin/profile")
+def profile_endpoint(seconds: float = 10.0, interval_ms: float = 5.0, x_admin_token: str | None = Header(default=None)):
+    """Profil de esantionare al serverului pornit, scris in PROFILE_DIR
+    (format collapsed, pentru flamegraph.pl sau speedscope)."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Endpoint-urile de administrare sunt dezactivate.")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Token de administrare invalid.")
+    seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+    path = os.path.join(PROFILE_DIR, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.collapsed")
+    try:
+        # Endpoint sincron: FastAPI il ruleaza intr-un thread, cererile continua intre timp
+        return sample_profile(seconds, path, interval=interval_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/admin/reindex")
+def reindex_endpoint(x_admin_token: str | None = Header(default=None)):
+    """Reindexeaza DATA_FOLDER in indexul servit, fara repornire: doar fisierele
+    schimbate se embedeaza, iar raspunsurile din cache construite din ele se
+    invalideaza. Cererile continua sa fie servite intre timp."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Endpoint-urile de administrare sunt dezactivate.")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Token de administrare invalid.")
+    if retriever is None:
+        raise HTTPException(status_code=503, detail="Serverul nu este inca pregatit.")
+    if retriever.read_only:
+        raise HTTPException(status_code=409, detail="Indexul e un artefact; publica unul nou cu index_build.py.")
+    if not reindex_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="O reindexare ruleaza deja.")
+    try:
+        # Endpoint sincron: FastAPI il ruleaza intr-un thread
+        return reindex(retriever)
+    finally:
+        reindex_lock.release()
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,165 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock, current_thread
+
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import CounterMetricFamily
+
+from tracing import current_trace
+
+
+class RollingStats:
+    """Statistici (medie, percentile) pe ultimele `window` masuratori."""
+
+    def __init__(self, window=1000):
+        self._values = deque(maxlen=window)
+        self._lock = Lock()
+        self.count = 0
+
+    def observe(self, value):
+        with self._lock:
+            self._values.append(value)
+            self.count += 1
+
+    def summary(self):
+        with self._lock:
+            values = sorted(self._values)
+        if not values:
+            return {"count": self.count}
+
+        def pct(p):
+            return values[min(len(values) - 1, int(p * len(values)))]
+
+        return {
+            "count": self.count,
+            "avg": sum(values) / len(values),
+            "p50": pct(0.5),
+            "p95": pct(0.95),
+            "max": values[-1],
+        }
+
+
+class StartupTimeline:
+    """Fazele pornirii (inceput, sfarsit, durata), relative la crearea obiectului.
+
+    Fazele pot rula pe thread-uri diferite; `log()` arata si suprapunerea lor.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self._phases = []
+        self._lock = Lock()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.monotonic()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            end = time.monotonic()
+            entry = {
+                "phase": name, "thread": current_thread().name,
+                "start": start - self.started, "end": end - self.started, "seconds": end - start,
+            }
+            if error is not None:
+                entry["error"] = error
+            with self._lock:
+                self._phases.append(entry)
+            print(f"[STARTUP] {name}: {end - start:.1f}s{' (eroare)' if error else ''}")
+
+    def summary(self):
+        with self._lock:
+            return sorted(self._phases, key=lambda p: p["start"])
+
+    def log(self):
+        phases = self.summary()
+        total = max((p["end"] for p in phases), default=0.0)
+        print(f"[STARTUP] Pornire completa in {total:.1f}s:")
+        for p in phases:
+            print(f"[STARTUP]   {p['phase']:<12} {p['start']:>7.1f}s -> {p['end']:>7.1f}s  ({p['seconds']:.1f}s, {p['thread']})")
+
+
+# --- Prometheus (/metrics) ---
+
+STAGES = (
+    "retrieval_queue", "generation_queue", "embed", "vector_search", "lexical_search",
+    "docstore", "rerank", "prompt_build", "prefill", "decode", "total",
+)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160)
+
+stage_seconds = Histogram("askfmi_stage_seconds", "Durata etapelor unei cereri, in secunde", ["stage"],
+                          buckets=LATENCY_BUCKETS)
+# Eticheta se fixeaza o singura data; pe hot path ramane doar observe()
+STAGE = {stage: stage_seconds.labels(stage) for stage in STAGES}
+prompt_tokens = Counter("askfmi_prompt_tokens", "Tokeni de prompt (inclusiv prefixul refolosit din KV cache)")
+generated_tokens = Counter("askfmi_generated_tokens", "Tokeni generati")
+decode_tokens_per_second = Histogram(
+    "askfmi_decode_tokens_per_second", "Tokeni generati pe secunda de decode, per batch",
+    buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500, 1000),
+)
+errors = Counter("askfmi_errors", "Erori, pe etapa", ["stage"])
+# overloaded (429), queue_full (503), deadline (504), disconnect (clientul a plecat inainte de raspuns)
+dropped_requests = Counter("askfmi_dropped_requests", "Cereri respinse sau oprite inainte de final", ["reason"])
+degraded_responses = Counter("askfmi_degraded_responses", "Raspunsuri doar din retrieval, cu serverul saturat")
+# tokeni generati / forward-uri target = cati tokeni produce un pas; draft: un forward ~ un token propus
+model_forwards = Counter("askfmi_model_forwards", "Apeluri forward in generare", ["model"])
+speculative_accepted = Counter("askfmi_speculative_accepted_tokens", "Tokeni propusi (draft/prompt lookup) acceptati")
+
+
+@contextmanager
+def timed(stage):
+    """Observa durata etapei in histograma si, daca thread-ul lucreaza pentru
+    o cerere cu trace (tracing.use_trace), o adauga si ca span."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        errors.labels(stage).inc()
+        raise
+    finally:
+        end = time.perf_counter()
+        STAGE[stage].observe(end - start)
+        trace = current_trace()
+        if trace is not None:
+            trace.add(stage, start, end)
+
+
+def record_generation(stats):
+    """stats: {"prefill_s", "decode_s", "prompt_tokens", "generated_tokens"} pentru un batch."""
+    STAGE["prefill"].observe(stats["prefill_s"])
+    STAGE["decode"].observe(stats["decode_s"])
+    prompt_tokens.inc(stats["prompt_tokens"])
+    generated_tokens.inc(stats["generated_tokens"])
+    if stats["decode_s"] > 0:
+        decode_tokens_per_second.observe(stats["generated_tokens"] / stats["decode_s"])
+    if "forwards" in stats:
+        model_forwards.labels("target").inc(stats["forwards"])
+    if "draft_forwards" in stats:
+        model_forwards.labels("draft").inc(stats["draft_forwards"])
+    if "accepted_tokens" in stats:
+        speculative_accepted.inc(stats["accepted_tokens"])
+
+
+class CacheCollector:
+    """Hit-urile si miss-urile cache-urilor, citite din contoarele lor abia la
+    scrape, deci fara niciun cost pe hot path. `sources` = {nume: functie care
+    intoarce (hits, misses) sau None daca cache-ul nu exista inca}."""
+
+    def __init__(self, sources):
+        self.sources = sources
+
+    def collect(self):
+        family = CounterMetricFamily("askfmi_cache_lookups", "Cautari in cache-uri", labels=["cache", "result"])
+        for name, source in self.sources.items():
+            counts = source()
+            if counts is None:
+                continue
+            hits, misses = counts
+            family.add_metric([name, "hit"], hits)
+            family.add_metric([name, "miss"], misses)
+        yield family
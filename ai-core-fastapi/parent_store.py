@@ -0,0 +1,172 @@
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from threading import Lock
+
+from langchain_core.documents import Document
+from langchain_core.stores import BaseStore
+
+
+def _dumps(doc):
+    return json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False)
+
+
+def _loads(raw):
+    data = json.loads(raw)
+    return Document(page_content=data["page_content"], metadata=data["metadata"])
+
+
+class SQLiteDocStore(BaseStore[str, Document]):
+    """Docstore persistent pentru chunk-urile parinte (un rand per document).
+
+    Documentele stau pe disc, nu in heap, deci memoria procesului nu creste
+    odata cu corpusul, iar la repornire nu mai e nevoie de re-chunking.
+    """
+
+    def __init__(self, path, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self._lock = Lock()
+        if read_only:
+            # Artefact imuabil: fara lock-uri si fara fisiere -wal/-shm, deci il pot
+            # deschide simultan oricate procese (si de pe un volum read-only)
+            self._conn = sqlite3.connect(f"file:{path}?immutable=1", uri=True, check_same_thread=False)
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS parents (id TEXT PRIMARY KEY, doc TEXT NOT NULL)")
+        self._conn.commit()
+
+    def mget(self, keys):
+        if not keys:
+            return []
+        found = {}
+        with self._lock:
+            # SQLite limiteaza numarul de parametri dintr-un query
+            for i in range(0, len(keys), 500):
+                chunk = list(keys[i:i + 500])
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT id, doc FROM parents WHERE id IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+        return [_loads(found[k]) if k in found else None for k in keys]
+
+    def mset(self, key_value_pairs):
+        rows = [(k, _dumps(doc)) for k, doc in key_value_pairs]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO parents (id, doc) VALUES (?, ?)", rows)
+            self._conn.commit()
+
+    def mdelete(self, keys):
+        with self._lock:
+            self._conn.executemany("DELETE FROM parents WHERE id = ?", [(k,) for k in keys])
+            self._conn.commit()
+
+    def yield_keys(self, prefix=None):
+        with self._lock:
+            if prefix:
+                rows = self._conn.execute(
+                    "SELECT id FROM parents WHERE substr(id, 1, ?) = ?", (len(prefix), prefix)
+                ).fetchall()
+            else:
+                rows = self._conn.execute("SELECT id FROM parents").fetchall()
+        for (key,) in rows:
+            yield key
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM parents").fetchone()[0]
+
+    def finalize(self):
+        """Muta tot continutul din WAL in fisierul principal (inainte de publicarea
+        unui artefact), ca baza sa poata fi deschisa cu read_only=True."""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("PRAGMA journal_mode=DELETE")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LRUCachedStore(BaseStore[str, Document]):
+    """Cache LRU marginit in fata unui docstore lent (ex. SQLiteDocStore).
+
+    Tine in memorie doar cei mai accesati `max_items` parinti si numara
+    hit-urile/miss-urile. Un parinte citit din store in timp ce un mset/mdelete
+    (ex. /admin/reindex) il schimba nu mai intra in cache: ar ramane vechi.
+    """
+
+    def __init__(self, store, max_items=512):
+        self.store = store
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = Lock()
+        self._generation = 0  # creste la fiecare mset/mdelete
+
+    def _put(self, key, doc):
+        self._cache[key] = doc
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_items:
+            self._cache.popitem(last=False)
+
+    def mget(self, keys):
+        result = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    result[key] = self._cache[key]
+                    self.hits += 1
+                else:
+                    missing.append(key)
+                    self.misses += 1
+            generation = self._generation
+        if missing:
+            loaded = self.store.mget(missing)
+            with self._lock:
+                # O scriere intre citire si acum poate sa fi schimbat ce am citit
+                stale = generation != self._generation
+                for key, doc in zip(missing, loaded):
+                    result[key] = doc
+                    if doc is not None and not stale:
+                        self._put(key, doc)
+        return [result[k] for k in keys]
+
+    def mset(self, key_value_pairs):
+        key_value_pairs = list(key_value_pairs)
+        self.store.mset(key_value_pairs)
+        with self._lock:
+            # Invalidam intrarile vechi; vor fi reincarcate la urmatorul acces
+            self._generation += 1
+            for key, _ in key_value_pairs:
+                self._cache.pop(key, None)
+
+    def mdelete(self, keys):
+        keys = list(keys)
+        self.store.mdelete(keys)
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._cache.pop(key, None)
+
+    def yield_keys(self, prefix=None):
+        return self.store.yield_keys(prefix=prefix)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "cached": len(self._cache),
+                "max_items": self.max_items,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,63 @@
+import copy
+import time
+
+import torch
+
+
+class PrefixKVCache:
+    """past_key_values pentru partea statica a promptului, calculate o singura data.
+
+    Fiecare generare porneste de la o copie a cache-ului, deci modelul face
+    prefill doar pe partea specifica cererii (surse, context, intrebare).
+    In batch-uri, padding-ul se pune intre prefix si restul promptului, astfel
+    ca prefixul sa ocupe aceleasi pozitii pe fiecare rand.
+
+    Tokenii se iau din tokenizarea promptului intreg (cu BOS), nu a bucatilor
+    separat: la granita, SentencePiece poate tokeniza altfel restul promptului
+    (ex. "▁" pus in fata). Daca inceputul promptului nu da exact tokenii
+    prefixului, build_inputs intoarce None si generarea merge fara cache.
+    """
+
+    def __init__(self, model, tokenizer, prefix):
+        self.prefix = prefix
+        self.tokenizer = tokenizer
+        self.device = model.device
+        self.prefix_ids = tokenizer(prefix, return_tensors="pt").input_ids.to(self.device)
+        self.fallbacks = 0
+        start = time.perf_counter()
+        with torch.inference_mode():
+            self.past_key_values = model(self.prefix_ids, use_cache=True).past_key_values
+        print(f"[STATUS] Prefix KV cache: {self.prefix_ids.shape[1]} tokeni în {time.perf_counter() - start:.2f}s")
+
+    def matches(self, prompts):
+        return all(prompt.startswith(self.prefix) for prompt in prompts)
+
+    def build_inputs(self, prompts):
+        """Intoarce (input_ids, attention_mask, past_key_values) pentru generate,
+        sau None daca tokenii prefixului nu se regasesc in toate prompturile."""
+        n_prefix = self.prefix_ids.shape[1]
+        prefix = self.prefix_ids[0].tolist()
+        full_ids = self.tokenizer(prompts).input_ids
+        if any(ids[:n_prefix] != prefix or len(ids) == n_prefix for ids in full_ids):
+            self.fallbacks += 1
+            return None
+        body_ids = [ids[n_prefix:] for ids in full_ids]
+        longest = max(len(ids) for ids in body_ids)
+        pad_id = self.tokenizer.pad_token_id
+
+        input_ids = torch.full((len(prompts), n_prefix + longest), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros_like(input_ids)
+        input_ids[:, :n_prefix] = self.prefix_ids[0].cpu()
+        attention_mask[:, :n_prefix] = 1
+        for row, ids in enumerate(body_ids):
+            input_ids[row, n_prefix + longest - len(ids):] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[row, n_prefix + longest - len(ids):] = 1
+
+        # generate modifica cache-ul pe loc, deci fiecare apel primeste o copie
+        past_key_values = copy.deepcopy(self.past_key_values)
+        if len(prompts) > 1:
+            past_key_values.batch_repeat_interleave(len(prompts))
+        return input_ids.to(self.device), attention_mask.to(self.device), past_key_values
+
+    def prompt_tokens_saved(self, batch_size):
+        return self.prefix_ids.shape[1] * batch_size
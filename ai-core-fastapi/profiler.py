@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+from collections import Counter
+from threading import Lock, current_thread, get_ident, enumerate as threads
+
+_running = Lock()
+# Un thread al carui varf de stiva e aici doar asteapta (cozi, lock-uri, socket-uri)
+IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "connection.py")
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _stack(frame):
+    # Radacina primul, ca in formatul "collapsed" folosit de flamegraph.pl / speedscope
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def sample_profile(seconds, path, interval=0.005):
+    """Esantioneaza stivele tuturor thread-urilor procesului timp de `seconds`
+    secunde, fara sa opreasca serverul, si scrie rezultatul in `path` in
+    format collapsed ("thread;f1;f2 numar"). Un singur profil ruleaza odata."""
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusy("Un profil ruleaza deja.")
+    try:
+        own = get_ident()
+        counts = Counter()
+        samples = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threads()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                counts[f"{names.get(ident, ident)};{_stack(frame)}"] += 1
+            samples += 1
+            time.sleep(interval)
+    finally:
+        _running.release()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in counts.most_common():
+            f.write(f"{stack} {count}\n")
+
+    # Cele mai "fierbinti" functii (varful stivei), fara thread-urile care asteapta
+    leaves = Counter()
+    for stack, count in counts.items():
+        leaf = stack.rsplit(";", 1)[-1]
+        if not leaf.split(" (", 1)[-1].startswith(IDLE_FILES):
+            leaves[leaf] += count
+    print(f"[PROFILE] {samples} esantioane in {seconds}s scrise in {path} (thread {current_thread().name})")
+    return {
+        "path": path,
+        "seconds": seconds,
+        "samples": samples,
+        "stacks": len(counts),
+        "top": [{"frame": frame, "samples": count} for frame, count in leaves.most_common(10)],
+    }
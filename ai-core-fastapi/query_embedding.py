@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from batching import BatchScheduler
+from metrics import RollingStats
+
+
+def embed_query_batch(embeddings, queries):
+    """Echivalentul [embeddings.embed_query(q) for q in queries], intr-un singur forward."""
+    inner = getattr(embeddings, "embeddings", embeddings)  # CachedEmbeddings -> HuggingFaceEmbeddings
+    if hasattr(inner, "_embed") and hasattr(inner, "query_encode_kwargs"):
+        return inner._embed(queries, inner.query_encode_kwargs or inner.encode_kwargs)
+    return [embeddings.embed_query(query) for query in queries]
+
+
+class QueryEmbedder:
+    """Embedding-ul intrebarilor, cu micro-batching si LRU.
+
+    Cererile concurente care ajung in aceeasi fereastra (`max_wait_ms`) se
+    embedeaza intr-un singur apel al modelului, deci un singur set de kernel-uri
+    pe GPU (sau un singur encode pe CPU). Intrebarile repetate se servesc din
+    LRU, fara sa mai intre in coada.
+    """
+
+    def __init__(self, embeddings, max_batch_size=16, max_wait_ms=5, cache_size=1024):
+        self.embeddings = embeddings
+        self.cache_size = cache_size
+        self.latency = RollingStats()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._vectors = OrderedDict()
+        self._lock = Lock()
+        self._scheduler = BatchScheduler(
+            self._embed_batch, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, name="query-embedding"
+        )
+        self._started = False
+
+    def _embed_batch(self, queries):
+        # Aceeasi intrebare de mai multe ori in batch se embedeaza o data
+        unique = list(dict.fromkeys(queries))
+        vectors = dict(zip(unique, embed_query_batch(self.embeddings, unique)))
+        with self._lock:
+            for query, vector in vectors.items():
+                self._vectors[query] = vector
+                self._vectors.move_to_end(query)
+            while len(self._vectors) > self.cache_size:
+                self._vectors.popitem(last=False)
+        return [vectors[query] for query in queries]
+
+    def embed(self, query):
+        start = time.perf_counter()
+        with self._lock:
+            vector = self._vectors.get(query)
+            if vector is not None:
+                self._vectors.move_to_end(query)
+                self.cache_hits += 1
+                return list(vector)
+            self.cache_misses += 1
+            if not self._started:
+                self._scheduler.start()
+                self._started = True
+        vector = self._scheduler.submit(query).result()
+        self.latency.observe(time.perf_counter() - start)
+        return list(vector)
+
+    def stats(self):
+        with self._lock:
+            total = self.cache_hits + self.cache_misses
+            cache = {"entries": len(self._vectors), "hit_rate": self.cache_hits / total if total else 0.0}
+        return {"cache": cache, "latency": self.latency.summary(), "batching": self._scheduler.stats()}
@@ -1,24 +1,101 @@
+import argparse
+import json
 import sys
 import torch
 import os
 import warnings
 import shutil
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig, pipeline
+import time
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig, StoppingCriteriaList, pipeline
 from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.embeddings import DeterministicFakeEmbedding
 from langchain_community.vectorstores import Chroma
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
+from chromadb.api.shared_system_client import SharedSystemClient
+from langchain_community.document_loaders import TextLoader
 from langchain.retrievers import ParentDocumentRetriever
-from langchain.storage import InMemoryStore
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from typing import Any, Optional
+
+from index_manifest import IndexManifest, hash_file, hash_text, parent_id, child_id
+from parent_store import SQLiteDocStore, LRUCachedStore
+from answer_cache import SemanticCache, ExactAnswerCache
+from streaming import BatchTextStreamer, CancelledRows, TimingStreamer
+from prefix_cache import PrefixKVCache
+from context_packer import ContextPacker, format_context_part, CONTEXT_SEPARATOR
+from metrics import RollingStats, StartupTimeline, timed, record_generation
+from tracing import annotate
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from reranker import ParentReranker
+from flat_index import FlatVectorStore
+from embedding_cache import EmbeddingCache, CachedEmbeddings
+from query_embedding import QueryEmbedder, embed_query_batch
+from cpu_embeddings import optimize_for_cpu
+from speculative import ForwardCounter, acceptance, speculative_kwargs
+from index_artifact import current_artifact
 
 warnings.filterwarnings("ignore")
 
-MODEL_DIR = "/app/model"
-DATA_FOLDER = "./data_facultate" 
+MODEL_DIR = os.environ.get("MODEL_DIR", "/app/model")
+DATA_FOLDER = os.environ.get("DATA_FOLDER", "./data_facultate")  # fisierele .txt indexate (si de bench_load.py)
 DB_PATH = "./chroma_db_parent"
+# Daca e setat, serverul deschide doar artefactul curent din acest director
+# (construit cu index_build.py), read-only, fara indexare la pornire
+INDEX_ARTIFACT_DIR = os.environ.get("INDEX_ARTIFACT_DIR", "")
+# Fisierele unui index, relative la DB_PATH sau la directorul unui artefact
+MANIFEST_FILE = "index_manifest.json"
+PARENT_STORE_FILE = "parents.sqlite3"
+LEXICAL_INDEX_FILE = "lexical_index.json"
+FLAT_INDEX_DIR = "flat_index"
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "chroma")  # chroma | flat (memmap float16, cautare exacta)
+FLAT_INDEX_QUANTIZATION = os.environ.get("FLAT_INDEX_QUANTIZATION", "") or None  # int8 = scanare cuantizata + rescorare
+# In afara DB_PATH: cache-ul supravietuieste reconstruirilor complete ale indexului
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", "./embedding_cache")
+PARENT_CACHE_SIZE = 512  # Numărul maxim de documente părinte ținute în RAM
 TOP_K_DOCUMENTS = 5  # Numărul de documente relevante de folosit
-QUANTIZATION = "4bit"
-DEVICE_EMBEDDINGS = "cuda" 
+BATCH_QUERY_SIZE = int(os.environ.get("BATCH_QUERY_SIZE", "16"))  # intrebari embedate si cautate impreuna in cererile batch
+BATCH_GENERATION_SIZE = int(os.environ.get("BATCH_GENERATION_SIZE", "4"))  # prompturi generate impreuna de CLI-ul batch (memoria GPU)
+DEGRADED_EXCERPT_CHARS = int(os.environ.get("DEGRADED_EXCERPT_CHARS", "600"))  # caractere per document in raspunsurile fara LLM
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid")  # hybrid | dense | lexical
+HYBRID_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", "20"))  # chunk-uri copil cerute fiecarei metode inainte de fuziune
+RERANKER_MODEL = os.environ.get("RERANKER_MODEL", "")  # ex. cross-encoder/mmarco-mMiniLMv2-L12-H384-v1; gol = dezactivat
+RERANK_CANDIDATES = int(os.environ.get("RERANK_CANDIDATES", "10"))  # parinti scorati de cross-encoder
+RERANK_TOP_N = int(os.environ.get("RERANK_TOP_N", "3"))  # parinti pastrati in prompt dupa rerank
+QUANTIZATION = os.environ.get("QUANTIZATION", "4bit")  # 4bit | 8bit | none (fara bitsandbytes, ex. model mic pe CPU)
+DEVICE_EMBEDDINGS = os.environ.get("DEVICE_EMBEDDINGS", "cuda")  # cuda | cpu
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "intfloat/multilingual-e5-large")
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "model")  # model | stub (vectori deterministi din hash, fara model; pentru load test)
+STUB_EMBEDDING_SIZE = 384
+EMBEDDING_CPU_QUANTIZATION = os.environ.get("EMBEDDING_CPU_QUANTIZATION", "int8")  # int8 | "" (fp32), doar pe CPU
+EMBEDDING_THREADS = int(os.environ.get("EMBEDDING_THREADS", "0"))  # 0 = toate core-urile disponibile
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "32"))
+QUERY_EMBED_MAX_BATCH_SIZE = int(os.environ.get("QUERY_EMBED_MAX_BATCH_SIZE", "16"))
+QUERY_EMBED_MAX_WAIT_MS = int(os.environ.get("QUERY_EMBED_MAX_WAIT_MS", "5"))  # cat asteapta prima intrebare dupa altele
+QUERY_EMBED_CACHE_SIZE = int(os.environ.get("QUERY_EMBED_CACHE_SIZE", "1024"))
+CHILD_CHUNK_SIZE, CHILD_CHUNK_OVERLAP = 400, 50
+PARENT_CHUNK_SIZE, PARENT_CHUNK_OVERLAP = 2000, 200
+INDEX_BATCH_SIZE = 50  # Numărul de chunk-uri parinte embedate într-un batch
+PREFIX_KV_CACHE = os.environ.get("PREFIX_KV_CACHE", "1") == "1"
+SPECULATIVE_DECODING = os.environ.get("SPECULATIVE_DECODING", "")  # "" | draft | prompt_lookup (generare cu batch size 1)
+DRAFT_MODEL_DIR = os.environ.get("DRAFT_MODEL_DIR", "")  # model mic cu acelasi tokenizer ca Mistral
+SPECULATIVE_TOKENS = int(os.environ.get("SPECULATIVE_TOKENS", "5"))  # tokeni propusi per pas de verificare
+PROMPT_LOOKUP_MAX_NGRAM = int(os.environ.get("PROMPT_LOOKUP_MAX_NGRAM", "3"))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "2500"))  # tokeni Mistral pentru blocul CONTEXT
+GENERATION_KWARGS = dict(max_new_tokens=int(os.environ.get("MAX_NEW_TOKENS", "1024")), temperature=0.1, top_p=0.95, repetition_penalty=1.15)
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = int(os.environ.get("SEMANTIC_CACHE_TTL", str(6 * 3600)))  # secunde
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+EXACT_CACHE_MAX_ENTRIES = int(os.environ.get("EXACT_CACHE_MAX_ENTRIES", "5000"))
+
+semantic_cache = SemanticCache(
+    threshold=SEMANTIC_CACHE_THRESHOLD, ttl=SEMANTIC_CACHE_TTL, max_entries=SEMANTIC_CACHE_MAX_ENTRIES
+)
+exact_cache = ExactAnswerCache(ttl=SEMANTIC_CACHE_TTL, max_entries=EXACT_CACHE_MAX_ENTRIES)
+context_tokens_saved = RollingStats()  # scapati prin unirea suprapunerilor
+context_tokens_truncated = RollingStats()  # taiati de bugetul de tokeni
+context_tokens = RollingStats()
 
 def get_bnb_config():
     if QUANTIZATION == "4bit":
@@ -27,115 +104,470 @@ def get_bnb_config():
             load_in_4bit=True, bnb_4bit_quant_type="nf4",
             bnb_4bit_use_double_quant=True, bnb_4bit_compute_dtype=torch.float16,
         )
+    if QUANTIZATION == "none":
+        return None
     return BitsAndBytesConfig(load_in_8bit=True)
 
-def load_generation_pipeline():
-    print(f"Loading Mistral from {MODEL_DIR}...")
+def load_tokenizer():
     tokenizer = AutoTokenizer.from_pretrained(MODEL_DIR, use_fast=True, local_files_only=True)
     if tokenizer.pad_token is None: tokenizer.pad_token = tokenizer.eos_token
+    # Padding la stanga: promptul ramane lipit de tokenii generati in batch-uri
+    tokenizer.padding_side = "left"
+    return tokenizer
+
+def load_context_packer(tokenizer=None):
+    # Copie separata: thread-urile de retrieval numara tokeni in paralel cu generarea
+    tokenizer = copy.deepcopy(tokenizer) if tokenizer is not None else load_tokenizer()
+    return ContextPacker(tokenizer, CONTEXT_TOKEN_BUDGET, max_overlap=PARENT_CHUNK_OVERLAP)
+
+def load_generation_pipeline():
+    print(f"Loading Mistral from {MODEL_DIR}...")
+    tokenizer = load_tokenizer()
     
     model = AutoModelForCausalLM.from_pretrained(
         MODEL_DIR, low_cpu_mem_usage=True, device_map="auto",
         quantization_config=get_bnb_config(), local_files_only=True
     )
 
-    return pipeline(
+    pipe = pipeline(
         "text-generation", model=model, tokenizer=tokenizer,
-        max_new_tokens=1024,
-        temperature=0.1, top_p=0.95, repetition_penalty=1.15, return_full_text=False
+        return_full_text=False, **GENERATION_KWARGS
+    )
+    # Instructiunile fixe din prompt se encodeaza o singura data, la pornire
+    pipe.prefix_cache = PrefixKVCache(model, tokenizer, PROMPT_PREFIX) if PREFIX_KV_CACHE else None
+    pipe.context_packer = load_context_packer(tokenizer)
+    pipe.forward_counter = ForwardCounter(model)
+    pipe.draft_counter = None
+    pipe.speculative_kwargs = {}
+    if SPECULATIVE_DECODING == "draft":
+        draft = load_draft_model()
+        pipe.draft_counter = ForwardCounter(draft)
+        pipe.speculative_kwargs = speculative_kwargs("draft", SPECULATIVE_TOKENS, assistant_model=draft)
+    elif SPECULATIVE_DECODING == "prompt_lookup":
+        pipe.speculative_kwargs = speculative_kwargs("prompt_lookup", SPECULATIVE_TOKENS, PROMPT_LOOKUP_MAX_NGRAM)
+    return pipe
+
+def load_draft_model(model_dir=None):
+    model_dir = model_dir or DRAFT_MODEL_DIR
+    print(f"Loading draft model from {model_dir}...")
+    # Modelul draft e mic: ramane necuantizat, in fp16 pe GPU
+    return AutoModelForCausalLM.from_pretrained(
+        model_dir, low_cpu_mem_usage=True, device_map="auto", local_files_only=True,
+        dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+    )
+
+def load_generation_worker():
+    """Factory pentru replicile de generare (GenerationReplicas): ruleaza in
+    procesul replicii si intoarce generate(prompts, callbacks, stats, cancelled) -> texte."""
+    pipe = load_generation_pipeline()
+    return lambda prompts, callbacks=None, stats=None, cancelled=None: generate_batch(
+        prompts, pipe, callbacks, stats, cancelled
+    )
+
+def embedding_variant():
+    if EMBEDDING_BACKEND == "stub":
+        return f"stub-{STUB_EMBEDDING_SIZE}"
+    # Vectorii modelului cuantizat difera putin de cei fp32: nu se amesteca in acelasi index/cache
+    if DEVICE_EMBEDDINGS == "cpu" and EMBEDDING_CPU_QUANTIZATION:
+        return f"{EMBEDDING_MODEL}@{EMBEDDING_CPU_QUANTIZATION}"
+    return EMBEDDING_MODEL
+
+def load_embeddings():
+    if EMBEDDING_BACKEND == "stub":
+        return DeterministicFakeEmbedding(size=STUB_EMBEDDING_SIZE)
+    embeddings = HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        model_kwargs={'device': DEVICE_EMBEDDINGS},
+        encode_kwargs={'batch_size': EMBEDDING_BATCH_SIZE},
     )
+    if DEVICE_EMBEDDINGS == "cpu":
+        optimize_for_cpu(embeddings, quantization=EMBEDDING_CPU_QUANTIZATION, threads=EMBEDDING_THREADS)
+    return embeddings
+
+def index_config():
+    # Orice schimbare aici invalideaza manifestul si forteaza reindexarea completa
+    return {
+        "embedding_model": embedding_variant(),
+        "child_chunk": [CHILD_CHUNK_SIZE, CHILD_CHUNK_OVERLAP],
+        "parent_chunk": [PARENT_CHUNK_SIZE, PARENT_CHUNK_OVERLAP],
+        "docstore": "sqlite",
+        "parent_start_index": True,
+        "lexical_index": "bm25",
+        "vector_backend": VECTOR_BACKEND if VECTOR_BACKEND != "flat" else f"flat-{FLAT_INDEX_QUANTIZATION or 'f16'}",
+    }
+
+def load_manifest(index_dir=DB_PATH):
+    return IndexManifest.load(os.path.join(index_dir, MANIFEST_FILE), index_config())
 
-def get_retriever():
-    if os.path.exists(DB_PATH):
+def _reset_index(index_dir=DB_PATH):
+    if os.path.exists(index_dir):
         print("Se sterge vechea baza de date")
         try:
-            shutil.rmtree(DB_PATH)
+            shutil.rmtree(index_dir)
         except Exception as e:
             print(f"Warning la stergere DB: {e}")
 
-    embeddings = HuggingFaceEmbeddings(
-        model_name="intfloat/multilingual-e5-large",
-        model_kwargs={'device': DEVICE_EMBEDDINGS}
+class HybridParentRetriever(ParentDocumentRetriever):
+    # Indexul BM25 peste aceleasi chunk-uri copil ca in Chroma
+    lexical_index: Optional[Any] = None
+    # Cross-encoder optional, aplicat peste parintii gasiti
+    reranker: Optional[Any] = None
+    # Embedding-ul intrebarilor, cu micro-batching intre cererile concurente
+    query_embedder: Optional[Any] = None
+    # Directorul cu fisierele indexului; read_only = artefact deschis doar pentru cautare
+    index_dir: str = DB_PATH
+    read_only: bool = False
+
+def get_retriever(index_dir=DB_PATH, read_only=False):
+    lexical_path = os.path.join(index_dir, LEXICAL_INDEX_FILE)
+    if read_only:
+        # Un artefact nu se repara si nu se reconstruieste la pornire
+        if load_manifest(index_dir) is None or not os.path.exists(lexical_path):
+            raise RuntimeError(f"Artefactul {index_dir} lipseste sau are alta configuratie decat serverul.")
+        embeddings = load_embeddings()
+    else:
+        # Baza de date se pastreaza intre reporniri; o stergem doar daca nu mai
+        # corespunde manifestului (lipsa, corupt sau configuratie diferita).
+        if load_manifest(index_dir) is None or not os.path.exists(lexical_path):
+            _reset_index(index_dir)
+        # Chunk-urile deja embedate (in alte pagini sau la crawl-ul anterior) se citesc de pe disc
+        embeddings = CachedEmbeddings(load_embeddings(), EmbeddingCache(EMBEDDING_CACHE_PATH), embedding_variant())
+
+    child_splitter = RecursiveCharacterTextSplitter(chunk_size=CHILD_CHUNK_SIZE, chunk_overlap=CHILD_CHUNK_OVERLAP)
+    # start_index permite eliminarea exacta a suprapunerilor dintre parinti in context
+    parent_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=PARENT_CHUNK_SIZE, chunk_overlap=PARENT_CHUNK_OVERLAP, add_start_index=True
     )
 
-    child_splitter = RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=50)
-    parent_splitter = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=200)
+    if VECTOR_BACKEND == "flat":
+        vectorstore = FlatVectorStore(
+            os.path.join(index_dir, FLAT_INDEX_DIR), embeddings,
+            quantization=FLAT_INDEX_QUANTIZATION, read_only=read_only,
+        )
+    else:
+        vectorstore = Chroma(
+            collection_name="split_parents",
+            embedding_function=embeddings,
+            persist_directory=index_dir
+        )
 
-    vectorstore = Chroma(
-        collection_name="split_parents",
-        embedding_function=embeddings,
-        persist_directory=DB_PATH
+    store = LRUCachedStore(
+        SQLiteDocStore(os.path.join(index_dir, PARENT_STORE_FILE), read_only=read_only), max_items=PARENT_CACHE_SIZE
     )
 
-    store = InMemoryStore()
+    lexical_index = BM25Index.load(lexical_path) if os.path.exists(lexical_path) else BM25Index()
 
-    retriever = ParentDocumentRetriever(
+    retriever = HybridParentRetriever(
         vectorstore=vectorstore,
         docstore=store,
         child_splitter=child_splitter,
         parent_splitter=parent_splitter,
-        search_kwargs={"k": TOP_K_DOCUMENTS}
+        search_kwargs={"k": TOP_K_DOCUMENTS},
+        lexical_index=lexical_index,
+        reranker=ParentReranker(RERANKER_MODEL, device=DEVICE_EMBEDDINGS, top_n=RERANK_TOP_N) if RERANKER_MODEL else None,
+        query_embedder=QueryEmbedder(
+            embeddings, max_batch_size=QUERY_EMBED_MAX_BATCH_SIZE,
+            max_wait_ms=QUERY_EMBED_MAX_WAIT_MS, cache_size=QUERY_EMBED_CACHE_SIZE,
+        ),
+        index_dir=index_dir,
+        read_only=read_only,
     )
     return retriever
 
-def index_documents(retriever):
-    print(f"Loading files from {DATA_FOLDER}...")
-    if not os.path.exists(DATA_FOLDER):
-        os.makedirs(DATA_FOLDER)
-        print(f"Eroare: Folderul {DATA_FOLDER} nu exista sau e gol!")
+def close_vectorstore(vectorstore):
+    """Opreste clientul Chroma, ca fisierele indexului sa fie inchise (ex. inainte
+    de redenumirea unui artefact). Fisierele se elibereaza cand nu mai exista
+    referinte la vectorstore. FlatVectorStore nu tine fisiere deschise."""
+    client = getattr(vectorstore, "_client", None)
+    if client is None:
         return
+    client._system.stop()
+    # chromadb refoloseste sistemul deschis pentru acelasi director
+    SharedSystemClient._identifier_to_system.pop(client._identifier, None)
 
-    loader = DirectoryLoader(DATA_FOLDER, glob="**/*.txt", loader_cls=TextLoader)
-    docs = loader.load()
-    
-    if not docs:
-        print("Folderul e gol. Nu am ce să indexez.")
+def _split_file(retriever, path, source):
+    docs = TextLoader(str(path)).load()
+    parents = retriever.parent_splitter.split_documents(docs)
+
+    seen = {}
+    chunks = []
+    for parent in parents:
+        parent.metadata["source"] = source
+        content_hash = hash_text(parent.page_content)
+        occurrence = seen.get(content_hash, 0)
+        seen[content_hash] = occurrence + 1
+        chunks.append((parent_id(source, content_hash, occurrence), content_hash, parent))
+    return chunks
+
+def _remove_parents(retriever, parents):
+    if not parents:
         return
+    child_ids = [cid for p in parents for cid in p["children"]]
+    if child_ids:
+        retriever.vectorstore.delete(ids=child_ids)
+        retriever.lexical_index.remove(child_ids)
+    retriever.docstore.mdelete([p["id"] for p in parents])
 
-    print(f"Am găsit {len(docs)} documente. Încep indexarea în batch-uri...")
-    
-    batch_size = 50  
-    total_docs = len(docs)
-    
-    for i in range(0, total_docs, batch_size):
-        # Facem o felie (slice) din lista de documente
-        batch_docs = docs[i : i + batch_size]
-        
-        print(f"Processing batch {i} -> {min(i + batch_size, total_docs)} din {total_docs}...")
+def _split_children(retriever, pid, parent):
+    sub_docs = retriever.child_splitter.split_documents([parent])
+    for sub_doc in sub_docs:
+        sub_doc.metadata[retriever.id_key] = pid
+    return sub_docs
+
+def _add_parents(retriever, chunks):
+    children, ids, full_docs = [], [], []
+    for pid, parent, sub_docs in chunks:
+        children.extend(sub_docs)
+        ids.extend(child_id(pid, i) for i in range(len(sub_docs)))
+        full_docs.append((pid, parent))
+    if children:
+        retriever.vectorstore.add_documents(children, ids=ids)
+        retriever.lexical_index.add(
+            (cid, doc.metadata[retriever.id_key], doc.page_content) for cid, doc in zip(ids, children)
+        )
+    retriever.docstore.mset(full_docs)
+
+def _save_index_state(retriever, manifest):
+    # Fisierele au dimensiunea corpusului: se scriu o singura data per rulare.
+    # Indexul lexical se salveaza inaintea manifestului, ca manifestul sa nu
+    # descrie niciodata chunk-uri care lipsesc din BM25
+    retriever.lexical_index.save(os.path.join(retriever.index_dir, LEXICAL_INDEX_FILE))
+    if isinstance(retriever.vectorstore, FlatVectorStore):
+        retriever.vectorstore.save()
+    manifest.save()
+
+def index_documents(retriever, data_folder=DATA_FOLDER):
+    """Indexare incrementala: se embedeaza doar fisierele (si, in interiorul
+    lor, doar chunk-urile parinte) care s-au schimbat fata de manifest.
+
+    Intoarce un raport {"added", "changed", "removed", "unchanged", "full_rebuild",
+    "failed"} cu sursele afectate; cele din "failed" (citire sau batch esuat) nu
+    intra in manifest si se reiau la urmatoarea rulare.
+    """
+    if retriever.read_only:
+        raise RuntimeError("Artefactele de index nu se modifica; construieste unul nou cu index_build.py.")
+    report = {"added": [], "changed": [], "removed": [], "unchanged": 0, "full_rebuild": False, "failed": []}
+
+    print(f"Loading files from {data_folder}...")
+    if not os.path.exists(data_folder):
+        os.makedirs(data_folder)
+        print(f"Eroare: Folderul {data_folder} nu exista sau e gol!")
+        return report
+
+    start = time.perf_counter()
+    embeddings = retriever.vectorstore.embeddings
+    cache_before = embeddings.stats() if isinstance(embeddings, CachedEmbeddings) else None
+    manifest = load_manifest(retriever.index_dir)
+    if manifest is None:
+        report["full_rebuild"] = True
+        manifest = IndexManifest(os.path.join(retriever.index_dir, MANIFEST_FILE), index_config())
+    files = {str(path): path for path in sorted(Path(data_folder).glob("**/*.txt"))}
+
+    if not files and not manifest.sources():
+        print("Folderul e gol. Nu am ce să indexez.")
+        return report
+
+    # Fisiere sterse: dispar atat din Chroma cat si din parent store
+    for source in sorted(manifest.sources() - set(files)):
+        _remove_parents(retriever, list(manifest.parents(source).values()))
+        manifest.remove_file(source)
+        report["removed"].append(source)
+    pending, pending_entries = [], []
+    embedded = 0
+
+    def flush():
+        nonlocal embedded
+        if not pending and not pending_entries:
+            return
+        print(f"Processing batch: {len(pending)} chunk-uri parinte din {len(pending_entries)} fisiere...")
         try:
-            retriever.add_documents(batch_docs, ids=None)
+            _add_parents(retriever, pending)
         except Exception as e:
-            print(f"Eroare la batch-ul {i}: {e}")
-            # Putem continua cu următorul batch chiar dacă unul crapă
+            # Manifestul nu se actualizeaza, deci fisierele vor fi reincercate la urmatoarea rulare
+            print(f"Eroare la batch: {e}")
+            report["failed"].extend(source for source, _, _ in pending_entries)
+        else:
+            embedded += len(pending)
+            for source, sha256, parents in pending_entries:
+                manifest.set_file(source, sha256, parents)
+        pending.clear()
+        pending_entries.clear()
+
+    for source, path in files.items():
+        sha256 = hash_file(path)
+        old_sha256 = manifest.file_hash(source)
+        if sha256 == old_sha256:
+            report["unchanged"] += 1
             continue
 
-    print("Indexing complete. Toate batch-urile au fost procesate.")
+        try:
+            chunks = _split_file(retriever, path, source)
+        except Exception as e:
+            print(f"Eroare la citirea {source}: {e}")
+            report["failed"].append(source)
+            continue
+
+        old_parents = manifest.parents(source)
+        new_ids = {pid for pid, _, _ in chunks}
+        _remove_parents(retriever, [p for pid, p in old_parents.items() if pid not in new_ids])
+
+        entries = []
+        moved = []
+        for pid, content_hash, parent in chunks:
+            start_index = parent.metadata.get("start_index")
+            if pid in old_parents:
+                entry = old_parents[pid]
+                if entry.get("start") != start_index:
+                    # Continut identic, dar mutat in fisier: actualizam doar parintele, fara re-embedding
+                    entry = dict(entry, start=start_index)
+                    moved.append((pid, parent))
+                entries.append(entry)
+                continue
+            sub_docs = _split_children(retriever, pid, parent)
+            entries.append({"id": pid, "hash": content_hash, "start": start_index,
+                            "children": [child_id(pid, i) for i in range(len(sub_docs))]})
+            pending.append((pid, parent, sub_docs))
 
-def init_rag():
-    try:
-        retriever = get_retriever()
-        index_documents(retriever)
-        pipe = load_generation_pipeline()
-    except Exception as e:
-        print(f"Error init: {e}")
-        return None, None
+        if moved:
+            retriever.docstore.mset(moved)
+        pending_entries.append((source, sha256, entries))
+        report["changed" if old_sha256 else "added"].append(source)
+        if len(pending) >= INDEX_BATCH_SIZE:
+            flush()
+    flush()
+    # Daca procesul se opreste inainte, fisierele din batch-urile deja embedate
+    # se reiau la urmatoarea rulare (vectorii lor vin din cache-ul de embeddings)
+    if report["added"] or report["changed"] or report["removed"]:
+        _save_index_state(retriever, manifest)
+
+    print(
+        f"Indexing complete in {time.perf_counter() - start:.1f}s: "
+        f"{len(report['added'])} noi, {len(report['changed'])} modificate, "
+        f"{len(report['removed'])} sterse, {report['unchanged']} neschimbate, "
+        f"{len(report['failed'])} esuate ({embedded} chunk-uri parinte embedate)."
+    )
+    if cache_before is not None:
+        embeddings.cache.save_stats()  # costul mediu al unui embedding, o data per rulare
+        cache_after = embeddings.stats()
+        hits = cache_after["hits"] - cache_before["hits"]
+        total = hits + cache_after["misses"] - cache_before["misses"]
+        saved = hits * cache_after["seconds_per_text"]
+        print(
+            f"[CACHE] Embeddings: {hits}/{total} chunk-uri din cache "
+            f"({hits / total if total else 0:.0%}), ~{saved:.1f}s economisite, "
+            f"{cache_after['entries']} intrari pe disc."
+        )
+    return report
 
+def reindex(retriever):
+    """Indexare incrementala a retriever-ului in uz (la pornire sau din
+    POST /admin/reindex), urmata de invalidarea raspunsurilor din cache."""
+    report = index_documents(retriever)
+    report["evicted"] = 0
+    if report["full_rebuild"]:
+        semantic_cache.clear()
+        exact_cache.clear()
+    else:
+        # Scoatem din cache doar raspunsurile generate din fisierele modificate/sterse
+        stale = report["changed"] + report["removed"]
+        if stale:
+            report["evicted"] = semantic_cache.invalidate_sources(stale) + exact_cache.invalidate_sources(stale)
+            print(f"[CACHE] {report['evicted']} răspunsuri invalidate după reindexare.")
+    return report
+
+def init_rag(timeline=None, load_model=True):
+    """Intoarce (retriever, pipe). Cu load_model=False (generarea ruleaza in
+    replici separate) pipe-ul intors este None."""
+    timeline = timeline or StartupTimeline()
+
+    def load_index():
+        if INDEX_ARTIFACT_DIR:
+            # Indexul a fost construit offline (index_build.py): doar il deschidem
+            with timeline.phase("retriever"):
+                artifact = current_artifact(INDEX_ARTIFACT_DIR)
+                if artifact is None:
+                    raise RuntimeError(f"Niciun artefact publicat in {INDEX_ARTIFACT_DIR}.")
+                print(f"[STATUS] Index servit din artefactul {os.path.basename(artifact)}")
+                return get_retriever(artifact, read_only=True)
+        with timeline.phase("retriever"):
+            retriever = get_retriever()
+        with timeline.phase("index"):
+            reindex(retriever)
+        return retriever
+
+    def load_pipe():
+        if not load_model:
+            return None
+        with timeline.phase("model"):
+            return load_generation_pipeline()
+
+    # Indexul si modelul de generare nu depind unul de altul: se incarca in paralel
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="init") as pool:
+        retriever_future = pool.submit(load_index)
+        pipe_future = pool.submit(load_pipe)
+        try:
+            retriever, pipe = retriever_future.result(), pipe_future.result()
+        except Exception as e:
+            print(f"Error init: {e}")
+            return None, None
+
+    timeline.log()
     print("\nSystem Ready (Parent Document Retrieval). Type 'exit' to quit.\n")
     return retriever, pipe
 
-def query_rag(query, retriever, pipe):
-    if not query:
-        return "Te rog să introduci o întrebare."
+def embed_query(query, retriever):
+    query_embedder = getattr(retriever, "query_embedder", None)
+    if query_embedder is not None:
+        return query_embedder.embed(query)
+    return retriever.vectorstore.embeddings.embed_query(query)
 
-    relevant_docs = retriever.invoke(query)
-    
-    if not relevant_docs:
-        print("Nu am găsit context relevant.")
-        return "Nu am găsit informații relevante în documentele mele despre acest subiect."
-    
-    # Folosim TOP_K_DOCUMENTS documente (sau mai puține dacă nu există)
-    top_docs = relevant_docs[:TOP_K_DOCUMENTS]
-    
+def embed_queries(queries, retriever):
+    """Embedding-urile unei liste de intrebari, intr-un singur apel al modelului
+    (None pentru intrebarile goale si in modul lexical)."""
+    if RETRIEVAL_MODE == "lexical":
+        return [None] * len(queries)
+    with timed("embed"):
+        vectors = iter(embed_query_batch(retriever.vectorstore.embeddings, [query for query in queries if query]))
+    return [next(vectors) if query else None for query in queries]
+
+def _unique(ids):
+    return list(dict.fromkeys(i for i in ids if i))
+
+def retrieve_parents(query_vector, retriever, query=None, k=None):
+    # Echivalentul ParentDocumentRetriever.invoke(), dar pornind de la un
+    # embedding deja calculat (refolosit si de cache-ul semantic). In modul
+    # hybrid, clasamentul dens se fuzioneaza (RRF) cu cel BM25.
+    default_k = retriever.search_kwargs.get("k", TOP_K_DOCUMENTS)
+    k = k or default_k
+    lexical_index = getattr(retriever, "lexical_index", None)
+    use_lexical = RETRIEVAL_MODE in ("hybrid", "lexical") and lexical_index is not None and query
+    use_dense = query_vector is not None and RETRIEVAL_MODE != "lexical"
+
+    rankings = []
+    if use_dense:
+        # Pentru fuziune sau rerank cerem mai multi copii decat parintii necesari
+        fetch_k = k if k == default_k and not use_lexical else max(2 * k, HYBRID_CANDIDATES)
+        with timed("vector_search"):
+            sub_docs = retriever.vectorstore.similarity_search_by_vector(query_vector, k=fetch_k)
+        rankings.append(_unique(d.metadata.get(retriever.id_key) for d in sub_docs))
+    if use_lexical:
+        with timed("lexical_search"):
+            hits = lexical_index.search(query, k=max(2 * k, HYBRID_CANDIDATES))
+        rankings.append(_unique(parent for _, parent, _ in hits))
+
+    ids = reciprocal_rank_fusion(rankings)[:k] if len(rankings) > 1 else (rankings[0][:k] if rankings else [])
+    with timed("docstore"):
+        return [doc for doc in retriever.docstore.mget(ids) if doc is not None]
+
+# Tot textul static sta la inceputul promptului, ca sa poata fi refolosit
+# din PrefixKVCache; dupa el vin doar partile specifice cererii.
+PROMPT_PREFIX = """[INST] Ești un asistent universitar din cadrul Facultatii de Matematica si Informatica (FMI).
+Folosește URMĂTOARELE CONTEXTE din mai multe surse pentru a răspunde complet la întrebare.
+Răspunde în română și sintetizează informațiile din toate sursele.
+
+"""
+
+def build_prompt(query, top_docs):
     # Construim contextul combinat și lista de surse
     context_parts = []
     sources = []
@@ -143,37 +575,316 @@ def query_rag(query, retriever, pipe):
     for i, doc in enumerate(top_docs, 1):
         source = doc.metadata.get('source', 'Unknown')
         sources.append(source)
-        context_parts.append(f"[Sursa {i}: {source}]\n{doc.page_content}")
+        context_parts.append(format_context_part(i, source, doc.page_content))
     
     print(f"[DEBUG] Surse identificate ({len(top_docs)}): {', '.join(sources)}")
     
-    combined_context = "\n\n---\n\n".join(context_parts)
+    combined_context = CONTEXT_SEPARATOR.join(context_parts)
     sources_text = ", ".join([f"Sursa {i+1}: {s}" for i, s in enumerate(sources)])
     
-    prompt = f"""[INST] Ești un asistent universitar din cadrul Facultatii de Matematica si Informatica (FMI).
-Folosește URMĂTOARELE CONTEXTE din mai multe surse pentru a răspunde complet la întrebare.
-
-SURSE: {sources_text}
+    prompt = PROMPT_PREFIX + f"""SURSE: {sources_text}
 
 CONTEXT:
 {combined_context}
 
 ÎNTREBARE: {query}
 
-Răspuns în română (sintetizează informațiile din toate sursele): [/INST]"""
+Răspuns: [/INST]"""
+    return prompt
 
-    output = pipe(prompt)
-    generated_text = output[0]['generated_text']
+def prepare_query(query, retriever, packer=None, query_vector=None):
+    """Partea de retrieval a unei cereri. Intoarce fie un raspuns final
+    ({"answer", "sources"}: intrebare goala, hit in cache, fara context), fie
+    {"query", "prompt", "sources", "query_vector", "documents"} care trebuie generat.
+    `query_vector`, daca e dat, e embedding-ul deja calculat al intrebarii."""
+    if not query:
+        return {"answer": "Te rog să introduci o întrebare.", "sources": []}
+
+    # In modul lexical nu se calculeaza embedding (deci nici cache semantic)
+    if query_vector is None and RETRIEVAL_MODE != "lexical":
+        with timed("embed"):
+            query_vector = embed_query(query, retriever)
+    cached = semantic_cache.lookup(query_vector) if query_vector is not None else None
+    if cached is not None:
+        print("[CACHE] Răspuns servit din cache-ul semantic.")
+        annotate(cache="semantic")
+        answer, sources = cached
+        return {"answer": answer, "sources": sorted(sources)}
+
+    reranker = getattr(retriever, "reranker", None)
+    if reranker is not None:
+        # Aducem mai multi candidati ieftin, apoi pastram doar cei mai relevanti
+        candidates = retrieve_parents(query_vector, retriever, query, k=RERANK_CANDIDATES)
+        with timed("rerank"):
+            relevant_docs = reranker.rerank(query, candidates)
+    else:
+        relevant_docs = retrieve_parents(query_vector, retriever, query)
     
-    print(f"\nRăspuns:\n{generated_text}\n")
+    if not relevant_docs:
+        print("Nu am găsit context relevant.")
+        return {"answer": "Nu am găsit informații relevante în documentele mele despre acest subiect.", "sources": []}
     
-    return generated_text
+    # Folosim TOP_K_DOCUMENTS documente (sau mai puține dacă nu există)
+    top_docs = relevant_docs[:TOP_K_DOCUMENTS]
+    with timed("prompt_build"):
+        if packer is not None:
+            # Fara suprapuneri si in bugetul de tokeni al modelului
+            top_docs, report = packer.pack(top_docs)
+            context_tokens_saved.observe(report["dedup_saved_tokens"])
+            context_tokens_truncated.observe(report["truncated_tokens"])
+            context_tokens.observe(report["packed_tokens"])
+            print(
+                f"[DEBUG] Context: {report['packed_tokens']} tokeni ({report['dedup_saved_tokens']} economisiți, "
+                f"{report['truncated_tokens']} tăiați de buget)"
+            )
+            annotate(context_tokens=report["packed_tokens"])
+        prompt = build_prompt(query, top_docs)
+    annotate(context_docs=len(top_docs), prompt_chars=len(prompt))
+    return {
+        "query": query,
+        "prompt": prompt,
+        "sources": sorted({doc.metadata.get('source', 'Unknown') for doc in top_docs}),
+        "query_vector": query_vector,
+        "documents": top_docs,
+    }
+
+@torch.inference_mode()
+def generate_batch(prompts, pipe, callbacks=None, stats=None, cancelled=None):
+    """Un singur apel generate pentru tot batch-ul (padding la stanga).
+    `callbacks[i]`, daca exista, primeste textul generat pentru promptul i pe
+    masura ce apare. `stats`, daca e dat, se completeaza cu duratele de
+    prefill/decode si numarul de tokeni (vezi metrics.record_generation).
+    `cancelled[i]`, daca exista, e verificat la fiecare pas: cand intoarce
+    True, randul i se opreste (textul lui ramane partial).
+    Cu decodare speculativa (`pipe.speculative_kwargs`), prompturile se
+    genereaza pe rand."""
+    tokenizer, model = pipe.tokenizer, pipe.model
+    speculative = getattr(pipe, "speculative_kwargs", None)
+    if speculative and len(prompts) > 1:
+        # Decodarea speculativa din transformers suporta doar batch size 1
+        return _generate_rows(prompts, pipe, callbacks, stats, cancelled)
+    counters = [getattr(pipe, "forward_counter", None), getattr(pipe, "draft_counter", None)]
+    counts = [counter.count if counter is not None else 0 for counter in counters]
+    prefix_cache = getattr(pipe, "prefix_cache", None)
+    cached = prefix_cache.build_inputs(prompts) if prefix_cache is not None and prefix_cache.matches(prompts) else None
+    if cached is not None:
+        input_ids, attention_mask, past_key_values = cached
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask, "past_key_values": past_key_values}
+        print(f"[DEBUG] Prefill: {prefix_cache.prompt_tokens_saved(len(prompts))} tokeni refolosiți din prefix cache")
+    else:
+        # La fel ca pipeline-ul text-generation: BOS (<s>) adaugat de tokenizer, [INST] e deja in prompt
+        inputs = tokenizer(prompts, return_tensors="pt", padding=True).to(model.device)
+    streamer = None
+    if callbacks and any(callbacks):
+        streamer = BatchTextStreamer(tokenizer, callbacks)
+    streamer = TimingStreamer(streamer)
+    stopping_criteria = None
+    if cancelled and any(cancelled):
+        stopping_criteria = StoppingCriteriaList([CancelledRows(cancelled)])
+
+    output_ids = model.generate(
+        **inputs, **GENERATION_KWARGS, **(speculative or {}), streamer=streamer, stopping_criteria=stopping_criteria,
+        pad_token_id=tokenizer.pad_token_id,
+    )
+    new_tokens = output_ids[:, inputs["input_ids"].shape[1]:]
+    if stats is not None:
+        stats.update(streamer.timings())
+        stats["prompt_tokens"] = int(inputs["attention_mask"].sum())
+        stats["generated_tokens"] = int((new_tokens != tokenizer.pad_token_id).sum())
+        if counters[0] is not None:
+            stats["forwards"] = counters[0].count - counts[0]
+        if counters[1] is not None:
+            stats["draft_forwards"] = counters[1].count - counts[1]
+        if speculative and "forwards" in stats:
+            stats["accepted_tokens"] = acceptance(stats["generated_tokens"], stats["forwards"])["accepted_tokens"]
+    return tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+
+def _generate_rows(prompts, pipe, callbacks=None, stats=None, cancelled=None):
+    callbacks = callbacks or [None] * len(prompts)
+    cancelled = cancelled or [None] * len(prompts)
+    texts = []
+    for prompt, callback, check in zip(prompts, callbacks, cancelled):
+        row_stats = {} if stats is not None else None
+        texts += generate_batch([prompt], pipe, [callback], row_stats, [check])
+        if stats is not None:
+            for key, value in row_stats.items():
+                stats[key] = stats.get(key, 0) + value
+    return texts
+
+def finish_query(prepared, generated_text):
+    print(f"\nRăspuns:\n{generated_text}\n")
+    if prepared["query_vector"] is not None:
+        semantic_cache.add(prepared["query_vector"], generated_text, prepared["sources"])
+    return {"answer": generated_text, "sources": prepared["sources"]}
+
+def retrieve_stage(query, retriever, listener=None, packer=None):
+    """Etapa de retrieval: prepare_query + evenimentele care nu depind de LLM.
+
+    `listener`, daca exista, e apelat cu ("sources", [...]) imediat dupa
+    retrieval; daca raspunsul e deja cunoscut (cache) si cu ("token", raspuns).
+    """
+    prepared = prepare_query(query, retriever, packer)
+    if listener:
+        listener("sources", prepared["sources"])
+        if "answer" in prepared:
+            listener("token", prepared["answer"])
+    return prepared
+
+def generate_stage(jobs, pipe):
+    """Etapa de generare pentru o lista de (prepared, listener): un singur
+    generate in batch; listener-ul primeste ("token", text) pe masura ce apare.
+    Daca `prepared["trace"]` exista, primeste span-urile de asteptare si generare;
+    daca `prepared["cancel"]` (batching.Cancellation) e anulat, randul se opreste."""
+    callbacks = [
+        (lambda text, listener=listener: listener("token", text)) if listener else None
+        for _, listener in jobs
+    ]
+    traces = [p["trace"] for p, _ in jobs if p.get("trace") is not None]
+    for trace in traces:
+        trace.wait("generation_queue")
+    cancellations = [p.get("cancel") for p, _ in jobs]
+    stats = {}
+    start = time.perf_counter()
+    texts = generate_batch(
+        [p["prompt"] for p, _ in jobs], pipe, callbacks, stats,
+        [cancel.is_cancelled if cancel is not None else None for cancel in cancellations],
+    )
+    record_generation(stats)
+    first_token = start + stats["prefill_s"]
+    for trace in traces:
+        # Prefill-ul si decode-ul sunt ale intregului batch
+        trace.add("prefill", start, first_token, batch_size=len(jobs), prompt_tokens=stats["prompt_tokens"])
+        trace.add("decode", first_token, first_token + stats["decode_s"], batch_size=len(jobs),
+                  generated_tokens=stats["generated_tokens"])
+    # Raspunsurile oprite la jumatate nu ajung in cache-ul semantic
+    return [
+        {"answer": text, "sources": p["sources"]} if cancel is not None and cancel.reason else finish_query(p, text)
+        for (p, _), text, cancel in zip(jobs, texts, cancellations)
+    ]
+
+def retrieval_only_answer(prepared):
+    """Raspuns fara LLM, din fragmentele gasite la retrieval (mod degradat,
+    cand serverul e saturat)."""
+    excerpts = [
+        f"[{doc.metadata.get('source', 'Unknown')}]\n{doc.page_content[:DEGRADED_EXCERPT_CHARS].strip()}"
+        for doc in prepared.get("documents", [])
+    ]
+    answer = "Serverul este momentan supraîncărcat. Fragmentele relevante din documente:\n\n" + "\n\n".join(excerpts)
+    return {"answer": answer, "sources": prepared["sources"], "degraded": True}
+
+def retrieve_batch(queries, retriever, packer=None):
+    """prepare_query pentru o lista de intrebari, cu embedding-ul facut o data
+    pentru toate. Fiecare rezultat primeste si "timings": embed_s (al intregii
+    liste) si retrieval_s."""
+    start = time.perf_counter()
+    vectors = embed_queries(queries, retriever)
+    embed_s = time.perf_counter() - start
+    results = []
+    for query, vector in zip(queries, vectors):
+        start = time.perf_counter()
+        prepared = prepare_query(query, retriever, packer, query_vector=vector)
+        prepared["timings"] = {"embed_s": embed_s, "retrieval_s": time.perf_counter() - start}
+        results.append(prepared)
+    return results
+
+def parse_questions(text):
+    """Intrebarile unei cereri batch: lista JSON sau JSONL, cu elemente string
+    sau {"query"} / {"question"}; o linie care nu e JSON e chiar intrebarea.
+    Elementele nu se valideaza aici: un element fara intrebare ramane None."""
+    text = text.strip()
+    if text.startswith("["):
+        items = json.loads(text)
+    else:
+        items = [
+            json.loads(line) if line.lstrip().startswith(("{", '"')) else line.strip()
+            for line in text.splitlines() if line.strip()
+        ]
+    return [item.get("query", item.get("question")) if isinstance(item, dict) else item for item in items]
+
+def batch_line(index, query, result=None, timings=None, error=None):
+    """O linie din raspunsul NDJSON al unei cereri batch (server si CLI)."""
+    line = {"index": index, "query": query}
+    if error is not None:
+        line["error"] = error
+    else:
+        line.update(answer=result["answer"], sources=result["sources"])
+    line["timings"] = timings or {}
+    return line
+
+def answer_batches(queries, retriever, pipe, batch_size=BATCH_QUERY_SIZE, generation_batch_size=BATCH_GENERATION_SIZE):
+    """Raspunsurile pentru o lista lunga de intrebari (evaluare, precalcul),
+    in ordine: embedding si retrieval cate `batch_size` intrebari deodata,
+    generare cate `generation_batch_size` prompturi. Intoarce un generator de
+    linii `batch_line`; timings.generation_s e al batch-ului de generare."""
+    packer = getattr(pipe, "context_packer", None)
+    for offset in range(0, len(queries), batch_size):
+        chunk = queries[offset:offset + batch_size]
+        try:
+            prepared = retrieve_batch(chunk, retriever, packer)
+            pending = [p for p in prepared if "prompt" in p]
+            answers = {}
+            for start in range(0, len(pending), generation_batch_size):
+                jobs = pending[start:start + generation_batch_size]
+                began = time.perf_counter()
+                results = generate_stage([(p, None) for p in jobs], pipe)
+                for p, result in zip(jobs, results):
+                    p["timings"]["generation_s"] = time.perf_counter() - began
+                    answers[id(p)] = result
+        except Exception as e:
+            print(f"[BATCH] Eroare la intrebarile {offset}-{offset + len(chunk) - 1}: {e}")
+            for i, query in enumerate(chunk):
+                yield batch_line(offset + i, query, error=str(e))
+            continue
+        for i, (query, p) in enumerate(zip(chunk, prepared)):
+            yield batch_line(offset + i, query, answers.get(id(p), p), p["timings"])
+
+def answer_batch(queries, retriever, pipe, listeners=None):
+    """Retrieval pentru fiecare intrebare, apoi o singura generare in batch
+    pentru cele care nu au primit deja raspuns."""
+    listeners = listeners or [None] * len(queries)
+    packer = getattr(pipe, "context_packer", None)
+    prepared = [retrieve_stage(query, retriever, listener, packer) for query, listener in zip(queries, listeners)]
+
+    pending = [(p, listener) for p, listener in zip(prepared, listeners) if "prompt" in p]
+    if pending:
+        answers = {id(p): result for (p, _), result in zip(pending, generate_stage(pending, pipe))}
+        prepared = [answers.get(id(p), p) for p in prepared]
+    return prepared
+
+def answer_query(query, retriever, pipe):
+    """Intoarce {"answer": ..., "sources": [...]}; sursele sunt folosite la
+    invalidarea cache-urilor cand fisierele respective se reindexeaza."""
+    return answer_batch([query], retriever, pipe)[0]
+
+def query_rag(query, retriever, pipe):
+    return answer_query(query, retriever, pipe)["answer"]
 
 def main():
+    parser = argparse.ArgumentParser(description="AskFMI in consola: interactiv sau, cu --batch, pentru un fisier de intrebari")
+    parser.add_argument("--batch", help="intrebari: lista JSON sau JSONL (string, {\"query\"} sau {\"question\"})")
+    parser.add_argument("--out", default="answers.jsonl", help="raspunsurile batch, NDJSON, in ordinea intrebarilor")
+    parser.add_argument("--batch-size", type=int, default=BATCH_QUERY_SIZE)
+    parser.add_argument("--generation-batch-size", type=int, default=BATCH_GENERATION_SIZE)
+    args = parser.parse_args()
+
     retriever, pipe = init_rag()
     if not retriever or not pipe:
         return
 
+    if args.batch:
+        with open(args.batch, "r", encoding="utf-8") as f:
+            queries = parse_questions(f.read())
+        invalid = [i for i, query in enumerate(queries) if not isinstance(query, str) or not query.strip()]
+        if invalid:
+            print(f"[BATCH] Intrebari lipsa sau invalide la pozitiile {invalid}")
+            return
+        with open(args.out, "w", encoding="utf-8") as out:
+            for line in answer_batches(queries, retriever, pipe, args.batch_size, args.generation_batch_size):
+                out.write(json.dumps(line, ensure_ascii=False) + "\n")
+                out.flush()
+        print(f"[BATCH] {len(queries)} raspunsuri scrise in {args.out}")
+        return
+
     while True:
         query = input(">> ")
         if query.lower() in ["exit", "quit"]: break
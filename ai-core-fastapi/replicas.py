@@ -0,0 +1,353 @@
+import itertools
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import Future, InvalidStateError
+from functools import partial
+from threading import Lock, Thread
+
+from batching import BatchScheduler
+
+
+class ReplicaUnavailable(RuntimeError):
+    pass
+
+
+class StubGenerator:
+    """Generator fara model, pentru teste si load test: raspunde cu intrebarea
+    din prompt, cuvant cu cuvant, cu `token_delay` secunde intre pasi.
+    Un prompt care contine `crash_marker` opreste brusc procesul, iar unul
+    care contine `hang_marker` blocheaza generarea (ca un generate agatat)."""
+
+    def __init__(self, token_delay=0.01, crash_marker=None, hang_marker=None):
+        self.token_delay = token_delay
+        self.crash_marker = crash_marker
+        self.hang_marker = hang_marker
+
+    def __call__(self, prompts, callbacks=None, stats=None, cancelled=None):
+        start = time.perf_counter()
+        if self.crash_marker and any(self.crash_marker in prompt for prompt in prompts):
+            os._exit(1)
+        if self.hang_marker and any(self.hang_marker in prompt for prompt in prompts):
+            while True:
+                time.sleep(1)
+        callbacks = callbacks or [None] * len(prompts)
+        cancelled = cancelled or [None] * len(prompts)
+        answers = [
+            ["Răspuns", "pentru:"] + prompt.rsplit("ÎNTREBARE:", 1)[-1].split("\n")[0].split()
+            for prompt in prompts
+        ]
+        # Toate randurile avanseaza impreuna, ca la un generate in batch
+        step = 0
+        while step < max(len(words) for words in answers):
+            time.sleep(self.token_delay)
+            for row, (words, callback, check) in enumerate(zip(answers, callbacks, cancelled)):
+                if check and check() and step < len(words):
+                    # La fel ca un rand oprit de stopping criteria: textul ramane partial
+                    answers[row] = words = words[:step]
+                if callback and step < len(words):
+                    callback(words[step] + " ")
+            step += 1
+        if stats is not None:
+            stats.update(prefill_s=0.0, decode_s=time.perf_counter() - start,
+                         prompt_tokens=sum(len(prompt.split()) for prompt in prompts),
+                         generated_tokens=sum(len(words) for words in answers))
+        return [" ".join(words) + " " for words in answers]
+
+
+def _resolve(future, result=None, exception=None):
+    # Clientul poate anula future-ul oricand (deconectare, termen depasit)
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+def _worker_main(worker_id, incarnation, factory, env, requests, events, max_batch_size, max_wait_ms, heartbeat_interval):
+    # Ruleaza in procesul replica: isi incarca propriul model si face batching local.
+    # `events` e capatul de scriere al unui Pipe doar al acestei instante: daca
+    # procesul e omorat in timpul unui send, se strica doar canalul lui.
+    os.environ.update(env)
+    send_lock = Lock()  # trimit thread-ul principal, scheduler-ul si heartbeat-ul
+    progress = {"busy": False, "at": time.monotonic()}
+
+    def send(kind, request_id=None, data=None):
+        with send_lock:
+            events.send((worker_id, incarnation, kind, request_id, data))
+
+    def token(request_id, text):
+        progress["at"] = time.monotonic()
+        send("token", request_id, text)
+
+    generate = factory()
+    pending, cancelled = set(), set()
+
+    def process(jobs):
+        # Cererile anulate cat au stat in coada nu mai intra in batch
+        for request_id, _ in jobs:
+            if request_id in cancelled:
+                pending.discard(request_id)
+                cancelled.discard(request_id)
+        results = [None] * len(jobs)
+        jobs = [job for job in jobs if job[0] in pending]
+        if not jobs:
+            return results
+        callbacks = [partial(token, request_id) for request_id, _ in jobs]
+        checks = [(lambda request_id=request_id: request_id in cancelled) for request_id, _ in jobs]
+        stats = {}
+        progress.update(busy=True, at=time.monotonic())
+        try:
+            texts = generate([prompt for _, prompt in jobs], callbacks, stats, checks)
+        except Exception as e:
+            for request_id, _ in jobs:
+                send("error", request_id, str(e))
+        else:
+            if stats:
+                send("stats", data=stats)
+            for (request_id, _), text in zip(jobs, texts):
+                send("done", request_id, text)
+        finally:
+            progress["busy"] = False
+            for request_id, _ in jobs:
+                pending.discard(request_id)
+                cancelled.discard(request_id)
+        return results
+
+    scheduler = BatchScheduler(process, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                               name=f"replica-{worker_id}")
+    scheduler.start()
+
+    def heartbeat():
+        # Heartbeat-ul spune si de cat timp nu a mai avansat batch-ul curent:
+        # un generate blocat nu opreste thread-ul acesta, dar se vede aici
+        while True:
+            send("heartbeat", data=time.monotonic() - progress["at"] if progress["busy"] else 0.0)
+            time.sleep(heartbeat_interval)
+
+    Thread(target=heartbeat, name="heartbeat", daemon=True).start()
+    send("ready")
+    while True:
+        job = requests.get()
+        if job is None:
+            break
+        request_id, prompt = job
+        if prompt is None:
+            # (request_id, None) = anulare: generarea randului se opreste la pasul urmator
+            if request_id in pending:
+                cancelled.add(request_id)
+            continue
+        pending.add(request_id)
+        scheduler.submit(job)
+
+
+class _Replica:
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.incarnation = 0
+        self.process = None
+        self.requests = None
+        self.ready = False
+        self.inflight = {}  # request_id -> (future, on_token)
+        self.started_at = 0.0
+        self.last_heartbeat = 0.0
+        self.stalled_s = 0.0  # de cat timp nu a avansat generarea in curs
+        self.served = 0
+        self.restarts = 0
+        self.backoff = 1.0
+        self.next_start = 0.0
+
+
+class GenerationReplicas:
+    """N procese de generare, fiecare cu propria instanta de model.
+
+    `factory()` ruleaza in fiecare proces si intoarce un generator
+    `generate(prompts, callbacks, stats, cancelled) -> texte` (ex.
+    generate_batch peste un pipe sau StubGenerator). Dictionarul `stats` completat de generator
+    pentru fiecare batch ajunge la `on_stats(stats)` in procesul principal. Cererile merg la replica cu cele mai putine cereri in
+    lucru.
+
+    Fiecare instanta de replica are propriul Pipe de evenimente, citit de un
+    thread separat. Un thread de monitorizare reporneste replicile care au
+    murit, nu mai trimit heartbeat sau au un batch care nu a mai avansat de
+    `stall_timeout` secunde; cererile lor in lucru esueaza cu ReplicaUnavailable.
+    """
+
+    def __init__(self, factory, replicas=2, max_batch_size=4, max_wait_ms=30, devices=None, heartbeat_interval=1.0,
+                 heartbeat_timeout=60.0, startup_timeout=900.0, stall_timeout=300.0, name="generation", on_stats=None):
+        self.factory = factory
+        self.on_stats = on_stats
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.devices = devices or []
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_timeout = startup_timeout
+        self.stall_timeout = stall_timeout
+        self.name = name
+        self._ctx = mp.get_context("spawn")  # CUDA nu suporta fork dupa initializare
+        self._replicas = [_Replica(i) for i in range(replicas)]
+        self._ids = itertools.count()
+        self._lock = Lock()
+        self._started = False
+        self._stopping = False
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for replica in self._replicas:
+                self._spawn(replica)
+        Thread(target=self._monitor, name=f"{self.name}-monitor", daemon=True).start()
+
+    def _spawn(self, replica):
+        replica.incarnation += 1
+        replica.requests = self._ctx.Queue()
+        replica.ready = False
+        replica.stalled_s = 0.0
+        replica.started_at = replica.last_heartbeat = time.monotonic()
+        env = {"CUDA_VISIBLE_DEVICES": self.devices[replica.worker_id % len(self.devices)]} if self.devices else {}
+        events, child_events = self._ctx.Pipe(duplex=False)
+        replica.process = self._ctx.Process(
+            target=_worker_main, name=f"{self.name}-replica-{replica.worker_id}", daemon=True,
+            args=(replica.worker_id, replica.incarnation, self.factory, env, replica.requests, child_events,
+                  self.max_batch_size, self.max_wait_ms, self.heartbeat_interval),
+        )
+        replica.process.start()
+        child_events.close()  # altfel citirea nu ar primi EOF cand moare replica
+        Thread(target=self._read_events, args=(replica.incarnation, events), daemon=True,
+               name=f"{self.name}-events-{replica.worker_id}-{replica.incarnation}").start()
+        print(f"[{self.name}] Replica {replica.worker_id} pornita (pid {replica.process.pid}).")
+
+    def _read_events(self, incarnation, events):
+        # Se opreste cand instanta moare (EOF) sau lasa un mesaj trunchiat in pipe
+        while True:
+            try:
+                worker_id, incarnation, kind, request_id, data = events.recv()
+            except Exception:
+                events.close()
+                return
+            if kind == "stats":
+                if self.on_stats:
+                    self.on_stats(data)
+                continue
+            entry = None
+            with self._lock:
+                replica = self._replicas[worker_id]
+                if incarnation != replica.incarnation:
+                    continue  # mesaj intarziat de la o instanta deja repornita
+                replica.last_heartbeat = time.monotonic()
+                if kind == "heartbeat":
+                    replica.stalled_s = data or 0.0
+                elif kind == "ready":
+                    replica.ready = True
+                    replica.backoff = 1.0
+                    print(f"[{self.name}] Replica {worker_id} gata in {time.monotonic() - replica.started_at:.1f}s.")
+                elif kind == "token":
+                    entry = replica.inflight.get(request_id)
+                elif kind in ("done", "error"):
+                    entry = replica.inflight.pop(request_id, None)
+            if entry is None:
+                continue
+            future, on_token = entry
+            if kind == "token":
+                if on_token:
+                    on_token(data)
+            elif kind == "done":
+                _resolve(future, result=data)
+            else:
+                _resolve(future, exception=RuntimeError(data))
+
+    def _monitor(self):
+        while not self._stopping:
+            time.sleep(self.heartbeat_interval)
+            now = time.monotonic()
+            for replica in self._replicas:
+                failed = {}
+                with self._lock:
+                    if self._stopping:
+                        return
+                    process = replica.process
+                    if process is not None:
+                        timeout = self.heartbeat_timeout if replica.ready else self.startup_timeout
+                        dead = not process.is_alive()
+                        stalled = replica.stalled_s > self.stall_timeout
+                        if dead or stalled or now - replica.last_heartbeat > timeout:
+                            if dead:
+                                reason = f"exit code {process.exitcode}"
+                            else:
+                                reason = f"generare blocata de {replica.stalled_s:.0f}s" if stalled else "fara heartbeat"
+                            print(f"[{self.name}] Replica {replica.worker_id} picata ({reason}), repornire in {replica.backoff:.0f}s.")
+                            if not dead:
+                                process.kill()
+                            failed, replica.inflight = replica.inflight, {}
+                            replica.process = None
+                            replica.ready = False
+                            replica.restarts += 1
+                            replica.next_start = now + replica.backoff
+                            # Backoff exponential daca replica pica imediat dupa pornire (ex. model lipsa)
+                            replica.backoff = min(replica.backoff * 2, 60.0)
+                    if replica.process is None and now >= replica.next_start:
+                        self._spawn(replica)
+                for future, _ in failed.values():
+                    _resolve(future, exception=ReplicaUnavailable(f"Replica {replica.worker_id} a picat in timpul generarii."))
+
+    def ready(self):
+        with self._lock:
+            return any(replica.ready for replica in self._replicas)
+
+    def submit(self, prompt, on_token=None):
+        """Intoarce un Future cu textul generat; `on_token(text)` primeste textul pe masura ce apare.
+        `future.cancel()` opreste generarea in replica."""
+        future = Future()
+        with self._lock:
+            candidates = [replica for replica in self._replicas if replica.ready]
+            if not candidates:
+                raise ReplicaUnavailable("Nicio replica de generare nu este disponibila.")
+            replica = min(candidates, key=lambda r: len(r.inflight))
+            request_id = next(self._ids)
+            replica.inflight[request_id] = (future, on_token)
+            replica.served += 1
+            replica.requests.put((request_id, prompt))
+        future.add_done_callback(partial(self._cancel, replica, replica.incarnation, request_id))
+        return future
+
+    def _cancel(self, replica, incarnation, request_id, future):
+        if not future.cancelled():
+            return
+        with self._lock:
+            if incarnation == replica.incarnation and replica.inflight.pop(request_id, None) is not None:
+                replica.requests.put((request_id, None))
+
+    def stop(self):
+        with self._lock:
+            self._stopping = True
+            replicas = [r for r in self._replicas if r.process is not None]
+        for replica in replicas:
+            replica.requests.put(None)
+        for replica in replicas:
+            replica.process.join(timeout=5)
+            if replica.process.is_alive():
+                replica.process.kill()
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "replicas": [
+                    {
+                        "id": r.worker_id,
+                        "pid": r.process.pid if r.process is not None else None,
+                        "ready": r.ready,
+                        "inflight": len(r.inflight),
+                        "served": r.served,
+                        "restarts": r.restarts,
+                        "heartbeat_age_s": now - r.last_heartbeat,
+                        "stalled_s": r.stalled_s,
+                    }
+                    for r in self._replicas
+                ],
+            }
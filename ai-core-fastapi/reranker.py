@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from index_manifest import hash_text
+from metrics import RollingStats
+
+
+class ParentReranker:
+    """Reordoneaza parintii gasiti la retrieval cu un cross-encoder multilingv.
+
+    Toate perechile (intrebare, parinte) se scoreaza intr-un singur batch;
+    scorurile se pastreaza intr-un LRU dupa (hash intrebare, hash parinte),
+    deci intrebarile repetate nu mai ajung la model.
+    """
+
+    def __init__(self, model_name, device="cuda", top_n=3, cache_size=4096, max_length=512):
+        from sentence_transformers import CrossEncoder
+
+        print(f"Loading reranker {model_name}...")
+        self.model = CrossEncoder(model_name, device=device, max_length=max_length)
+        self.top_n = top_n
+        self.cache_size = cache_size
+        self.latency = RollingStats()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._scores = OrderedDict()
+        self._lock = Lock()
+
+    def _cached(self, key):
+        with self._lock:
+            score = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+            return score
+
+    def _store(self, items):
+        with self._lock:
+            for key, score in items:
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.cache_size:
+                self._scores.popitem(last=False)
+
+    def score(self, query, docs):
+        query_hash = hash_text(query)
+        keys = [(query_hash, hash_text(doc.page_content)) for doc in docs]
+        scores = [self._cached(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            predicted = self.model.predict([(query, docs[i].page_content) for i in missing], batch_size=len(missing))
+            for i, score in zip(missing, predicted):
+                scores[i] = float(score)
+            self._store((keys[i], scores[i]) for i in missing)
+        return scores
+
+    def rerank(self, query, docs):
+        if not docs:
+            return []
+        start = time.perf_counter()
+        scores = self.score(query, docs)
+        ranked = sorted(zip(docs, scores), key=lambda pair: pair[1], reverse=True)[:self.top_n]
+        self.latency.observe(time.perf_counter() - start)
+        return [doc for doc, _ in ranked]
+
+    def stats(self):
+        with self._lock:
+            total = self.cache_hits + self.cache_misses
+            return {
+                "top_n": self.top_n,
+                "latency": self.latency.summary(),
+                "score_cache_entries": len(self._scores),
+                "score_cache_hit_rate": self.cache_hits / total if total else 0.0,
+            }
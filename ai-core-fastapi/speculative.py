@@ -0,0 +1,48 @@
+class ForwardCounter:
+    """Numara apelurile forward ale unui model. La decodarea normala e un
+    forward per token generat; la decodarea speculativa un forward al
+    modelului mare verifica mai multi tokeni propusi deodata."""
+
+    def __init__(self, model):
+        self.count = 0
+        self._handle = model.register_forward_hook(self._hook)
+
+    def _hook(self, module, args, output):
+        self.count += 1
+
+    def remove(self):
+        self._handle.remove()
+
+
+def speculative_kwargs(mode, tokens, max_ngram=3, assistant_model=None):
+    """Argumentele pentru `model.generate`.
+
+    draft: un model mic (cu acelasi tokenizer) propune `tokens` tokeni, pe care
+    modelul mare ii verifica intr-un singur forward.
+    prompt_lookup: propunerile sunt continuarea celui mai lung n-gram (pana la
+    `max_ngram`) din prompt care se potriveste cu finalul textului generat;
+    fara model suplimentar, util cand raspunsul copiaza din context.
+    """
+    if mode == "draft":
+        # transformers citeste lookahead-ul din generation_config-ul modelului draft,
+        # nu din argumentele lui generate; fara prag de incredere, propune mereu `tokens`
+        config = assistant_model.generation_config
+        config.num_assistant_tokens = tokens
+        config.num_assistant_tokens_schedule = "constant"
+        config.assistant_confidence_threshold = 0.0
+        return {"assistant_model": assistant_model}
+    if mode == "prompt_lookup":
+        return {"prompt_lookup_num_tokens": tokens, "max_matching_ngram_size": max_ngram}
+    return {}
+
+
+def acceptance(generated_tokens, forwards, draft_forwards=None):
+    """Fiecare forward de verificare produce tokenii acceptati + unul al
+    modelului mare, deci tokenii acceptati = generati - forward-uri. Modelul
+    draft face (aproximativ) un forward per token propus."""
+    accepted = max(generated_tokens - forwards, 0)
+    return {
+        "tokens_per_forward": generated_tokens / forwards if forwards else 0.0,
+        "accepted_tokens": accepted,
+        "acceptance_rate": accepted / draft_forwards if draft_forwards else None,
+    }
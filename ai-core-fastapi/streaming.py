@@ -0,0 +1,103 @@
+import json
+import time
+
+import torch
+from transformers import StoppingCriteria
+from transformers.generation.streamers import BaseStreamer
+
+
+class BatchTextStreamer(BaseStreamer):
+    """Streamer pentru `model.generate` care suporta batch-uri.
+
+    `TextStreamer` din transformers accepta doar batch size 1; aici fiecare rand
+    din batch are callback-ul lui (`callbacks[i](text)`, sau None), care primeste
+    doar textul nou aparut de la pasul anterior.
+    """
+
+    def __init__(self, tokenizer, callbacks):
+        self.tokenizer = tokenizer
+        self.callbacks = callbacks
+        self._prompt_seen = False
+        self._token_ids = [[] for _ in callbacks]
+        self._emitted = [0] * len(callbacks)
+        self._finished = [callback is None for callback in callbacks]
+
+    def _flush(self, row, final=False):
+        text = self.tokenizer.decode(self._token_ids[row], skip_special_tokens=True)
+        # Un caracter multi-token (ex. diacritice) apare ca � pana e complet
+        if not final and text.endswith("�"):
+            return
+        delta = text[self._emitted[row]:]
+        if delta:
+            self._emitted[row] = len(text)
+            self.callbacks[row](delta)
+
+    def put(self, value):
+        # Primul apel contine promptul, nu tokeni generati
+        if not self._prompt_seen:
+            self._prompt_seen = True
+            return
+        # De obicei un token per rand; la decodarea speculativa, toti tokenii acceptati deodata
+        for row, tokens in enumerate(value.reshape(len(self.callbacks), -1).tolist()):
+            if self._finished[row]:
+                continue
+            for token in tokens:
+                if token == self.tokenizer.eos_token_id:
+                    # Dupa EOS, generate continua sa puna padding pe acest rand
+                    self._finished[row] = True
+                    self._flush(row, final=True)
+                    break
+                self._token_ids[row].append(token)
+            else:
+                self._flush(row)
+
+    def end(self):
+        for row, finished in enumerate(self._finished):
+            if not finished:
+                self._finished[row] = True
+                self._flush(row, final=True)
+
+
+class TimingStreamer(BaseStreamer):
+    """Masoara prefill-ul (pana la primul token generat) si decode-ul unui
+    `generate`, optional transmitand totul mai departe unui alt streamer."""
+
+    def __init__(self, inner=None):
+        self.inner = inner
+        self.start = time.perf_counter()
+        self.first_token = None
+        self.finished = None
+        self._puts = 0
+
+    def put(self, value):
+        self._puts += 1
+        # Primul put e promptul; al doilea e primul token, dupa prefill
+        if self._puts == 2:
+            self.first_token = time.perf_counter()
+        if self.inner is not None:
+            self.inner.put(value)
+
+    def end(self):
+        self.finished = time.perf_counter()
+        if self.inner is not None:
+            self.inner.end()
+
+    def timings(self):
+        finished = self.finished or time.perf_counter()
+        first_token = self.first_token or finished
+        return {"prefill_s": first_token - self.start, "decode_s": finished - first_token}
+
+
+class CancelledRows(StoppingCriteria):
+    """Opreste randurile din batch ale caror cereri au fost anulate
+    (`checks[i]()` intoarce True); celelalte randuri continua."""
+
+    def __init__(self, checks):
+        self.checks = checks
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.tensor([bool(check and check()) for check in self.checks], dtype=torch.bool, device=input_ids.device)
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,40 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def tiny_lm():
+    """Model Mistral minuscul cu ponderi aleatoare si un tokenizer ca al lui
+    Mistral (BOS <s> adaugat automat, spatiul "▁" pus in fata textului), fara
+    descarcari. Intoarce (model, tokenizer) configurate ca in load_tokenizer."""
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, processors, trainers
+    from transformers import MistralConfig, MistralForCausalLM, PreTrainedTokenizerFast
+
+    from rag_pipeline import PROMPT_PREFIX
+
+    corpus = [
+        PROMPT_PREFIX,
+        "SURSE: Sursa 1: taxe.txt\n\nCONTEXT:\nTaxa de școlarizare este 100 lei pe an.\n\n"
+        "ÎNTREBARE: Cât este taxa?\n\nRăspuns: [/INST]",
+        "ăâîșț ĂÂÎȘȚ abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ 0123456789 .,:;?!()[]/-_\n",
+    ]
+    backend = Tokenizer(models.BPE(unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.Metaspace()
+    backend.decoder = decoders.Metaspace()
+    backend.train_from_iterator(corpus, trainers.BpeTrainer(vocab_size=300, special_tokens=["<unk>", "<s>", "</s>"]))
+    backend.post_processor = processors.TemplateProcessing(single="<s> $A", special_tokens=[("<s>", 1)])
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, bos_token="<s>", eos_token="</s>", unk_token="<unk>")
+    tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+
+    torch.manual_seed(0)
+    config = MistralConfig(
+        vocab_size=len(tokenizer), hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=2, head_dim=8, bos_token_id=1, eos_token_id=2,
+    )
+    model = MistralForCausalLM(config).eval()
+    return model, tokenizer
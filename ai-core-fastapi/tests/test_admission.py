@@ -0,0 +1,162 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import threading
+import time
+
+import pytest
+import torch
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+
+import main
+import rag_pipeline
+from batching import AdmissionControl, Cancellation
+from streaming import CancelledRows
+from tracing import Trace
+
+
+def test_cancellation_deadline_runs_callbacks_once():
+    calls = []
+    cancel = Cancellation(timeout=0.05)
+    cancel.on_cancel(lambda: calls.append("queued"))
+    assert not cancel.is_cancelled()
+    time.sleep(0.06)
+    assert cancel.is_cancelled() and cancel.reason == "deadline"
+    cancel.cancel("disconnect")
+    assert cancel.reason == "deadline"
+    cancel.on_cancel(lambda: calls.append("late"))
+    assert calls == ["queued", "late"]
+    assert Cancellation().remaining() is None
+
+
+def test_admission_control_limit():
+    admission = AdmissionControl(2)
+    assert admission.try_acquire() and admission.try_acquire()
+    assert not admission.try_acquire()
+    admission.release()
+    assert admission.try_acquire()
+    assert admission.stats() == {"limit": 2, "active": 2, "admitted": 3, "rejected": 1}
+
+
+def test_cancelled_rows_stops_only_cancelled_rows():
+    cancelled = threading.Event()
+    criteria = CancelledRows([None, cancelled.is_set])
+    input_ids = torch.zeros(2, 3, dtype=torch.long)
+    assert criteria(input_ids, None).tolist() == [False, False]
+    cancelled.set()
+    assert criteria(input_ids, None).tolist() == [False, True]
+
+
+@pytest.fixture
+def slow_pipeline(monkeypatch):
+    """Generare care ruleaza pana la anulare (sau 2s); `seen` retine daca s-a oprit
+    si de cate ori a rulat retrieval-ul."""
+    seen = {"retrievals": 0}
+
+    def retrieve_stage(query, retriever, listener=None, packer=None):
+        seen["retrievals"] += 1
+        if listener:
+            listener("sources", ["taxe.txt"])
+        return {
+            "query": query, "prompt": f"ÎNTREBARE: {query}", "sources": ["taxe.txt"], "query_vector": None,
+            "documents": [Document(page_content="Taxa de școlarizare este 100 lei.", metadata={"source": "taxe.txt"})],
+        }
+
+    def generate_batch(prompts, pipe, callbacks=None, stats=None, cancelled=None):
+        seen["stopped"] = False
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            if cancelled and cancelled[0] and cancelled[0]():
+                seen["stopped"] = True
+                break
+            if callbacks and callbacks[0]:
+                callbacks[0]("bla ")
+            time.sleep(0.01)
+        stats.update(prefill_s=0.0, decode_s=0.0, prompt_tokens=1, generated_tokens=1)
+        return ["bla" for _ in prompts]
+
+    monkeypatch.setattr(main, "retrieve_stage", retrieve_stage)
+    monkeypatch.setattr(rag_pipeline, "generate_batch", generate_batch)
+    monkeypatch.setattr(main, "retriever", object())
+    monkeypatch.setattr(main, "pipe", object())
+    main.retrieval.start()
+    main.generation.start()
+    main.exact_cache.clear()
+    return seen
+
+
+def test_query_deadline_stops_generation(slow_pipeline):
+    client = TestClient(main.app)
+    start = time.monotonic()
+    response = client.post("/query", json={"query": "cat e taxa?", "timeout_s": 0.2})
+    assert response.status_code == 504
+    assert time.monotonic() - start < 1.5
+    time.sleep(0.1)
+    assert slow_pipeline["stopped"]
+    assert main.admission.stats()["active"] == 0
+
+
+def test_closed_stream_cancels_generation(slow_pipeline):
+    async def consume():
+        cancel = Cancellation()
+        stream = main._stream_query("intrebare", Trace(), cancel)
+        events = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        return events, cancel
+
+    events, cancel = asyncio.run(consume())
+    assert [event for event, _ in events] == ["sources", "token"]
+    assert cancel.reason == "disconnect"
+    time.sleep(0.1)
+    assert slow_pipeline["stopped"]
+
+
+def test_identical_streams_share_one_generation(slow_pipeline):
+    async def consume():
+        first = main._shared_stream("cat e taxa?", Trace(), Cancellation(timeout=0.3))
+        assert await first.__anext__() == ("sources", ["taxe.txt"])
+        assert (await first.__anext__())[0] == "token"
+        # Intra dupa ce primul a primit deja sursele: le primeste si el, apoi token-urile noi
+        second_trace = Trace()
+        second = main._shared_stream("Cât e taxa?", second_trace, Cancellation())
+        assert await second.__anext__() == ("sources", ["taxe.txt"])
+        with pytest.raises(main.HTTPException) as error:
+            async for _ in first:
+                pass
+        assert error.value.status_code == 504
+        # Termenul primului client nu opreste generarea pe care o asteapta al doilea
+        assert not slow_pipeline["stopped"]
+        assert (await second.__anext__())[0] == "token"
+        await second.aclose()
+        assert second_trace.to_dict()["attributes"] == {"shared": True}
+        await asyncio.sleep(0.1)
+
+    shared = main.streams.shared
+    asyncio.run(consume())
+    assert slow_pipeline["retrievals"] == 1
+    assert main.streams.shared == shared + 1
+    # Dupa ce au plecat toti clientii, generarea comuna e anulata
+    assert slow_pipeline["stopped"]
+    assert main.admission.stats()["active"] == 0
+
+
+def test_saturated_server_rejects_or_degrades(slow_pipeline, monkeypatch):
+    admission = AdmissionControl(1)
+    admission.try_acquire()
+    monkeypatch.setattr(main, "admission", admission)
+    client = TestClient(main.app)
+
+    response = client.post("/query", json={"query": "cat e taxa?"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+    monkeypatch.setattr(main, "DEGRADED_MODE", True)
+    response = client.post("/query", json={"query": "cat e taxa?"})
+    assert response.status_code == 200
+    assert response.json()["degraded"] is True
+    assert "Taxa de școlarizare este 100 lei." in response.json()["answer"]
+    # Raspunsul degradat nu ramane in cache
+    assert main.exact_cache.get("cat e taxa?") is None
@@ -0,0 +1,135 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import time
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+import main
+import rag_pipeline
+from answer_cache import SemanticCache, ExactAnswerCache, SingleFlight, normalize_query
+
+
+def test_semantic_cache_hit_above_threshold():
+    cache = SemanticCache(threshold=0.9, ttl=60, max_entries=10)
+    cache.add([1.0, 0.0, 0.0], "Admiterea începe în iulie.")
+
+    assert cache.lookup([0.99, 0.05, 0.0])[0] == "Admiterea începe în iulie."
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_semantic_cache_evicts_least_recently_used():
+    cache = SemanticCache(threshold=0.99, ttl=60, max_entries=2)
+    cache.add([1.0, 0.0], "a")
+    cache.add([0.0, 1.0], "b")
+    cache.lookup([1.0, 0.0])
+    cache.add([-1.0, 0.0], "c")
+
+    assert cache.lookup([1.0, 0.0])[0] == "a"
+    assert cache.lookup([0.0, 1.0]) is None
+    assert cache.lookup([-1.0, 0.0])[0] == "c"
+
+
+def test_semantic_cache_ttl_and_clear():
+    cache = SemanticCache(threshold=0.9, ttl=0.01, max_entries=10)
+    cache.add([1.0, 0.0], "a")
+    time.sleep(0.02)
+    assert cache.lookup([1.0, 0.0]) is None
+
+    cache.ttl = 60
+    cache.add([1.0, 0.0], "a")
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+
+def test_normalize_query_folds_case_whitespace_and_diacritics():
+    assert normalize_query("  Când  e ADMITEREA? ") == normalize_query("cand e admiterea?")
+    assert normalize_query("taxă școlarizare") == normalize_query("taxa şcolarizare")
+
+
+def test_exact_cache_invalidates_only_dependent_sources():
+    cache = ExactAnswerCache(ttl=60, max_entries=10)
+    cache.put("taxe", "100 lei", ["data/taxe.txt"])
+    cache.put("orar", "luni 8-10", ["data/orar.txt", "data/sali.txt"])
+
+    assert cache.invalidate_sources(["data/sali.txt"]) == 1
+    assert cache.get("orar") is None
+    assert cache.get("taxe") == ("100 lei", frozenset({"data/taxe.txt"}))
+
+
+def test_reindex_endpoint_invalidates_live_cache(monkeypatch):
+    report = {"added": [], "changed": ["data/taxe.txt"], "removed": [], "unchanged": 1, "full_rebuild": False}
+    monkeypatch.setattr(rag_pipeline, "index_documents", lambda retriever: dict(report))
+    monkeypatch.setattr(main, "retriever", SimpleNamespace(read_only=False))
+    main.exact_cache.clear()
+    main.exact_cache.put("taxe", "100 lei", ["data/taxe.txt"])
+    main.exact_cache.put("orar", "luni 8-10", ["data/orar.txt"])
+    client = TestClient(main.app)
+    assert client.post("/admin/reindex").status_code == 404
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    assert client.post("/admin/reindex", headers={"X-Admin-Token": "gresit"}).status_code == 403
+    response = client.post("/admin/reindex", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json()["changed"] == ["data/taxe.txt"] and response.json()["evicted"] == 1
+    assert main.exact_cache.get("taxe") is None
+    assert main.exact_cache.get("orar") is not None
+
+    monkeypatch.setattr(main, "retriever", SimpleNamespace(read_only=True))
+    assert client.post("/admin/reindex", headers={"X-Admin-Token": "secret"}).status_code == 409
+    main.exact_cache.clear()
+
+
+def test_reindex_endpoint_flushes_semantic_cache(monkeypatch):
+    report = {"added": [], "changed": [], "removed": ["data/taxe.txt"], "unchanged": 0, "full_rebuild": False}
+    monkeypatch.setattr(rag_pipeline, "index_documents", lambda retriever: dict(report))
+    monkeypatch.setattr(main, "retriever", SimpleNamespace(read_only=False))
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    cache = rag_pipeline.semantic_cache
+    cache.clear()
+    cache.add([1.0, 0.0], "100 lei", ["data/taxe.txt"])
+    cache.add([0.0, 1.0], "luni 8-10", ["data/orar.txt"])
+    client = TestClient(main.app)
+
+    assert client.post("/admin/reindex", headers={"X-Admin-Token": "secret"}).json()["evicted"] == 1
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.lookup([0.0, 1.0])[0] == "luni 8-10"
+
+    # Configuratia indexului s-a schimbat: toate raspunsurile sunt invechite
+    report.update(removed=[], full_rebuild=True)
+    assert client.post("/admin/reindex", headers={"X-Admin-Token": "secret"}).status_code == 200
+    assert cache.stats()["entries"] == 0
+
+
+def test_singleflight_shares_concurrent_calls():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return "raspuns"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    follower.start()
+    while flight.shared == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert results == ["raspuns", "raspuns"]
+    assert len(calls) == 1
@@ -0,0 +1,125 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import threading
+from concurrent.futures import Future
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import rag_pipeline
+from batching import Cancellation
+from rag_pipeline import answer_batches, parse_questions
+
+
+def test_parse_questions_accepts_list_and_jsonl():
+    assert parse_questions('["taxa?", {"query": "burse?"}]') == ["taxa?", "burse?"]
+    jsonl = '{"question": "taxa?", "sources": ["taxe"]}\n\n"burse?"\ncazare?\n'
+    assert parse_questions(jsonl) == ["taxa?", "burse?", "cazare?"]
+    assert parse_questions('[{"foo": 1}, 2]') == [None, 2]
+
+
+@pytest.fixture
+def stub_generation(monkeypatch):
+    """prepare_query fara index si generate_batch care raspunde cu intrebarea."""
+    batches = []
+
+    def prepare_query(query, retriever, packer=None, query_vector=None):
+        if not query:
+            return {"answer": "Te rog să introduci o întrebare.", "sources": []}
+        return {"query": query, "prompt": f"ÎNTREBARE: {query}", "sources": ["taxe.txt"], "query_vector": None}
+
+    def generate_batch(prompts, pipe, callbacks=None, stats=None, cancelled=None):
+        batches.append(len(prompts))
+        stats.update(prefill_s=0.0, decode_s=0.0, prompt_tokens=1, generated_tokens=1)
+        return [prompt.split(": ", 1)[1].upper() for prompt in prompts]
+
+    monkeypatch.setattr(rag_pipeline, "RETRIEVAL_MODE", "lexical")  # fara embedding
+    monkeypatch.setattr(rag_pipeline, "prepare_query", prepare_query)
+    monkeypatch.setattr(rag_pipeline, "generate_batch", generate_batch)
+    return batches
+
+
+def test_answer_batches_keeps_order_and_batches_generation(stub_generation):
+    queries = ["a", "b", "", "c", "d"]
+    lines = list(answer_batches(queries, retriever=None, pipe=None, batch_size=3, generation_batch_size=2))
+    assert [line["index"] for line in lines] == [0, 1, 2, 3, 4]
+    assert [line["answer"] for line in lines] == ["A", "B", "Te rog să introduci o întrebare.", "C", "D"]
+    # Intrebarile 0-2 (doar doua de generat), apoi 3-4
+    assert stub_generation == [2, 2]
+    assert set(lines[0]["timings"]) == {"embed_s", "retrieval_s", "generation_s"}
+    assert "generation_s" not in lines[2]["timings"]
+
+
+def test_batch_endpoint_streams_ndjson_in_order(stub_generation, monkeypatch):
+    monkeypatch.setattr(main, "retriever", object())
+    monkeypatch.setattr(main, "pipe", object())
+    monkeypatch.setattr(main, "BATCH_QUERY_SIZE", 2)
+    monkeypatch.setattr(main, "BATCH_INFLIGHT", 1)
+    main.generation.start()
+    main.exact_cache.clear()
+    client = TestClient(main.app)
+
+    response = client.post("/query/batch", json={"queries": ["taxa", "burse", "cazare"]})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["index"], line["answer"]) for line in lines] == [(0, "TAXA"), (1, "BURSE"), (2, "CAZARE")]
+    assert lines[0]["timings"]["generation_s"] >= 0
+    assert main.exact_cache.get("taxa") is not None
+    assert main.admission.stats()["active"] == 0
+    # O singura intrebare a cererii la generare deodata
+    assert stub_generation == [1, 1, 1]
+
+    response = client.post("/query/batch", content='{"query": "taxa"}\n"burse"\n')
+    assert [json.loads(line)["answer"] for line in response.text.splitlines()] == ["TAXA", "BURSE"]
+
+    for body in ["[1, 2]", '{"foo": 1}', '[{"foo": 1}]', '{"queries": "taxa"}', '["taxa", " "]']:
+        assert client.post("/query/batch", content=body).status_code == 400
+    monkeypatch.setattr(main, "BATCH_MAX_QUERIES", 1)
+    assert client.post("/query/batch", json=["a", "b"]).status_code == 413
+
+
+def test_batch_waits_for_window_and_interactive_requests(monkeypatch):
+    room = threading.Event()
+    monkeypatch.setattr(main, "BATCH_INFLIGHT", 1)
+    monkeypatch.setattr(main, "_generation_has_room", room.is_set)
+    pending = Future()
+    window = [pending]
+
+    # Fereastra e plina: asteapta pana termina intrebarea anterioara
+    timer = threading.Timer(0.1, pending.set_result, args=[{}])
+    timer.start()
+    room.set()
+    assert main._wait_for_generation_slot(window, Cancellation())
+    assert window == []
+
+    # Cereri interactive in coada: batch-ul asteapta pana e anulat
+    room.clear()
+    assert not main._wait_for_generation_slot(window, Cancellation(timeout=0.1))
+
+
+def test_batch_response_releases_admission_on_early_disconnect():
+    assert main.admission.try_acquire()
+    active = main.admission.stats()["active"]
+    started = []
+
+    async def lines():
+        started.append(True)
+        yield "{}\n"
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("clientul a inchis conexiunea")
+
+    response = main._AdmittedResponse(lines(), media_type="application/x-ndjson")
+    with pytest.raises(Exception):
+        asyncio.run(response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send))
+    assert started == []
+    assert main.admission.stats()["active"] == active - 1
@@ -0,0 +1,36 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from batching import BatchScheduler
+
+
+def test_scheduler_groups_concurrent_requests():
+    seen = []
+
+    def process(items):
+        seen.append(list(items))
+        return [item.upper() for item in items]
+
+    scheduler = BatchScheduler(process, max_batch_size=3, max_wait_ms=200)
+    futures = [scheduler.submit(q) for q in ["a", "b", "c", "d"]]
+    scheduler.start()
+
+    assert [f.result(timeout=2) for f in futures] == ["A", "B", "C", "D"]
+    assert seen[0] == ["a", "b", "c"]
+    stats = scheduler.stats()
+    assert stats["requests"] == 4
+    assert stats["batches"] == 2
+    assert stats["queue_depth"] == 0
+
+
+def test_scheduler_propagates_errors():
+    def process(items):
+        raise RuntimeError("CUDA out of memory")
+
+    scheduler = BatchScheduler(process, max_batch_size=2, max_wait_ms=1)
+    scheduler.start()
+    with pytest.raises(RuntimeError):
+        scheduler.submit("x").result(timeout=2)
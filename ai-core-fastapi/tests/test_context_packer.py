@@ -0,0 +1,58 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+from context_packer import ContextPacker
+
+
+class WordTokenizer:
+    """Un token per cuvant, suficient pentru a verifica bugetul."""
+
+    def __call__(self, text, add_special_tokens=False):
+        return SimpleNamespace(input_ids=text.split())
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(ids)
+
+
+def test_overlapping_parents_from_same_source_are_merged():
+    text = " ".join(f"w{i}" for i in range(60))
+    first, second = text[:200], text[150:]
+    docs = [
+        Document(page_content=first, metadata={"source": "a.txt", "start_index": 0}),
+        Document(page_content="altceva complet", metadata={"source": "b.txt", "start_index": 0}),
+        Document(page_content=second, metadata={"source": "a.txt", "start_index": 150}),
+    ]
+    packed, report = ContextPacker(WordTokenizer(), token_budget=1000).pack(docs)
+
+    assert [d.metadata["source"] for d in packed] == ["a.txt", "b.txt"]
+    assert packed[0].page_content == text
+    assert report["dedup_saved_tokens"] > 0
+    assert report["truncated_tokens"] == 0
+    assert report["naive_tokens"] - report["dedup_saved_tokens"] == report["packed_tokens"]
+
+
+def test_overlap_detected_from_text_without_start_index():
+    a = "Admiterea la FMI se face pe baza unui examen scris la matematică"
+    b = "examen scris la matematică și informatică, în luna iulie."
+    docs = [Document(page_content=a, metadata={"source": "adm.txt"}),
+            Document(page_content=b, metadata={"source": "adm.txt"})]
+    packed, _ = ContextPacker(WordTokenizer(), token_budget=1000).pack(docs)
+    assert len(packed) == 1
+    assert packed[0].page_content == a + b[len("examen scris la matematică"):]
+
+
+def test_packing_respects_token_budget():
+    docs = [Document(page_content=" ".join(["cuvant"] * 100), metadata={"source": f"{i}.txt"}) for i in range(3)]
+    packer = ContextPacker(WordTokenizer(), token_budget=150, min_tail_tokens=10)
+    packed, report = packer.pack(docs)
+
+    assert len(packed) == 2
+    assert report["packed_tokens"] <= 150
+    assert report["packed_tokens"] == packer.count_tokens(packer.render(packed))
+    # Nimic de unit: tot ce lipseste a fost taiat de buget
+    assert report["dedup_saved_tokens"] == 0
+    assert report["truncated_tokens"] == report["naive_tokens"] - report["packed_tokens"] > 0
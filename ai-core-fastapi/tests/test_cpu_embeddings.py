@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+import torch
+
+import rag_pipeline
+
+TEXTS = ["Taxa de școlarizare este 100 lei pe an.", "Când începe sesiunea de restanțe?"]
+
+
+@pytest.fixture(scope="module")
+def tiny_encoder(tmp_path_factory):
+    """SentenceTransformer minuscul (BERT cu ponderi aleatoare, mean pooling,
+    normalizare, ca multilingual-e5), salvat local, fara descarcari."""
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    path = tmp_path_factory.mktemp("encoder")
+    words = sorted({word for text in TEXTS for word in text.lower().replace("?", " ?").replace(".", " .").split()})
+    vocab = path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *words]), encoding="utf-8")
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=5 + len(words), hidden_size=32, num_hidden_layers=2, num_attention_heads=4,
+                        intermediate_size=64)
+    BertModel(config).save_pretrained(path / "bert")
+    BertTokenizerFast(vocab_file=str(vocab)).save_pretrained(path / "bert")
+
+    transformer = models.Transformer(str(path / "bert"))
+    pooling = models.Pooling(transformer.get_word_embedding_dimension(), pooling_mode="mean")
+    SentenceTransformer(modules=[transformer, pooling, models.Normalize()], device="cpu").save(str(path / "st"))
+    return str(path / "st")
+
+
+def load(model_name, monkeypatch, quantization):
+    monkeypatch.setattr(rag_pipeline, "EMBEDDING_MODEL", model_name)
+    monkeypatch.setattr(rag_pipeline, "EMBEDDING_BACKEND", "model")
+    monkeypatch.setattr(rag_pipeline, "DEVICE_EMBEDDINGS", "cpu")
+    monkeypatch.setattr(rag_pipeline, "EMBEDDING_CPU_QUANTIZATION", quantization)
+    monkeypatch.setattr(rag_pipeline, "EMBEDDING_THREADS", torch.get_num_threads())
+    return rag_pipeline.load_embeddings()
+
+
+def test_cpu_embedder_matches_default_vectors(tiny_encoder, monkeypatch):
+    default = np.array(load(tiny_encoder, monkeypatch, "").embed_documents(TEXTS))
+    cpu = np.array(load(tiny_encoder, monkeypatch, "int8").embed_documents(TEXTS))
+
+    assert cpu.shape == default.shape
+    np.testing.assert_allclose(np.linalg.norm(cpu, axis=1), 1.0, atol=1e-5)
+    np.testing.assert_allclose(np.linalg.norm(default, axis=1), 1.0, atol=1e-5)
+    # Cuantizarea schimba putin vectorii, dar nu si directia lor
+    assert (cpu * default).sum(axis=1).min() > 0.99
+
+
+def linear_layers(embeddings):
+    modules = list(embeddings._client[0].auto_model.modules())
+    return (sum(isinstance(m, torch.nn.Linear) for m in modules),
+            sum(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in modules))
+
+
+def test_env_switch_selects_quantized_cpu_embedder(tiny_encoder, monkeypatch):
+    fp32, int8 = linear_layers(load(tiny_encoder, monkeypatch, "int8"))
+    assert fp32 == 0 and int8 > 0
+    assert rag_pipeline.embedding_variant() == f"{tiny_encoder}@int8"
+
+    fp32, int8 = linear_layers(load(tiny_encoder, monkeypatch, ""))
+    assert fp32 > 0 and int8 == 0
+    assert rag_pipeline.embedding_variant() == tiny_encoder
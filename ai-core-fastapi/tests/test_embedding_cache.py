@@ -0,0 +1,99 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import multiprocessing as mp
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache, CachedEmbeddings, embedding_key
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), float(t.count("a")), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_embedding_key_depends_on_model_and_ignores_whitespace():
+    assert embedding_key("m", "Taxa de  studii\n") == embedding_key("m", "Taxa de studii")
+    assert embedding_key("m", "Taxa") != embedding_key("alt-model", "Taxa")
+
+
+def test_cached_embeddings_reuse_vectors_across_runs(tmp_path):
+    inner = CountingEmbeddings()
+    cached = CachedEmbeddings(inner, EmbeddingCache(str(tmp_path)), "m")
+    first = cached.embed_documents(["admitere", "burse", "admitere"])
+    assert inner.calls == [["admitere", "burse"]]  # duplicatul din batch se embedeaza o data
+    assert first[0] == first[2]
+
+    # Proces nou: vectorii vin de pe disc
+    inner2 = CountingEmbeddings()
+    cached2 = CachedEmbeddings(inner2, EmbeddingCache(str(tmp_path)), "m")
+    assert cached2.embed_documents(["burse", "cazare"]) == [first[1], [6.0, 2.0, 1.0]]
+    assert inner2.calls == [["cazare"]]
+    stats = cached2.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["entries"] == 3
+
+
+def test_cache_ignores_partially_written_rows(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put_many([embedding_key("m", "a"), embedding_key("m", "b")], [[1.0, 2.0], [3.0, 4.0]])
+    with open(os.path.join(str(tmp_path), "vectors.f32"), "ab") as f:
+        f.write(b"\0\0\0")  # scriere intrerupta
+
+    reopened = EmbeddingCache(str(tmp_path))
+    assert len(reopened) == 2
+    reopened.put_many([embedding_key("m", "c")], [[5.0, 6.0]])
+    assert [list(v) for v in reopened.get_many([embedding_key("m", "c"), embedding_key("m", "a")])] == [[5.0, 6.0], [1.0, 2.0]]
+
+
+def test_cost_is_averaged_and_saved_once(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put_many([embedding_key("m", "a")], [[1.0, 2.0]])
+    meta = os.path.join(str(tmp_path), "meta.json")
+    written = os.path.getmtime(meta)
+    cache.record_cost(1.0, 10)
+    cache.record_cost(3.0, 10)
+    assert cache.seconds_per_text == 0.2
+    assert EmbeddingCache(str(tmp_path)).seconds_per_text == 0.0  # nimic scris pe disc inca
+    assert os.path.getmtime(meta) == written
+
+    cache.save_stats()
+    reopened = EmbeddingCache(str(tmp_path))
+    reopened.record_cost(2.0, 5)
+    assert reopened.seconds_per_text == 6.0 / 25
+
+
+def _append(path, worker, count):
+    cache = EmbeddingCache(path)
+    for i in range(count):
+        key = embedding_key("m", f"{worker}-{i}")
+        cache.put_many([key], [[float(worker), float(i)]])
+        # Randul vine din fisier, nu din memorie: vectorul citit e chiar al acestei chei
+        assert list(cache.get_many([key])[0]) == [float(worker), float(i)]
+
+
+def test_processes_sharing_the_cache_stay_aligned(tmp_path):
+    path = str(tmp_path)
+    EmbeddingCache(path).put_many([embedding_key("m", "start")], [[-1.0, -1.0]])
+    ctx = mp.get_context("spawn")
+    workers = [ctx.Process(target=_append, args=(path, worker, 50)) for worker in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    cache = EmbeddingCache(path)
+    assert len(cache) == 151
+    keys = [embedding_key("m", f"{worker}-{i}") for worker in range(3) for i in range(50)]
+    vectors = cache.get_many(keys)
+    assert [list(v) for v in vectors] == [[float(w), float(i)] for w in range(3) for i in range(50)]
+    assert np.array_equal(cache.get_many([embedding_key("m", "start")])[0], [-1.0, -1.0])
@@ -0,0 +1,64 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+
+from flat_index import FlatVectorStore
+
+
+class FakeEmbeddings:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return [self.vectors[t] for t in texts]
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+
+def make_vectors(n=300, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    return {f"t{i}": rng.standard_normal(dim).astype(np.float32) for i in range(n)}
+
+
+@pytest.mark.parametrize("quantization", [None, "int8"])
+def test_flat_index_matches_exact_search(tmp_path, quantization):
+    vectors = make_vectors()
+    texts = list(vectors)
+    store = FlatVectorStore(str(tmp_path), FakeEmbeddings(vectors), quantization=quantization)
+    store.add_texts(texts, metadatas=[{"doc_id": t} for t in texts], ids=texts)
+
+    matrix = np.stack([vectors[t] for t in texts])
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    for query in ("t3", "t42", "t250"):
+        expected = [texts[i] for i in np.argsort(-(matrix @ matrix[texts.index(query)]))[:5]]
+        docs = store.similarity_search(query, k=5)
+        assert [d.id for d in docs] == expected
+        assert docs[0].metadata == {"doc_id": query}
+
+
+def test_flat_index_delete_save_and_read_only_reopen(tmp_path):
+    vectors = make_vectors(n=50)
+    store = FlatVectorStore(str(tmp_path), FakeEmbeddings(vectors), quantization="int8")
+    store.add_texts(list(vectors), ids=list(vectors))
+    store.delete(["t7"])
+    assert "t7" not in [d.id for d in store.similarity_search("t7", k=3)]
+    store.save()
+    first_generation = store.generation
+
+    reader = FlatVectorStore(str(tmp_path), FakeEmbeddings(vectors), quantization="int8", read_only=True)
+    assert len(reader) == 49
+    assert isinstance(reader._matrix, np.memmap)
+    assert reader.similarity_search("t8", k=1)[0].id == "t8"
+    with pytest.raises(RuntimeError):
+        reader.add_texts(["t7"])
+
+    # O generatie noua nu strica cititorul deja deschis
+    store.add_texts(["t7"], ids=["t7"])
+    store.save()
+    assert store.generation != first_generation
+    assert reader.similarity_search("t8", k=1)[0].id == "t8"
+    assert FlatVectorStore(str(tmp_path), FakeEmbeddings(vectors), read_only=True).similarity_search("t7", k=1)[0].id == "t7"
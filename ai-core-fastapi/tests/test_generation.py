@@ -0,0 +1,29 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from types import SimpleNamespace
+
+import rag_pipeline
+from rag_pipeline import generate_batch
+
+
+def test_generate_batch_starts_every_row_with_bos(tiny_lm, monkeypatch):
+    model, tokenizer = tiny_lm
+    monkeypatch.setitem(rag_pipeline.GENERATION_KWARGS, "max_new_tokens", 3)
+    seen = {}
+    generate = model.generate
+
+    def spy(**kwargs):
+        seen.update(kwargs)
+        return generate(**kwargs)
+
+    monkeypatch.setattr(model, "generate", spy)
+    prompts = ["[INST] Cât este taxa? [/INST]", "[INST] Taxa de școlarizare este 100 lei pe an. Cât? [/INST]"]
+    stats = {}
+    texts = generate_batch(prompts, SimpleNamespace(tokenizer=tokenizer, model=model), stats=stats)
+
+    input_ids, attention_mask = seen["input_ids"], seen["attention_mask"]
+    first = attention_mask.argmax(dim=1)  # primul token care nu e padding (padding la stanga)
+    assert input_ids[range(len(prompts)), first].tolist() == [tokenizer.bos_token_id] * len(prompts)
+    assert len(texts) == 2 and stats["generated_tokens"] > 0
@@ -0,0 +1,98 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+import rag_pipeline
+from index_artifact import current_artifact, list_versions, prune, publish, read_info, write_info
+from index_build import build_artifact
+
+
+def make_version(root, name):
+    path = root / name
+    path.mkdir()
+    write_info(str(path), {"version": name})
+    time.sleep(0.01)  # ordinea versiunilor vine din mtime-ul artifact.json
+    return str(path)
+
+
+def test_publish_switches_current_version(tmp_path):
+    assert current_artifact(str(tmp_path)) is None
+    first = make_version(tmp_path, "v-b")
+    publish(str(tmp_path), "v-b")
+    assert current_artifact(str(tmp_path)) == first
+
+    second = make_version(tmp_path, "v-a")
+    (tmp_path / ".building-123").mkdir()  # build neterminat: nu e o versiune
+    publish(str(tmp_path), "v-a")
+    assert current_artifact(str(tmp_path)) == second
+    assert read_info(second) == {"version": "v-a"}
+    assert list_versions(str(tmp_path)) == ["v-b", "v-a"]
+
+
+def test_prune_keeps_newest_and_current(tmp_path):
+    for name in ("v1", "v2", "v3"):
+        make_version(tmp_path, name)
+    publish(str(tmp_path), "v1")  # rollback la o versiune veche
+
+    assert prune(str(tmp_path), keep=1) == ["v2"]
+    assert list_versions(str(tmp_path)) == ["v1", "v3"]
+
+
+class FailingEmbeddings(DeterministicFakeEmbedding):
+    """Embedder fals care esueaza pentru textele cu "EROARE"."""
+
+    def embed_documents(self, texts):
+        if any("EROARE" in text for text in texts):
+            raise RuntimeError("embedding esuat")
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def chroma_build(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag_pipeline, "load_embeddings", lambda: FailingEmbeddings(size=16))
+    monkeypatch.setattr(rag_pipeline, "EMBEDDING_BACKEND", "stub")
+    monkeypatch.setattr(rag_pipeline, "VECTOR_BACKEND", "chroma")
+    monkeypatch.setattr(rag_pipeline, "EMBEDDING_CACHE_PATH", str(tmp_path / "embedding_cache"))
+    monkeypatch.setattr(rag_pipeline, "INDEX_BATCH_SIZE", 1)
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "taxe.txt").write_text("Taxa de școlarizare este 100 lei pe an.", encoding="utf-8")
+    return str(tmp_path / "artifacts"), data
+
+
+def open_files(root):
+    paths = []
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            path = os.readlink(f"/proc/self/fd/{fd}")
+        except OSError:
+            continue
+        if path.startswith(root):
+            paths.append(path)
+    return paths
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="necesita /proc")
+def test_build_closes_chroma_before_publishing(chroma_build):
+    out, data = chroma_build
+    path = build_artifact(out, str(data))
+    assert current_artifact(out) == path
+    assert read_info(path)["report"]["failed"] == []
+    assert open_files(out) == []
+
+
+def test_build_with_failed_batch_is_not_published(chroma_build):
+    out, data = chroma_build
+    first = build_artifact(out, str(data))
+    (data / "burse.txt").write_text("EROARE: bursa de merit.", encoding="utf-8")
+
+    with pytest.raises(RuntimeError, match="burse.txt"):
+        build_artifact(out, str(data))
+    assert current_artifact(out) == first
+    assert list_versions(out) == [os.path.basename(first)]
+    assert not [name for name in os.listdir(out) if name.startswith(".building-")]
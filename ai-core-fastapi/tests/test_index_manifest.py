@@ -0,0 +1,105 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+import rag_pipeline
+from index_manifest import IndexManifest, hash_file, hash_text, parent_id, child_id
+
+CONFIG = {"embedding_model": "test", "child_chunk": [400, 50]}
+
+
+def test_manifest_roundtrip(tmp_path):
+    path = str(tmp_path / "db" / "index_manifest.json")
+    manifest = IndexManifest(path, CONFIG)
+    pid = parent_id("a.txt", hash_text("continut"))
+    manifest.set_file("a.txt", "abc", [{"id": pid, "hash": hash_text("continut"), "children": [child_id(pid, 0)]}])
+    manifest.save()
+
+    loaded = IndexManifest.load(path, CONFIG)
+    assert loaded.file_hash("a.txt") == "abc"
+    assert list(loaded.parents("a.txt")) == [pid]
+    assert loaded.sources() == {"a.txt"}
+
+
+def test_manifest_config_change_forces_rebuild(tmp_path):
+    path = str(tmp_path / "index_manifest.json")
+    IndexManifest(path, CONFIG).save()
+    assert IndexManifest.load(path, dict(CONFIG, embedding_model="other")) is None
+    assert IndexManifest.load(str(tmp_path / "missing.json"), CONFIG) is None
+
+
+def test_ids_are_deterministic(tmp_path):
+    f = tmp_path / "doc.txt"
+    f.write_text("Admitere FMI", encoding="utf-8")
+    assert hash_file(str(f)) == hash_text("Admitere FMI")
+    h = hash_text("x")
+    assert parent_id("a.txt", h) == parent_id("a.txt", h)
+    assert parent_id("a.txt", h) != parent_id("b.txt", h)
+    assert parent_id("a.txt", h, 0) != parent_id("a.txt", h, 1)
+
+
+class CountingEmbeddings(Embeddings):
+    """Embedder fals care retine textele embedate."""
+
+    def __init__(self):
+        self.embedded = []
+        self._fake = DeterministicFakeEmbedding(size=16)
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return self._fake.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self._fake.embed_query(text)
+
+
+def test_index_documents_is_incremental(tmp_path, monkeypatch):
+    embedder = CountingEmbeddings()
+    monkeypatch.setattr(rag_pipeline, "load_embeddings", lambda: embedder)
+    monkeypatch.setattr(rag_pipeline, "EMBEDDING_BACKEND", "stub")
+    monkeypatch.setattr(rag_pipeline, "VECTOR_BACKEND", "flat")
+    monkeypatch.setattr(rag_pipeline, "EMBEDDING_CACHE_PATH", str(tmp_path / "embedding_cache"))
+    monkeypatch.setattr(rag_pipeline, "INDEX_BATCH_SIZE", 1)
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "taxe.txt").write_text("Taxa de școlarizare este 100 lei pe an.", encoding="utf-8")
+    (data / "burse.txt").write_text("Bursa de merit se acordă în octombrie.", encoding="utf-8")
+    taxe, burse = str(data / "taxe.txt"), str(data / "burse.txt")
+    retriever = rag_pipeline.get_retriever(str(tmp_path / "db"))
+    saves = []
+    save = retriever.lexical_index.save
+    monkeypatch.setattr(retriever.lexical_index, "save", lambda path: saves.append(path) or save(path))
+
+    report = rag_pipeline.index_documents(retriever, str(data))
+    assert sorted(report["added"]) == sorted([taxe, burse]) and report["full_rebuild"]
+    assert len(embedder.embedded) == 2
+    # Doua batch-uri, dar indexul lexical (si cel flat) se scrie o singura data
+    assert len(saves) == 1
+
+    # Fisiere neschimbate: nimic de embedat
+    embedder.embedded.clear()
+    report = rag_pipeline.index_documents(retriever, str(data))
+    assert report["unchanged"] == 2 and embedder.embedded == []
+    assert len(saves) == 1
+
+    # Fisier modificat: se embedeaza doar continutul nou
+    (data / "burse.txt").write_text("Bursa socială se acordă în noiembrie.", encoding="utf-8")
+    report = rag_pipeline.index_documents(retriever, str(data))
+    assert report["changed"] == [burse] and report["unchanged"] == 1
+    assert embedder.embedded == ["Bursa socială se acordă în noiembrie."]
+
+    # Fisier sters: dispare din vector store, docstore si BM25
+    manifest = rag_pipeline.load_manifest(retriever.index_dir)
+    parents = list(manifest.parents(taxe).values())
+    children = [cid for parent in parents for cid in parent["children"]]
+    os.remove(taxe)
+    report = rag_pipeline.index_documents(retriever, str(data))
+    assert report["removed"] == [taxe]
+    assert len(retriever.vectorstore) == 1
+    assert retriever.vectorstore.similarity_search("Taxa de școlarizare", k=5)[0].metadata["source"] == burse
+    assert retriever.docstore.mget([parent["id"] for parent in parents]) == [None]
+    assert not any(doc_id in children for doc_id, _, _ in retriever.lexical_index.search("taxa scolarizare"))
+    assert len(retriever.lexical_index) == 1
+    assert rag_pipeline.load_manifest(retriever.index_dir).sources() == {burse}
@@ -0,0 +1,37 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lexical_index import BM25Index, fold_text, reciprocal_rank_fusion, tokenize
+
+
+def test_fold_text_handles_romanian_diacritic_variants():
+    # virgula de dedesubt (ș, ț) si sedila (ş, ţ) ajung la aceeasi forma
+    assert fold_text("Școală Ţară ţânţar Înscriere") == fold_text("şcoala tara tantar inscriere")
+    assert tokenize("Taxa de școlarizare pentru MateInfoUB 2024") == ["taxa", "scolarizare", "mateinfoub", "2024"]
+
+
+def test_bm25_ranks_exact_terms_and_supports_updates(tmp_path):
+    index = BM25Index()
+    index.add([
+        ("c1", "p1", "Concursul MateInfoUB are loc în martie."),
+        ("c2", "p2", "Taxa de școlarizare la licență."),
+        ("c3", "p2", "Regulament articolul 12: taxe de reînmatriculare."),
+    ])
+    assert index.search("mateinfoub")[0][:2] == ("c1", "p1")
+    assert index.search("scolarizare")[0][1] == "p2"
+
+    index.remove(["c1"])
+    assert index.search("MateInfoUB") == []
+
+    path = str(tmp_path / "lexical_index.json")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert len(loaded) == 2
+    assert loaded.search("articolul 12")[0][0] == "c3"
+
+
+def test_reciprocal_rank_fusion_prefers_items_in_both_lists():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d", "b"]])
+    assert fused[0] in ("b", "c")
+    assert fused.index("b") < fused.index("d")
@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, CollectorRegistry, generate_latest
+
+import main
+from batching import StagePool
+from metrics import CacheCollector, STAGE, record_generation, timed
+from replicas import StubGenerator
+
+
+def sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+
+def test_timed_observes_duration_and_counts_errors():
+    before = sample("askfmi_stage_seconds_count", {"stage": "embed"})
+    errors_before = sample("askfmi_errors_total", {"stage": "embed"})
+    with timed("embed"):
+        pass
+    with pytest.raises(ValueError):
+        with timed("embed"):
+            raise ValueError("boom")
+    assert sample("askfmi_stage_seconds_count", {"stage": "embed"}) == before + 2
+    assert sample("askfmi_errors_total", {"stage": "embed"}) == errors_before + 1
+
+
+def test_record_generation_from_stub_stats():
+    stats = {}
+    StubGenerator(token_delay=0.001)(["[INST] ÎNTREBARE: taxa de studiu\n\nRăspuns: [/INST]"], stats=stats)
+    assert stats["generated_tokens"] == 5
+
+    generated = sample("askfmi_generated_tokens_total")
+    rates = sample("askfmi_decode_tokens_per_second_count")
+    record_generation(stats)
+    assert sample("askfmi_generated_tokens_total") == generated + 5
+    assert sample("askfmi_decode_tokens_per_second_count") == rates + 1
+
+
+def test_queue_wait_is_observed():
+    waits = []
+    pool = StagePool(lambda item: item, workers=1, observe_wait=waits.append)
+    pool.start()
+    assert pool.submit("x").result(timeout=5) == "x"
+    assert len(waits) == 1 and waits[0] >= 0
+
+
+def test_cache_collector_reads_counts_at_scrape():
+    counts = {"hits": 3, "misses": 1}
+    registry = CollectorRegistry()
+    registry.register(CacheCollector({"exact": lambda: (counts["hits"], counts["misses"]), "absent": lambda: None}))
+    assert registry.get_sample_value("askfmi_cache_lookups_total", {"cache": "exact", "result": "hit"}) == 3
+    counts["hits"] = 7
+    assert registry.get_sample_value("askfmi_cache_lookups_total", {"cache": "exact", "result": "hit"}) == 7
+    assert b'cache="absent"' not in generate_latest(registry)
+
+
+def test_metrics_endpoint():
+    client = TestClient(main.app)  # fara startup: nu se incarca modelul
+    STAGE["total"].observe(0.1)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'askfmi_stage_seconds_bucket{le="0.25",stage="total"}' in response.text
+    assert 'askfmi_cache_lookups_total{cache="exact",result="hit"}' in response.text
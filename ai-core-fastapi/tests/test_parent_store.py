@@ -0,0 +1,89 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+
+from langchain_core.documents import Document
+from parent_store import SQLiteDocStore, LRUCachedStore
+
+
+def test_sqlite_docstore_persists(tmp_path):
+    path = str(tmp_path / "parents.sqlite3")
+    store = SQLiteDocStore(path)
+    store.mset([("p1", Document(page_content="Taxa de școlarizare", metadata={"source": "taxe.txt"}))])
+    store.close()
+
+    reopened = SQLiteDocStore(path)
+    doc, missing = reopened.mget(["p1", "p2"])
+    assert doc.page_content == "Taxa de școlarizare"
+    assert doc.metadata == {"source": "taxe.txt"}
+    assert missing is None
+    assert list(reopened.yield_keys(prefix="p")) == ["p1"]
+
+    reopened.mdelete(["p1"])
+    assert reopened.mget(["p1"]) == [None]
+
+
+def test_lru_front_counts_hits_and_evicts(tmp_path):
+    store = LRUCachedStore(SQLiteDocStore(str(tmp_path / "parents.sqlite3")), max_items=2)
+    store.mset([(f"p{i}", Document(page_content=str(i))) for i in range(3)])
+
+    store.mget(["p0", "p1"])
+    store.mget(["p0"])
+    assert store.stats()["hits"] == 1
+    assert store.stats()["misses"] == 2
+
+    store.mget(["p2"])  # scoate p1, cel mai putin recent folosit
+    assert store.stats()["cached"] == 2
+    store.mget(["p1"])
+    assert store.stats()["misses"] == 4
+
+    store.mdelete(["p0"])
+    assert store.mget(["p0"]) == [None]
+
+
+class SlowReads(SQLiteDocStore):
+    """mget care citeste, apoi asteapta `release` inainte sa intoarca."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def mget(self, keys):
+        docs = super().mget(keys)
+        self.reading.set()
+        self.release.wait(5)
+        return docs
+
+
+def test_lru_does_not_cache_parent_changed_during_read(tmp_path):
+    slow = SlowReads(str(tmp_path / "parents.sqlite3"))
+    store = LRUCachedStore(slow, max_items=4)
+    store.mset([("p1", Document(page_content="vechi")), ("p2", Document(page_content="sters"))])
+
+    for write in (lambda: store.mset([("p1", Document(page_content="nou"))]), lambda: store.mdelete(["p2"])):
+        slow.reading.clear()
+        slow.release.clear()
+        reader = threading.Thread(target=store.mget, args=(["p1", "p2"],))
+        reader.start()
+        slow.reading.wait(5)
+        write()  # reindexarea schimba parintii dupa citire, inainte de _put
+        slow.release.set()
+        reader.join()
+
+    slow.release.set()
+    assert [doc.page_content if doc else None for doc in store.mget(["p1", "p2"])] == ["nou", None]
+
+
+def test_finalized_store_opens_read_only(tmp_path):
+    path = str(tmp_path / "parents.sqlite3")
+    store = SQLiteDocStore(path)
+    store.mset([("p1", Document(page_content="Burse", metadata={"source": "burse.txt"}))])
+    store.finalize()
+    store.close()
+    assert not os.path.exists(path + "-wal")
+
+    readers = [SQLiteDocStore(path, read_only=True) for _ in range(2)]
+    assert [r.mget(["p1"])[0].page_content for r in readers] == ["Burse", "Burse"]
@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from types import SimpleNamespace
+
+import pytest
+
+import rag_pipeline
+from prefix_cache import PrefixKVCache
+from rag_pipeline import generate_batch
+
+# Prefixul se termina la granita de cuvant, deci tokenii lui raman aceiasi in promptul intreg
+PREFIX = "[INST] Ești un asistent universitar. Răspunde doar din sursele date."
+BODIES = [
+    " ÎNTREBARE: Cât este taxa? [/INST]",
+    " CONTEXT: Taxa de școlarizare este 100 lei pe an. ÎNTREBARE: Cât este taxa de școlarizare? [/INST]",
+]
+
+
+@pytest.fixture
+def pipes(tiny_lm, monkeypatch):
+    model, tokenizer = tiny_lm
+    monkeypatch.setitem(rag_pipeline.GENERATION_KWARGS, "max_new_tokens", 8)
+    plain = SimpleNamespace(tokenizer=tokenizer, model=model)
+    cached = SimpleNamespace(tokenizer=tokenizer, model=model, prefix_cache=PrefixKVCache(model, tokenizer, PREFIX))
+    return plain, cached
+
+
+def test_prefix_starts_with_bos(pipes):
+    _, cached = pipes
+    assert cached.prefix_cache.prefix_ids[0, 0].item() == cached.tokenizer.bos_token_id
+
+
+def test_cached_generation_matches_uncached(pipes):
+    plain, cached = pipes
+    prompts = [PREFIX + body for body in BODIES]
+    expected = generate_batch(prompts, plain)
+    assert cached.prefix_cache.build_inputs(prompts) is not None
+
+    # Batch cu padding intre prefix si corp, apoi din nou (cache-ul nu e modificat de primul apel)
+    assert generate_batch(prompts, cached) == expected
+    assert generate_batch(prompts, cached) == expected
+    for prompt in prompts:
+        assert generate_batch([prompt], cached) == generate_batch([prompt], plain)
+    assert cached.prefix_cache.fallbacks == 0
+
+
+def test_boundary_mismatch_falls_back(pipes):
+    plain, _ = pipes
+    tokenizer, model = plain.tokenizer, plain.model
+    # Prefixul taie un cuvant: tokenii promptului intreg difera la granita
+    cache = PrefixKVCache(model, tokenizer, "[INST] Taxa de școla")
+    prompts = ["[INST] Taxa de școlarizare este 100 lei. Cât? [/INST]"]
+    full = tokenizer(prompts[0]).input_ids
+    assert full[:cache.prefix_ids.shape[1]] != cache.prefix_ids[0].tolist()
+
+    assert cache.build_inputs(prompts) is None
+    pipe = SimpleNamespace(tokenizer=tokenizer, model=model, prefix_cache=cache)
+    assert generate_batch(prompts, pipe) == generate_batch(prompts, plain)
+    assert cache.fallbacks == 2
@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from query_embedding import QueryEmbedder, embed_query_batch
+
+
+class SlowEmbeddings:
+    """Imita HuggingFaceEmbeddings: _embed + query_encode_kwargs."""
+
+    def __init__(self):
+        self.batches = []
+        self.query_encode_kwargs = {}
+        self.encode_kwargs = {"normalize_embeddings": True}
+
+    def _embed(self, texts, encode_kwargs):
+        self.batches.append(list(texts))
+        time.sleep(0.05)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return self._embed([text], self.encode_kwargs)[0]
+
+
+def test_concurrent_queries_share_one_forward_pass():
+    model = SlowEmbeddings()
+    embedder = QueryEmbedder(model, max_batch_size=8, max_wait_ms=50)
+    queries = ["taxa", "burse", "cazare", "taxa"]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        vectors = list(pool.map(embedder.embed, queries))
+
+    assert vectors == [[4.0, 1.0], [5.0, 1.0], [6.0, 1.0], [4.0, 1.0]]
+    assert len(model.batches) == 1
+    assert sorted(model.batches[0]) == ["burse", "cazare", "taxa"]
+
+
+def test_repeated_queries_are_served_from_lru():
+    model = SlowEmbeddings()
+    embedder = QueryEmbedder(model, max_wait_ms=1, cache_size=2)
+    embedder.embed("taxa")
+    vector = embedder.embed("taxa")
+    vector.append(0.0)  # vectorul intors e o copie
+    assert embedder.embed("taxa") == [4.0, 1.0]
+    assert len(model.batches) == 1
+    assert embedder.stats()["cache"]["hit_rate"] == 2 / 3
+
+    embedder.embed("burse")
+    embedder.embed("cazare")  # "taxa" iese din LRU
+    embedder.embed("taxa")
+    assert len(model.batches) == 4
+
+
+def test_embed_query_batch_falls_back_to_embed_query():
+    class Plain:
+        def embed_query(self, text):
+            return [float(len(text))]
+
+    assert embed_query_batch(Plain(), ["ab", "abc"]) == [[2.0], [3.0]]
@@ -0,0 +1,103 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+from functools import partial
+
+import pytest
+
+from replicas import GenerationReplicas, ReplicaUnavailable, StubGenerator
+
+
+def wait_ready(replicas, count, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if sum(r["ready"] for r in replicas.stats()["replicas"]) >= count:
+            return
+        time.sleep(0.05)
+    raise AssertionError("replicile nu au pornit")
+
+
+def prompt(question, context="ctx"):
+    return f"[INST] CONTEXT: {context}\n\nÎNTREBARE: {question}\n\nRăspuns: [/INST]"
+
+
+@pytest.fixture
+def make_replicas():
+    started = []
+
+    def make(**kwargs):
+        kwargs.setdefault("heartbeat_interval", 0.1)
+        replicas = GenerationReplicas(partial(StubGenerator, token_delay=0.02, crash_marker="CRASH", hang_marker="HANG"), **kwargs)
+        replicas.start()
+        started.append(replicas)
+        wait_ready(replicas, len(replicas.stats()["replicas"]))
+        return replicas
+
+    yield make
+    for replicas in started:
+        replicas.stop()
+
+
+def test_least_loaded_routing_streams_tokens(make_replicas):
+    replicas = make_replicas(replicas=2, max_batch_size=2, max_wait_ms=5)
+    tokens = {i: [] for i in range(4)}
+    futures = [replicas.submit(prompt(f"taxa {i}"), tokens[i].append) for i in range(4)]
+
+    answers = [f.result(timeout=30) for f in futures]
+    assert answers == [f"Răspuns pentru: taxa {i} " for i in range(4)]
+    assert ["".join(tokens[i]) for i in range(4)] == answers
+    assert [r["served"] for r in replicas.stats()["replicas"]] == [2, 2]
+
+
+def test_crashed_replica_fails_inflight_and_restarts(make_replicas):
+    replicas = make_replicas(replicas=1, max_batch_size=1)
+    with pytest.raises(ReplicaUnavailable):
+        replicas.submit(prompt("CRASH")).result(timeout=30)
+
+    with pytest.raises(ReplicaUnavailable):
+        replicas.submit(prompt("burse"))  # nicio replica gata pana la repornire
+
+    wait_ready(replicas, 1)
+    assert replicas.submit(prompt("burse")).result(timeout=30) == "Răspuns pentru: burse "
+    assert replicas.stats()["replicas"][0]["restarts"] == 1
+
+
+def test_crash_does_not_block_other_replicas(make_replicas):
+    replicas = make_replicas(replicas=2, max_batch_size=1)
+    tokens = []
+    # Cele doua cereri ajung pe replici diferite (cea mai putin incarcata)
+    healthy = replicas.submit(prompt("taxa de școlarizare la master"), tokens.append)
+    crashed = replicas.submit(prompt("CRASH"))
+    with pytest.raises(ReplicaUnavailable):
+        crashed.result(timeout=30)
+    assert healthy.result(timeout=30) == "Răspuns pentru: taxa de școlarizare la master "
+    assert "".join(tokens) == healthy.result()
+
+
+def test_stalled_generation_restarts_replica(make_replicas):
+    replicas = make_replicas(replicas=1, max_batch_size=1, stall_timeout=0.5)
+    start = time.monotonic()
+    with pytest.raises(ReplicaUnavailable):
+        replicas.submit(prompt("HANG")).result(timeout=30)
+    assert time.monotonic() - start < 10
+    assert replicas.stats()["replicas"][0]["restarts"] == 1
+
+    wait_ready(replicas, 1)
+    assert replicas.submit(prompt("burse")).result(timeout=30) == "Răspuns pentru: burse "
+
+
+def test_cancelled_request_stops_generation_in_replica(make_replicas):
+    replicas = make_replicas(replicas=1, max_batch_size=1)
+    tokens = []
+    long_answer = replicas.submit(prompt(" ".join(["cuvant"] * 100)), tokens.append)
+    time.sleep(0.2)
+    assert long_answer.cancel()
+    assert replicas.stats()["replicas"][0]["inflight"] == 0
+
+    # Replica e libera imediat, nu dupa cele ~2s ale raspunsului lung
+    start = time.monotonic()
+    assert replicas.submit(prompt("burse")).result(timeout=30) == "Răspuns pentru: burse "
+    assert time.monotonic() - start < 1.0
+    assert 0 < len(tokens) < 50
@@ -0,0 +1,37 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sentence_transformers
+from langchain_core.documents import Document
+
+from reranker import ParentReranker
+
+
+class OverlapCrossEncoder:
+    """Scor = numarul de cuvinte comune; numara apelurile catre model."""
+
+    def __init__(self, model_name, device=None, max_length=None):
+        self.calls = 0
+
+    def predict(self, pairs, batch_size=32):
+        self.calls += 1
+        return [len(set(q.lower().split()) & set(p.lower().split())) for q, p in pairs]
+
+
+def test_rerank_keeps_top_n_and_caches_scores(monkeypatch):
+    monkeypatch.setattr(sentence_transformers, "CrossEncoder", OverlapCrossEncoder)
+    reranker = ParentReranker("stub", device="cpu", top_n=2)
+    docs = [
+        Document(page_content="orarul semestrului"),
+        Document(page_content="taxa de admitere la licenta"),
+        Document(page_content="admitere licenta"),
+    ]
+
+    ranked = reranker.rerank("taxa admitere licenta", docs)
+    assert [d.page_content for d in ranked] == ["taxa de admitere la licenta", "admitere licenta"]
+    assert reranker.model.calls == 1
+
+    reranker.rerank("taxa admitere licenta", docs)
+    assert reranker.model.calls == 1
+    assert reranker.stats()["score_cache_hit_rate"] == 0.5
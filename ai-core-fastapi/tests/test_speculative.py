@@ -0,0 +1,69 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import torch
+from transformers import GenerationConfig
+
+import rag_pipeline
+from speculative import ForwardCounter, acceptance, speculative_kwargs
+from streaming import BatchTextStreamer
+
+
+class CharTokenizer:
+    eos_token_id = 0
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(chr(i) for i in ids)
+
+
+def test_acceptance_from_forward_counts():
+    # 12 tokeni in 4 forward-uri: 8 tokeni propusi au fost acceptati
+    assert acceptance(12, 4, 16) == {"tokens_per_forward": 3.0, "accepted_tokens": 8, "acceptance_rate": 0.5}
+    assert acceptance(5, 5) == {"tokens_per_forward": 1.0, "accepted_tokens": 0, "acceptance_rate": None}
+
+
+def test_speculative_kwargs_per_mode():
+    assert speculative_kwargs("", 5) == {}
+    assert speculative_kwargs("prompt_lookup", 4, max_ngram=2) == {"prompt_lookup_num_tokens": 4, "max_matching_ngram_size": 2}
+    draft = torch.nn.Linear(2, 2)
+    draft.generation_config = GenerationConfig()
+    assert speculative_kwargs("draft", 3, assistant_model=draft) == {"assistant_model": draft}
+    assert draft.generation_config.num_assistant_tokens == 3
+    assert draft.generation_config.num_assistant_tokens_schedule == "constant"
+
+
+def test_forward_counter_counts_and_detaches():
+    model = torch.nn.Linear(2, 2)
+    counter = ForwardCounter(model)
+    model(torch.zeros(1, 2))
+    model(torch.zeros(1, 2))
+    counter.remove()
+    model(torch.zeros(1, 2))
+    assert counter.count == 2
+
+
+def test_streamer_accepts_several_tokens_per_step():
+    out = [[], []]
+    streamer = BatchTextStreamer(CharTokenizer(), [out[0].append, out[1].append])
+    streamer.put(torch.tensor([[1, 2], [3, 4]]))  # promptul
+    streamer.put(torch.tensor([[ord("a"), ord("b"), ord("c")], [ord("x"), 0, 0]]))
+    streamer.put(torch.tensor([[ord("d")], [ord("y")]]))
+    streamer.end()
+    assert out == [["abc", "d"], ["x"]]
+
+
+def test_generate_rows_runs_one_prompt_at_a_time(monkeypatch):
+    calls = []
+
+    def generate_batch(prompts, pipe, callbacks=None, stats=None, cancelled=None):
+        calls.append(prompts)
+        stats.update(prefill_s=0.1, decode_s=0.2, generated_tokens=6, forwards=2)
+        return [prompt.upper() for prompt in prompts]
+
+    monkeypatch.setattr(rag_pipeline, "generate_batch", generate_batch)
+    stats = {}
+    texts = rag_pipeline._generate_rows(["a", "b"], pipe=None, stats=stats)
+    assert texts == ["A", "B"]
+    assert calls == [["a"], ["b"]]
+    assert stats["generated_tokens"] == 12 and stats["forwards"] == 4
@@ -0,0 +1,50 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from metrics import StartupTimeline
+
+
+def test_timeline_records_concurrent_phases_and_errors():
+    timeline = StartupTimeline()
+
+    def phase(name, seconds):
+        with timeline.phase(name):
+            time.sleep(seconds)
+
+    threads = [threading.Thread(target=phase, args=("index", 0.05)), threading.Thread(target=phase, args=("model", 0.05))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with pytest.raises(ValueError):
+        with timeline.phase("prefix"):
+            raise ValueError("boom")
+
+    phases = {p["phase"]: p for p in timeline.summary()}
+    assert phases["index"]["start"] < phases["model"]["end"] and phases["model"]["start"] < phases["index"]["end"]
+    assert phases["prefix"]["error"] == "boom"
+    assert "error" not in phases["index"]
+
+
+def test_health_and_ready(monkeypatch):
+    client = TestClient(main.app)  # fara `with`: startup-ul (incarcarea modelului) nu ruleaza
+    assert client.get("/health").json()["status"] == "ok"
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+    monkeypatch.setattr(main, "retriever", object())
+    monkeypatch.setattr(main, "pipe", object())
+    monkeypatch.setitem(main.init_state, "status", "ready")
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
@@ -0,0 +1,112 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import rag_pipeline
+from metrics import timed
+from profiler import sample_profile
+from tracing import Trace, annotate, current_trace, use_trace
+
+
+def test_timed_adds_spans_to_the_current_trace_only():
+    trace = Trace()
+    with timed("embed"):
+        pass
+    assert trace.spans == []
+
+    def work():
+        with use_trace(trace):
+            with timed("vector_search"):
+                time.sleep(0.01)
+            annotate(context_docs=3)
+        assert current_trace() is None
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    thread.join()
+    trace.wait("generation_queue")
+    trace.finish()
+
+    data = trace.to_dict()
+    assert [s["name"] for s in data["spans"]] == ["vector_search", "generation_queue"]
+    assert data["spans"][0]["duration_ms"] >= 10
+    assert data["attributes"] == {"context_docs": 3}
+    assert data["total_ms"] >= data["spans"][1]["start_ms"]
+
+
+@pytest.fixture
+def stub_pipeline(monkeypatch):
+    def retrieve_stage(query, retriever, listener=None, packer=None):
+        with timed("embed"):
+            pass
+        if listener:
+            listener("sources", ["taxe.txt"])
+        return {"query": query, "prompt": f"ÎNTREBARE: {query}", "sources": ["taxe.txt"], "query_vector": None}
+
+    def generate_batch(prompts, pipe, callbacks=None, stats=None, cancelled=None):
+        time.sleep(0.01)
+        stats.update(prefill_s=0.004, decode_s=0.006, prompt_tokens=10, generated_tokens=4)
+        return ["Taxa este 100 lei." for _ in prompts]
+
+    monkeypatch.setattr(main, "retrieve_stage", retrieve_stage)
+    monkeypatch.setattr(rag_pipeline, "generate_batch", generate_batch)
+    monkeypatch.setattr(main, "retriever", object())
+    monkeypatch.setattr(main, "pipe", object())
+    main.retrieval.start()
+    main.generation.start()
+    main.exact_cache.clear()
+
+
+def test_query_returns_trace_when_requested(stub_pipeline):
+    client = TestClient(main.app)
+    response = client.post("/query", json={"query": "cat e taxa?", "debug": True}, headers={"X-Trace-Id": "java-42"})
+    assert response.status_code == 200
+    assert response.headers["X-Trace-Id"] == "java-42"
+    body = response.json()
+    assert body["answer"] == "Taxa este 100 lei."
+    names = [span["name"] for span in body["trace"]["spans"]]
+    assert names == ["retrieval_queue", "embed", "generation_queue", "prefill", "decode"]
+    assert body["trace"]["spans"][-1]["generated_tokens"] == 4
+
+    response = client.post("/query", json={"query": "alta intrebare"})
+    assert "trace" not in response.json()
+    assert len(response.headers["X-Trace-Id"]) == 16
+
+
+def test_profile_endpoint_requires_admin_token(monkeypatch, tmp_path):
+    client = TestClient(main.app)
+    assert client.post("/admin/profile").status_code == 404
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(main, "PROFILE_DIR", str(tmp_path))
+    assert client.post("/admin/profile", headers={"X-Admin-Token": "gresit"}).status_code == 403
+    response = client.post("/admin/profile?seconds=0.2", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json()["samples"] > 0
+    assert os.path.exists(response.json()["path"])
+
+
+def test_sample_profile_sees_busy_threads(tmp_path):
+    stop = threading.Event()
+
+    def busy_loop():
+        while not stop.is_set():
+            sum(range(1000))
+
+    thread = threading.Thread(target=busy_loop, name="busy")
+    thread.start()
+    try:
+        report = sample_profile(0.3, str(tmp_path / "p.collapsed"), interval=0.002)
+    finally:
+        stop.set()
+        thread.join()
+    assert any(entry["frame"].startswith("busy_loop") for entry in report["top"])
+    with open(report["path"], encoding="utf-8") as f:
+        assert any(line.startswith("busy;") for line in f)
@@ -0,0 +1,86 @@
+import time
+import uuid
+from contextlib import contextmanager
+from threading import Lock, local
+
+_local = local()
+
+
+class Trace:
+    """Span-urile unei singure cereri, ca sa se vada unde s-a dus timpul
+    (retrieval, context prea mare, decode lung).
+
+    O cerere trece prin mai multe thread-uri (retrieval, generare), deci
+    trace-ul se transmite explicit odata cu cererea; in fiecare thread,
+    `use_trace` il face curent pentru `metrics.timed` si `annotate`.
+    """
+
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.start = time.perf_counter()
+        self.end = None
+        self.spans = []
+        self.attributes = {}
+        self._last = self.start  # sfarsitul ultimului span; de aici incep asteptarile in cozi
+        self._lock = Lock()
+
+    def add(self, name, start, end, **attributes):
+        span = {"name": name, "start_ms": (start - self.start) * 1000, "duration_ms": (end - start) * 1000}
+        span.update(attributes)
+        with self._lock:
+            self.spans.append(span)
+            self._last = max(self._last, end)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter(), **attributes)
+
+    def mark(self):
+        with self._lock:
+            self._last = time.perf_counter()
+
+    def wait(self, name):
+        """Span pentru timpul de la ultimul span (sau `mark`) pana acum, ex. asteptarea intr-o coada."""
+        self.add(name, self._last, time.perf_counter())
+
+    def annotate(self, **attributes):
+        with self._lock:
+            self.attributes.update(attributes)
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+    def to_dict(self):
+        end = self.end or time.perf_counter()
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+            return {
+                "trace_id": self.trace_id,
+                "total_ms": (end - self.start) * 1000,
+                "attributes": dict(self.attributes),
+                "spans": spans,
+            }
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def use_trace(trace):
+    previous = current_trace()
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+def annotate(**attributes):
+    trace = current_trace()
+    if trace is not None:
+        trace.annotate(**attributes)